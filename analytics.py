@@ -0,0 +1,153 @@
+"""Per-turn conversation analytics for main9.py.
+
+``ConversationStats`` keeps one row per message in compact columnar arrays
+(role, length, topics, sentiment, latency) and updates the sidebar's
+aggregates as each row is recorded, so a rerun reads counters instead of
+rescanning the conversation. With ``ANALYTICS_LOG`` set, every row is also
+appended to that JSON-lines file for the offline fleet-wide report in
+analytics_batch.py.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from array import array
+
+# JSON-lines file every session appends its rows to; unset to disable
+ANALYTICS_LOG = os.getenv("ANALYTICS_LOG")
+
+ROLES = ("user", "assistant")
+# Sidebar tie-break order when two sentiments are equally common
+SENTIMENTS = ("positive", "neutral", "negative", "uncertain")
+NO_SENTIMENT = -1
+
+
+class ConversationStats:
+    """Columnar per-message features of one conversation, with running totals.
+
+    Topics are stored CSR-style: the topic ids of message ``i`` are
+    ``topic_ids[topic_offsets[i]:topic_offsets[i + 1]]``. Topic and
+    sentiment names are interned in ``topic_names``/``sentiment_names`` as
+    they first appear, so any lexicon works.
+    """
+
+    def __init__(self, sentiments=SENTIMENTS):
+        self.role = array("B")
+        self.length = array("I")
+        self.sentiment = array("b")
+        # Seconds to the reply's first audio and to its end; NaN if unknown
+        self.first_audio = array("f")
+        self.total = array("f")
+        self.topic_ids = array("H")
+        self.topic_offsets = array("I", [0])
+
+        self.topic_names = []
+        self.sentiment_names = list(sentiments)
+        self._topic_index = {}
+        self._sentiment_index = {name: i for i, name in enumerate(sentiments)}
+
+        # Running aggregates for the sidebar
+        self.role_counts = [0] * len(ROLES)
+        self.topic_counts = []
+        self.sentiment_counts = [0] * len(self.sentiment_names)
+
+    def __len__(self):
+        return len(self.role)
+
+    def record(self, role, content, topics=(), sentiment=None, timings=None):
+        """Add one message; ``timings`` as in TurnResult, in seconds"""
+        role_id = ROLES.index(role)
+        self.role.append(role_id)
+        self.length.append(len(content))
+        self.role_counts[role_id] += 1
+
+        for topic in topics:
+            topic_id = self._topic_index.get(topic)
+            if topic_id is None:
+                topic_id = self._topic_index[topic] = len(self.topic_names)
+                self.topic_names.append(topic)
+                self.topic_counts.append(0)
+            self.topic_ids.append(topic_id)
+            self.topic_counts[topic_id] += 1
+        self.topic_offsets.append(len(self.topic_ids))
+
+        sentiment_id = NO_SENTIMENT
+        if sentiment is not None:
+            sentiment_id = self._sentiment_index.get(sentiment)
+            if sentiment_id is None:
+                sentiment_id = self._sentiment_index[sentiment] = len(
+                    self.sentiment_names
+                )
+                self.sentiment_names.append(sentiment)
+                self.sentiment_counts.append(0)
+            self.sentiment_counts[sentiment_id] += 1
+        self.sentiment.append(sentiment_id)
+
+        timings = timings or {}
+        self.first_audio.append(timings.get("first_audio", math.nan))
+        self.total.append(timings.get("total", math.nan))
+
+    @property
+    def user_messages(self):
+        return self.role_counts[0]
+
+    @property
+    def assistant_messages(self):
+        return self.role_counts[1]
+
+    @property
+    def topics(self):
+        """Topics in the order they first came up"""
+        return list(self.topic_names)
+
+    def dominant_sentiment(self):
+        """Most common sentiment so far, or None before any was recorded"""
+        if not any(self.sentiment_counts):
+            return None
+        best = max(
+            range(len(self.sentiment_counts)), key=self.sentiment_counts.__getitem__
+        )
+        return self.sentiment_names[best]
+
+    def row(self, index):
+        """Message ``index`` as a plain dict, the format of the analytics log"""
+        start, end = self.topic_offsets[index], self.topic_offsets[index + 1]
+        sentiment_id = self.sentiment[index]
+        return {
+            "role": ROLES[self.role[index]],
+            "length": self.length[index],
+            "topics": [self.topic_names[i] for i in self.topic_ids[start:end]],
+            "sentiment": (
+                self.sentiment_names[sentiment_id]
+                if sentiment_id != NO_SENTIMENT
+                else None
+            ),
+            "first_audio": _finite(self.first_audio[index]),
+            "total": _finite(self.total[index]),
+        }
+
+
+def _finite(value):
+    return None if math.isnan(value) else round(value, 4)
+
+
+class TurnLog:
+    """Append-only JSON-lines log of analytics rows, shared by all sessions"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, conversation_id, row):
+        line = json.dumps({"conversation": conversation_id, "ts": time.time(), **row})
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logging.warning("Could not write analytics log %s: %s", self.path, e)
+
+
+turn_log = TurnLog(ANALYTICS_LOG) if ANALYTICS_LOG else None
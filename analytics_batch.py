@@ -0,0 +1,217 @@
+"""Fleet-wide topic, sentiment and latency report over analytics logs.
+
+Reads the JSON-lines rows written by main9.py (see ``ANALYTICS_LOG`` in
+analytics.py) from any number of files, loads them into NumPy columns and
+computes every aggregate with vectorized operations, so thousands of
+conversations take one pass over the data rather than one per chart.
+
+    python -m analytics_batch logs/*.jsonl
+    python -m analytics_batch logs/*.jsonl --json > report.json
+
+Needs NumPy, which the Streamlit apps themselves don't.
+"""
+
+import argparse
+import json
+import logging
+
+import numpy as np
+
+from analytics import NO_SENTIMENT, ROLES, SENTIMENTS
+
+PERCENTILES = (50, 95, 99)
+
+
+def _intern(names, index, name):
+    value = index.get(name)
+    if value is None:
+        value = index[name] = len(names)
+        names.append(name)
+    return value
+
+
+def load(paths):
+    """Rows of all logs in ``paths`` as a dict of NumPy columns.
+
+    Topics are CSR-style, as in ConversationStats: ``topic_row`` gives the
+    row each entry of ``topic_id`` belongs to.
+    """
+    conversations, conversation_index = [], {}
+    topics, topic_index = [], {}
+    sentiments = list(SENTIMENTS)
+    sentiment_index = {name: i for i, name in enumerate(sentiments)}
+    columns = {
+        name: []
+        for name in (
+            "conversation",
+            "role",
+            "length",
+            "sentiment",
+            "first_audio",
+            "total",
+            "topic_row",
+            "topic_id",
+        )
+    }
+    skipped = 0
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                    role = ROLES.index(row["role"])
+                except (ValueError, KeyError):
+                    skipped += 1
+                    continue
+                index = len(columns["role"])
+                columns["conversation"].append(
+                    _intern(conversations, conversation_index, row["conversation"])
+                )
+                columns["role"].append(role)
+                columns["length"].append(row.get("length", 0))
+                sentiment = row.get("sentiment")
+                columns["sentiment"].append(
+                    NO_SENTIMENT
+                    if sentiment is None
+                    else _intern(sentiments, sentiment_index, sentiment)
+                )
+                for key in ("first_audio", "total"):
+                    value = row.get(key)
+                    columns[key].append(np.nan if value is None else value)
+                for topic in row.get("topics") or ():
+                    columns["topic_row"].append(index)
+                    columns["topic_id"].append(_intern(topics, topic_index, topic))
+    if skipped:
+        logging.warning("Skipped %d malformed analytics rows", skipped)
+
+    dtypes = {
+        "conversation": np.int64,
+        "role": np.uint8,
+        "length": np.uint32,
+        "sentiment": np.int8,
+        "first_audio": np.float32,
+        "total": np.float32,
+        "topic_row": np.int64,
+        "topic_id": np.int32,
+    }
+    data = {
+        name: np.asarray(values, dtype=dtypes[name]) for name, values in columns.items()
+    }
+    data["conversations"] = conversations
+    data["topics"] = topics
+    data["sentiments"] = sentiments
+    return data
+
+
+def _percentiles(values):
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return None
+    return {
+        f"p{p}": round(float(v), 3)
+        for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+    }
+
+
+def report(data):
+    """Fleet-wide aggregates of ``load``'s columns, as plain Python values"""
+    conversation, role = data["conversation"], data["role"]
+    n_conversations = len(data["conversations"])
+    n_topics, n_sentiments = len(data["topics"]), len(data["sentiments"])
+    user = role == ROLES.index("user")
+    assistant = role == ROLES.index("assistant")
+
+    per_conversation = np.bincount(conversation, minlength=n_conversations)
+
+    # Topic mentions, and how many conversations brought each topic up
+    topic_id = data["topic_id"]
+    topic_conversation = conversation[data["topic_row"]]
+    mentions = np.bincount(topic_id, minlength=n_topics)
+    pairs = np.unique(topic_conversation * n_topics + topic_id)
+    reach = np.bincount(pairs % n_topics, minlength=n_topics) if n_topics else pairs
+
+    # User-message sentiment, and each conversation's dominant sentiment;
+    # ties go to the earlier sentiment, as in the sidebar
+    sentiment = data["sentiment"].astype(np.int64)
+    rated = sentiment != NO_SENTIMENT
+    sentiment_counts = np.bincount(sentiment[rated], minlength=n_sentiments)
+    grid = np.bincount(
+        conversation[rated] * n_sentiments + sentiment[rated],
+        minlength=n_conversations * n_sentiments,
+    ).reshape(n_conversations, n_sentiments)
+    has_sentiment = grid.sum(axis=1) > 0
+    dominant = np.bincount(grid[has_sentiment].argmax(axis=1), minlength=n_sentiments)
+
+    order = np.argsort(-mentions, kind="stable")
+    return {
+        "conversations": n_conversations,
+        "messages": int(role.size),
+        "user_messages": int(user.sum()),
+        "assistant_messages": int(assistant.sum()),
+        "messages_per_conversation": {
+            "mean": round(float(per_conversation.mean()), 2) if n_conversations else 0,
+            **(_percentiles(per_conversation.astype(np.float64)) or {}),
+        },
+        "mean_length": {
+            "user": round(float(data["length"][user].mean()), 1) if user.any() else 0,
+            "assistant": (
+                round(float(data["length"][assistant].mean()), 1)
+                if assistant.any()
+                else 0
+            ),
+        },
+        "topics": [
+            {
+                "topic": data["topics"][i],
+                "mentions": int(mentions[i]),
+                "conversations": int(reach[i]),
+            }
+            for i in order
+        ],
+        "sentiment": {
+            name: {
+                "messages": int(sentiment_counts[i]),
+                "dominant_in": int(dominant[i]),
+            }
+            for i, name in enumerate(data["sentiments"])
+        },
+        "latency": {
+            "first_audio": _percentiles(data["first_audio"][assistant]),
+            "total": _percentiles(data["total"][assistant]),
+        },
+    }
+
+
+def print_report(result):
+    print(
+        f"{result['conversations']} conversations, {result['messages']} messages "
+        f"({result['user_messages']} user, {result['assistant_messages']} assistant); "
+        f"{result['messages_per_conversation']['mean']} messages per conversation"
+    )
+    print("\nTopics               mentions  conversations")
+    for row in result["topics"]:
+        print(f"  {row['topic']:<18} {row['mentions']:>8}  {row['conversations']:>13}")
+    print("\nSentiment            messages  dominant in")
+    for name, row in result["sentiment"].items():
+        print(f"  {name:<18} {row['messages']:>8}  {row['dominant_in']:>11}")
+    print("\nLatency (s)")
+    for stage, values in result["latency"].items():
+        if values:
+            print(f"  {stage:<18} " + "  ".join(f"{k} {v}" for k, v in values.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("logs", nargs="+", help="analytics JSON-lines files")
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    result = report(load(args.logs))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
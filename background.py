@@ -0,0 +1,59 @@
+import contextvars
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "4"))
+
+# Process-wide pool for auxiliary LLM calls (summaries, follow-up questions)
+# so they never hold up a spoken reply
+executor = ThreadPoolExecutor(
+    max_workers=BACKGROUND_WORKERS, thread_name_prefix="background"
+)
+
+
+class BackgroundTasks:
+    """Named background jobs for one session.
+
+    Worker threads must not touch Streamlit state, so results are handed
+    back by ``collect``, which the script calls on its own thread when it
+    reruns. Submitting a name that is still pending supersedes the older
+    job; its result is discarded.
+    """
+
+    def __init__(self, executor=executor):
+        self.executor = executor
+        self._futures = {}
+
+    def submit(self, name, fn, *args):
+        previous = self._futures.get(name)
+        if previous is not None:
+            previous.cancel()
+        # In the caller's context, so spans carry the session id
+        self._futures[name] = self.executor.submit(
+            contextvars.copy_context().run, fn, *args
+        )
+
+    @property
+    def pending(self):
+        return [name for name, future in self._futures.items() if not future.done()]
+
+    def collect(self):
+        """Results of the jobs that finished since the last call, by name"""
+        results = {}
+        for name, future in list(self._futures.items()):
+            if not future.done():
+                continue
+            del self._futures[name]
+            if future.cancelled():
+                continue
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logging.warning("Background task %s failed: %s", name, e)
+        return results
+
+    def cancel_all(self):
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
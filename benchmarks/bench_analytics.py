@@ -0,0 +1,114 @@
+"""Sidebar aggregates per rerun, and the offline fleet report over many logs.
+
+First times main9.py's old sidebar computation (role counts by list
+comprehension, sentiment by repeated ``list.count``) against reading
+ConversationStats' running totals, at growing conversation lengths. Then
+writes a synthetic analytics log for many conversations and times
+analytics_batch's load and report over it.
+
+    python -m benchmarks.bench_analytics --conversations 5000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import analytics_batch
+from analytics import ConversationStats, TurnLog
+from benchmarks.bench_keywords import make_text
+from keywords import analyze
+
+
+def old_sidebar(messages, user_sentiment):
+    user_messages = len([m for m in messages if m["role"] == "user"])
+    assistant_messages = len([m for m in messages if m["role"] == "assistant"])
+    sentiment_counts = {
+        "positive": user_sentiment.count("positive"),
+        "neutral": user_sentiment.count("neutral"),
+        "negative": user_sentiment.count("negative"),
+        "uncertain": user_sentiment.count("uncertain"),
+    }
+    return (
+        user_messages,
+        assistant_messages,
+        max(sentiment_counts, key=sentiment_counts.get),
+    )
+
+
+def new_sidebar(stats):
+    return stats.user_messages, stats.assistant_messages, stats.dominant_sentiment()
+
+
+def conversation(rng, turns):
+    for _ in range(turns):
+        yield "user", make_text(rng, rng.randint(5, 40))
+        yield "assistant", make_text(rng, rng.randint(40, 120), 0.0)
+
+
+def per_call(fn, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=5000)
+    parser.add_argument("--turns", type=int, default=12)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    for turns in (10, 100, 1000):
+        messages, user_sentiment, stats = [], [], ConversationStats()
+        for role, content in conversation(rng, turns):
+            messages.append({"role": role, "content": content})
+            if role == "user":
+                topics, sentiment = analyze(content)
+                user_sentiment.append(sentiment)
+                stats.record(role, content, topics, sentiment)
+            else:
+                stats.record(role, content, timings={"total": 1.0})
+        assert old_sidebar(messages, user_sentiment) == new_sidebar(stats)
+        old = per_call(lambda: old_sidebar(messages, user_sentiment))
+        new = per_call(lambda: new_sidebar(stats))
+        print(
+            f"sidebar, {2 * turns:>5} messages: recompute {old * 1e6:8.1f} us, "
+            f"running totals {new * 1e6:5.1f} us"
+        )
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "analytics.jsonl")
+        log = TurnLog(path)
+        for number in range(args.conversations):
+            stats = ConversationStats()
+            for role, content in conversation(rng, rng.randint(1, 2 * args.turns)):
+                if role == "user":
+                    stats.record(role, content, *analyze(content))
+                else:
+                    timings = {
+                        "first_audio": rng.lognormvariate(-0.5, 0.4),
+                        "total": rng.lognormvariate(1.0, 0.5),
+                    }
+                    stats.record(role, content, timings=timings)
+                log.write(f"c{number}", stats.row(len(stats) - 1))
+        size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        data = analytics_batch.load([path])
+        loaded = time.perf_counter()
+        result = analytics_batch.report(data)
+        done = time.perf_counter()
+    print(
+        f"fleet report: {result['conversations']} conversations, "
+        f"{result['messages']} rows, {size / 1e6:.1f} MB of logs: "
+        f"load {(loaded - start) * 1000:.0f} ms, "
+        f"aggregates {(done - loaded) * 1000:.1f} ms"
+    )
+    analytics_batch.print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Per-turn TTS latency during a Puter outage, with and without the breaker.
+
+A local fake Puter server fails every request (or a fraction of them with
+--error-rate) after a realistic delay; Edge TTS is replaced by a fixed
+latency stub so only the Puter handling is measured. Hedging is turned off
+to isolate the breaker.
+
+    python -m benchmarks.bench_breaker --turns 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import tts
+from benchmarks.fakes import FakePuterServer
+from circuit_breaker import CircuitBreaker
+from tts_cache import TTSCache
+
+
+def run(turns, breaker, edge_delay):
+    async def fake_edge(text, voice):
+        await asyncio.sleep(edge_delay)
+        return b"\xff\xf3" * 100
+
+    tts.generate_audio = fake_edge
+    tts.audio_cache = TTSCache(max_memory_bytes=0)
+    tts.puter_breaker = breaker
+
+    latencies = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        tts.synthesize(f"Sentence number {turn} of the reply.", "en-US-AriaNeural")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--error-rate", type=float, default=1.0)
+    parser.add_argument("--puter-delay", type=float, default=0.5)
+    parser.add_argument("--edge-delay", type=float, default=0.3)
+    args = parser.parse_args()
+
+    tts.TTS_HEDGE_DELAY = "off"
+    modes = {
+        "no breaker": CircuitBreaker("Puter TTS", failure_threshold=10**9),
+        "breaker": CircuitBreaker("Puter TTS", failure_threshold=3, reset_timeout=30),
+    }
+    for name, breaker in modes.items():
+        with FakePuterServer(
+            base_delay=args.puter_delay, error_rate=args.error_rate
+        ) as puter:
+            tts.PUTER_TTS_URL = puter.url
+            latencies = run(args.turns, breaker, args.edge_delay)
+            print(
+                f"{name:>10}: mean {statistics.mean(latencies) * 1000:7.1f} ms/turn, "
+                f"total {sum(latencies):6.2f} s, "
+                f"{puter.requests} Puter requests, "
+                f"circuit {breaker.state}, {breaker.rejected} short-circuited"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Per-turn wall clock and tokens: separate auxiliary LLM calls vs one call.
+
+Replays main9.py's turn flow against a local mock LLM. "separate" makes a
+summary call when one is due, streams the reply and then asks for
+follow-up questions; "combined" streams one structured JSON response and
+takes everything from it. The mock answers each kind of request with a
+plausible payload, so the token counts are representative.
+
+    python -m benchmarks.bench_combined --turns 10
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from groq import Groq
+
+from benchmarks.fakes import DEFAULT_REPLY, FakeLLMServer
+from conversation import (
+    COMBINED_INSTRUCTIONS,
+    SUMMARY_REQUEST,
+    CombinedReplyStream,
+    generate_follow_up_questions,
+    summary_due,
+    update_summary,
+)
+from personas import BHUMIKA_PERSONA
+from streaming import iter_text_deltas
+
+QUESTION = (
+    "Turn {turn}: I'm a finance graduate and want to move into HR. "
+    "Where should I start?"
+)
+FOLLOW_UPS = [
+    "What draws you to HR?",
+    "Which part of finance do you enjoy?",
+    "What is your timeline?",
+]
+SUMMARY = "The user is a finance graduate exploring a move into HR."
+
+
+def scripted_reply(request):
+    system = request["messages"][0]["content"]
+    if system.startswith("You are a conversation summarizer"):
+        return SUMMARY
+    if system.startswith("You are a helpful assistant that generates follow-up"):
+        return json.dumps(FOLLOW_UPS)
+    if any(m["content"] == COMBINED_INSTRUCTIONS for m in request["messages"]):
+        wants_summary = SUMMARY_REQUEST in request["messages"][-2]["content"]
+        return json.dumps(
+            {
+                "reply": DEFAULT_REPLY,
+                "follow_up_questions": FOLLOW_UPS,
+                "summary": SUMMARY if wants_summary else None,
+            }
+        )
+    return DEFAULT_REPLY
+
+
+def stream_reply(client, prompt, max_tokens, structured=None):
+    stream = client.chat.completions.create(
+        model="llama-3.3-70b-versatile",
+        messages=prompt,
+        max_tokens=max_tokens,
+        temperature=0.7,
+        stream=True,
+    )
+    deltas = iter_text_deltas(stream)
+    if structured is not None:
+        deltas = structured.iter_reply(deltas)
+    return "".join(deltas)
+
+
+def separate_turn(client, messages, state):
+    if summary_due(messages):
+        state["summary"], state["checkpoint"] = update_summary(
+            client, state["summary"], messages, state["checkpoint"]
+        )
+    context = {"role": "system", "content": f"CONVERSATION CONTEXT: {state['summary']}"}
+    prompt = [{"role": "system", "content": BHUMIKA_PERSONA}]
+    prompt += messages[:-1] + [context, messages[-1]]
+    reply = stream_reply(client, prompt, 1024)
+    if len(messages) > 2:
+        state["follow_ups"] = generate_follow_up_questions(
+            client, messages[-1]["content"], state["summary"]
+        )
+    return reply
+
+
+def combined_turn(client, messages, state):
+    want_summary = summary_due(messages)
+    context = f"CONVERSATION CONTEXT: {state['summary']}"
+    if want_summary:
+        context += "\n\n" + SUMMARY_REQUEST
+    prompt = [
+        {"role": "system", "content": BHUMIKA_PERSONA},
+        {"role": "system", "content": COMBINED_INSTRUCTIONS},
+    ]
+    prompt += messages[:-1] + [{"role": "system", "content": context}, messages[-1]]
+    structured = CombinedReplyStream()
+    reply = stream_reply(client, prompt, 1400, structured)
+    extras = structured.result(want_summary)
+    assert extras.follow_up_questions, "combined response failed validation"
+    state["follow_ups"] = extras.follow_up_questions
+    if want_summary:
+        state["summary"], state["checkpoint"] = extras.summary, len(messages)
+    return reply
+
+
+def replay(server, client, turns, turn_fn):
+    messages = [{"role": "assistant", "content": "Hello! I'm Bhumika."}]
+    state = {"summary": "", "checkpoint": 0, "follow_ups": []}
+    server.requests = server.prompt_tokens = server.completion_tokens = 0
+    latencies = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": QUESTION.format(turn=turn)})
+        start = time.perf_counter()
+        reply = turn_fn(client, messages, state)
+        latencies.append(time.perf_counter() - start)
+        assert reply == DEFAULT_REPLY
+        messages.append({"role": "assistant", "content": reply})
+    return latencies, server.requests, server.prompt_tokens, server.completion_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        reply=scripted_reply,
+        first_token_delay=args.first_token_delay,
+        token_delay=args.token_delay,
+    )
+    with server:
+        client = Groq(base_url=server.url, api_key="benchmark")
+        for name, turn_fn in (("separate", separate_turn), ("combined", combined_turn)):
+            latencies, requests, prompt, completion = replay(
+                server, client, args.turns, turn_fn
+            )
+            print(
+                f"{name:>9}: {statistics.mean(latencies) * 1000:7.1f} ms/turn mean, "
+                f"{requests / args.turns:.1f} requests/turn, "
+                f"{prompt / args.turns:6.0f} prompt + "
+                f"{completion / args.turns:4.0f} completion tokens/turn"
+            )
+
+
+if __name__ == "__main__":
+    main()
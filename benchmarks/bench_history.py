@@ -0,0 +1,89 @@
+"""Per-turn prompt size and latency over a long conversation.
+
+Replays a synthetic conversation against a local mock LLM whose prefill
+time grows with the prompt, sending either the whole history every turn
+(the old behaviour) or the token-budgeted HistoryWindow with its rolling
+summary. Reports prompt tokens and turn latency per block of turns; the
+windowed latency includes the summarizer calls.
+
+    python -m benchmarks.bench_history --turns 60
+"""
+
+import argparse
+import statistics
+import time
+
+from groq import Groq
+
+from benchmarks.fakes import FakeLLMServer
+from history import HistoryWindow, llm_summarizer, prompt_tokens
+
+SYSTEM = {"role": "system", "content": "You are Priya, a helpful assistant."}
+QUESTION = (
+    "Turn {turn}: I have been thinking about moving from accounting into people "
+    "operations, but I'm not sure which skills carry over, how to explain the "
+    "switch in interviews, or whether I should take a course first. What would "
+    "you suggest for someone with five years of audit experience?"
+)
+
+
+def replay(client, turns, window):
+    messages = [{"role": "assistant", "content": "Hello, I am Priya."}]
+    rows = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": QUESTION.format(turn=turn)})
+        start = time.perf_counter()
+        history = window.build(messages) if window else messages
+        prompt = [SYSTEM] + history
+        response = client.chat.completions.create(
+            model="llama-3.3-70b-versatile", messages=prompt, max_tokens=1024
+        )
+        rows.append((prompt_tokens(prompt), time.perf_counter() - start))
+        messages.append(
+            {"role": "assistant", "content": response.choices[0].message.content}
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--block", type=int, default=10)
+    parser.add_argument("--budget", type=int, default=1500)
+    parser.add_argument(
+        "--prompt-token-delay",
+        type=float,
+        default=0.0002,
+        help="mock prefill seconds per prompt token",
+    )
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        first_token_delay=0.05,
+        token_delay=0.0,
+        prompt_token_delay=args.prompt_token_delay,
+    )
+    with server:
+        client = Groq(base_url=server.url, api_key="benchmark")
+        window = HistoryWindow(budget=args.budget, summarize=llm_summarizer(client))
+        results = {
+            "full": replay(client, args.turns, None),
+            "windowed": replay(client, args.turns, window),
+        }
+
+    print(f"{'turns':>9} | {'full history':^36} | {'windowed':^36}")
+    for first in range(0, args.turns, args.block):
+        cells = []
+        for rows in results.values():
+            block = rows[first : first + args.block]
+            tokens = statistics.mean(tokens for tokens, _ in block)
+            latencies = [elapsed * 1000 for _, elapsed in block]
+            cells.append(
+                f"{tokens:6.0f} tok {statistics.median(latencies):6.0f} ms p50 "
+                f"{max(latencies):6.0f} ms max"
+            )
+        print(f"{first + 1:>4}-{first + len(block):<4} | " + " | ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Puter TTS request latency: a fresh connection per call vs the shared pool.
+
+Sends the same sequence of short sentences to a local fake Puter server
+over HTTPS (a throwaway self-signed certificate, so every new connection
+pays a real TLS handshake) and reports per-request latency and how many
+TCP connections the server had to accept.
+
+    python -m benchmarks.bench_http_pool --requests 50
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import requests
+
+import tts
+from benchmarks.fakes import FakePuterServer, make_certificate
+
+
+def run(server, count, session_factory):
+    tts.get_session = session_factory
+    server.requests = server.connections = 0
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        tts.puter_tts(f"Sentence number {i} of the reply.")
+        latencies.append(time.perf_counter() - start)
+    return latencies, server.connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--plain-http", action="store_true")
+    args = parser.parse_args()
+
+    if not args.plain_http and not shutil.which("openssl"):
+        parser.error("openssl not found; use --plain-http")
+
+    pooled_session = tts.get_session
+    with tempfile.TemporaryDirectory() as directory:
+        certfile = None
+        if not args.plain_http:
+            certfile, ca_bundle = make_certificate(directory)
+            os.environ["REQUESTS_CA_BUNDLE"] = ca_bundle
+
+        with FakePuterServer(
+            base_delay=0.0, per_char_delay=0.0, certfile=certfile
+        ) as puter:
+            tts.PUTER_TTS_URL = puter.url
+            for name, factory in (
+                ("unpooled", lambda: requests),
+                ("pooled", pooled_session),
+            ):
+                latencies, connections = run(puter, args.requests, factory)
+                latencies.sort()
+                print(
+                    f"{name:>9}: median {statistics.median(latencies) * 1000:6.2f} ms, "
+                    f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:6.2f} ms, "
+                    f"{connections} connections for {args.requests} requests"
+                )
+
+
+if __name__ == "__main__":
+    main()
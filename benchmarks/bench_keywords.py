@@ -0,0 +1,141 @@
+"""Topic/sentiment extraction: nested substring scans vs KeywordMatcher.
+
+Times main9.py's old ``extract_topics`` + ``analyze_sentiment`` (a
+lowercase copy and an ``any(word in text)`` scan per keyword list) against
+one pass of ``keywords.KeywordMatcher`` on chat-sized messages and long
+transcripts, with the default lexicon and with a 20x larger one, then
+batch-scores a synthetic conversation log. Also counts the substring false
+positives the old scan reports on words like "repayment" or "hardware".
+
+    python -m benchmarks.bench_keywords --messages 20000
+"""
+
+import argparse
+import random
+import time
+
+from keywords import DEFAULT_LEXICON, KeywordMatcher
+
+TOPICS = DEFAULT_LEXICON["topics"]
+SENTIMENT = DEFAULT_LEXICON["sentiment"]
+FILLER = (
+    "i have been thinking about the next few months and what my manager said "
+    "in our last one to one about the team plans for the quarter ahead while "
+    "the hardware refresh and loan repayment schedule keep everyone busy"
+).split()
+
+
+def lexicon_terms(lexicon):
+    return [
+        term
+        for section in lexicon.values()
+        for terms in section.values()
+        for term in terms
+    ]
+
+
+TERMS = lexicon_terms(DEFAULT_LEXICON)
+
+
+def old_extract_topics(text, topics=TOPICS):
+    text_lower = text.lower()
+    return [
+        topic
+        for topic, words in topics.items()
+        if any(word in text_lower for word in words)
+    ]
+
+
+def old_analyze_sentiment(text, sentiment=SENTIMENT):
+    text_lower = text.lower()
+    for name, words in sentiment.items():
+        if any(word in text_lower for word in words):
+            return name
+    return "neutral"
+
+
+def large_lexicon(scale):
+    """The default lexicon with ``scale`` times as many (made-up) terms"""
+    return {
+        section: {
+            name: terms + [f"{term}x{i}" for term in terms for i in range(scale - 1)]
+            for name, terms in DEFAULT_LEXICON[section].items()
+        }
+        for section in DEFAULT_LEXICON
+    }
+
+
+def make_text(rng, words, keyword_rate=0.05):
+    return " ".join(
+        rng.choice(TERMS) if rng.random() < keyword_rate else rng.choice(FILLER)
+        for _ in range(words)
+    )
+
+
+def per_call(fn, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) / (repeat * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--transcript-words", type=int, default=20000)
+
+    parser.add_argument("--lexicon-scale", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    cases = {
+        "30-word message": ([make_text(rng, 30) for _ in range(200)], 20),
+        "200-word message": ([make_text(rng, 200) for _ in range(200)], 5),
+        f"{args.transcript_words}-word transcript": (
+            [make_text(rng, args.transcript_words, 0.002) for _ in range(5)],
+            5,
+        ),
+    }
+    big = large_lexicon(args.lexicon_scale)
+    for lexicon_name, lexicon in (("default", DEFAULT_LEXICON), ("large", big)):
+        matcher = KeywordMatcher(lexicon)
+
+        def old_analyze(text):
+            return (
+                old_extract_topics(text, lexicon["topics"]),
+                old_analyze_sentiment(text, lexicon["sentiment"]),
+            )
+
+        print(f"{lexicon_name} lexicon, {len(lexicon_terms(lexicon))} terms")
+        for name, (texts, repeat) in cases.items():
+            old = per_call(old_analyze, texts, repeat)
+            new = per_call(matcher.analyze, texts, repeat)
+            print(
+                f"{name:>22}: substring scans {old * 1e6:9.1f} us, "
+                f"matcher {new * 1e6:9.1f} us ({old / new:4.1f}x)"
+            )
+
+    matcher = KeywordMatcher()
+
+    log = [make_text(rng, rng.randint(5, 60)) for _ in range(args.messages)]
+    start = time.perf_counter()
+    topic_counts, sentiment_counts = matcher.tally(log)
+    elapsed = time.perf_counter() - start
+    print(
+        f"batch: {len(log)} messages in {elapsed * 1000:.0f} ms "
+        f"({len(log) / elapsed:,.0f} messages/s); "
+        f"top topics {topic_counts.most_common(3)}"
+    )
+
+    traps = [make_text(rng, 30, 0.0) for _ in range(1000)]
+    false_topics = sum(bool(old_extract_topics(text)) for text in traps)
+    new_topics = sum(bool(matcher.extract_topics(text)) for text in traps)
+    print(
+        f"keyword-free messages tagged with a topic: substring scans {false_topics}, "
+        f"matcher {new_topics} of {len(traps)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Per-rerun LLM overhead: a Groq client per script run vs the shared client.
+
+Serves a local OpenAI-compatible mock over HTTPS (a throwaway self-signed
+certificate, so a new connection pays a real TLS handshake) and simulates
+Streamlit reruns that each send one streamed chat request. Reports client
+construction time and time to the first token, then the first request
+of a fresh process with and without the startup warm-up.
+
+    python -m benchmarks.bench_llm_client --reruns 20
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from groq import Groq
+
+import llm
+from benchmarks.fakes import FakeLLMServer, make_certificate
+
+MESSAGES = [{"role": "user", "content": "How do I switch careers into HR?"}]
+
+
+def first_token(client):
+    start = time.perf_counter()
+    stream = client.chat.completions.create(
+        model="llama-3.3-70b-versatile", messages=MESSAGES, stream=True
+    )
+    first = None
+    for chunk in stream:
+        if first is None and chunk.choices[0].delta.content:
+            first = time.perf_counter() - start
+    return first
+
+
+def reruns(count, make_client):
+    build, ttft = [], []
+    for _ in range(count):
+        start = time.perf_counter()
+        client = make_client()
+        build.append(time.perf_counter() - start)
+        ttft.append(first_token(client))
+    return build, ttft
+
+
+def fresh_shared_client(warm_up):
+    llm.get_client.cache_clear()
+    llm.GROQ_WARMUP = warm_up
+    client = llm.get_client()
+    if warm_up:
+        # Stand-in for the time the user spends reading the page
+        time.sleep(0.5)
+    return client
+
+
+def ms(values):
+    return statistics.median(values) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--first-token-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        certfile, ca_bundle = make_certificate(directory)
+        os.environ["SSL_CERT_FILE"] = ca_bundle
+        os.environ["GROQ_API_KEY"] = "benchmark"
+        server = FakeLLMServer(
+            first_token_delay=args.first_token_delay,
+            token_delay=0.0,
+            certfile=certfile,
+        )
+        with server:
+            os.environ["GROQ_BASE_URL"] = server.url
+            for name, make_client in (
+                ("per rerun", lambda: Groq()),
+                ("shared", llm.get_client),
+            ):
+                server.connections = 0
+                build, ttft = reruns(args.reruns, make_client)
+                print(
+                    f"{name:>10}: client {ms(build):6.2f} ms, "
+                    f"first token {ms(ttft):6.2f} ms, "
+                    f"{server.connections} connections for {args.reruns} reruns"
+                )
+
+            for warm_up in (False, True):
+                cold = [first_token(fresh_shared_client(warm_up)) for _ in range(5)]
+                print(
+                    f"first request, warm-up {'on' if warm_up else 'off':>3}: "
+                    f"first token {ms(cold):6.2f} ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Peak memory per Puter TTS reply: whole-body JSON parse vs streaming decode.
+
+A local fake Puter server (in this process) returns large synthetic audio
+payloads. Each client mode runs in a fresh child process so its peak RSS
+is not polluted by the server or by the other mode; the child reports how
+far peak RSS rose above its resident size after imports while fetching
+the replies. Linux only (reads /proc/self/status).
+
+    python -m benchmarks.bench_puter_memory --sizes 1 4 16
+"""
+
+import argparse
+import base64
+import json
+import subprocess
+import sys
+
+import requests
+
+import tts
+from benchmarks.fakes import FakePuterServer
+
+
+def legacy_puter_tts(text):
+    """The client as it was: response.json() + b64decode of the whole field"""
+    response = requests.post(tts.PUTER_TTS_URL, json={"text": text}, timeout=10)
+    response.raise_for_status()
+    data = response.json()
+    return base64.b64decode(data["audio"]["data"])
+
+
+MODES = {"legacy": legacy_puter_tts, "streaming": tts.puter_tts}
+
+
+def memory_status():
+    """Current and peak resident set size in MB, from /proc/self/status.
+
+    VmHWM, unlike ru_maxrss, starts afresh in an exec'd child rather than
+    inheriting the (server-holding) parent's peak.
+    """
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            fields[key] = value.split()[0] if value.strip() else ""
+    return int(fields["VmRSS"]) / 1024, int(fields["VmHWM"]) / 1024
+
+
+def child(mode, url, replies):
+    tts.PUTER_TTS_URL = url
+    fetch = MODES[mode]
+    baseline, _ = memory_status()
+    size = 0
+    for i in range(replies):
+        size = len(fetch(f"reply {i}"))
+    _, peak = memory_status()
+    json.dump({"audio_mb": size / 2**20, "rss_mb": peak - baseline}, sys.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--replies", type=int, default=3)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "URL"))
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child, args.replies)
+        return
+
+    for size_mb in args.sizes:
+        server = FakePuterServer(
+            base_delay=0.0, per_char_delay=0.0, audio_bytes=int(size_mb * 2**20)
+        )
+        with server:
+            for mode in MODES:
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_puter_memory"]
+                    + ["--replies", str(args.replies), "--child", mode, server.url],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                result = json.loads(output)
+                print(
+                    f"{result['audio_mb']:5.1f} MB audio {mode:>9}: "
+                    f"peak RSS +{result['rss_mb']:6.1f} MB "
+                    f"({result['rss_mb'] / result['audio_mb']:.1f}x audio)"
+                )
+
+
+if __name__ == "__main__":
+    main()
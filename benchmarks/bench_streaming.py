@@ -0,0 +1,86 @@
+"""Time-to-first-audio-byte: blocking reply + TTS vs sentence-streamed TTS.
+
+Runs the Groq SDK against a local fake streaming LLM server and the Puter
+client against a local fake TTS server, then reports how long it takes
+before the first audio byte is available in each mode.
+
+    python -m benchmarks.bench_streaming --runs 5
+"""
+
+import argparse
+import statistics
+import time
+
+from groq import Groq
+
+import tts
+from benchmarks.fakes import FakeLLMServer, FakePuterServer
+from pipeline import TurnPipeline
+from streaming import iter_text_deltas
+from tts_cache import TTSCache
+
+MESSAGES = [{"role": "user", "content": "How do I switch careers into HR?"}]
+
+
+def blocking_turn(client):
+    start = time.perf_counter()
+    response = client.chat.completions.create(
+        model="llama-3.3-70b-versatile", messages=MESSAGES, max_tokens=1024
+    )
+    audio = tts.synthesize(response.choices[0].message.content, "en-US-AriaNeural")
+    first_audio = time.perf_counter() - start
+    assert audio
+    return first_audio, first_audio
+
+
+def streaming_turn(client):
+    def complete(_):
+        stream = client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=MESSAGES,
+            max_tokens=1024,
+            stream=True,
+        )
+        return iter_text_deltas(stream)
+
+    pipeline = TurnPipeline(
+        complete=complete,
+        synthesize=lambda sentence: tts.synthesize(sentence, "en-US-AriaNeural"),
+    )
+    result = pipeline.run_sync(user_text=MESSAGES[-1]["content"])
+    return result.timings["first_audio"], result.timings["total"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--tts-base-delay", type=float, default=0.25)
+    args = parser.parse_args()
+
+    llm = FakeLLMServer(
+        first_token_delay=args.first_token_delay, token_delay=args.token_delay
+    )
+    puter = FakePuterServer(base_delay=args.tts_base_delay)
+    with llm, puter:
+        tts.PUTER_TTS_URL = puter.url
+        # Measure the providers, not the audio cache
+        tts.audio_cache = TTSCache(max_memory_bytes=0)
+        client = Groq(base_url=llm.url, api_key="benchmark")
+
+        for name, turn in (("blocking", blocking_turn), ("streaming", streaming_turn)):
+            firsts, totals = [], []
+            for _ in range(args.runs):
+                first, total = turn(client)
+                firsts.append(first)
+                totals.append(total)
+            print(
+                f"{name:>10}: time-to-first-audio-byte "
+                f"median {statistics.median(firsts) * 1000:7.1f} ms, "
+                f"full turn median {statistics.median(totals) * 1000:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
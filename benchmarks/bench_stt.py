@@ -0,0 +1,122 @@
+"""Transcribe WAV fixtures with one or more STT backends and report RTF.
+
+Uses STT_BACKEND when no --backend is given. Runs fully offline with the
+local backends, e.g.
+
+    VOSK_MODEL_PATH=models/vosk-model-small-en-us \\
+        python -m benchmarks.bench_stt --backend vosk --backend whisper
+
+Defaults to the labeled clip in benchmarks/fixtures and the sample
+recording bundled under .gradio/flagged. A fixture with a ``.txt`` next to
+it holding what is said also gets its word error rate (WER) reported. A
+backend that can't be loaded or fails a request is reported and skipped.
+"""
+
+import argparse
+import glob
+import io
+import os
+import re
+
+import speech_recognition as sr
+
+from stt import get_backend, transcribe
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+DEFAULT_FIXTURES = sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.wav"))) + glob.glob(
+    os.path.join(ROOT, ".gradio", "flagged", "*", "*", "*.wav")
+)
+
+
+def load(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    with sr.AudioFile(io.BytesIO(data)) as source:
+        return sr.Recognizer().record(source)
+
+
+def label(path):
+    """What is said in a fixture, from the ``.txt`` next to it, or None"""
+    try:
+        with open(os.path.splitext(path)[0] + ".txt") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def words(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level edit distance over the number of reference words"""
+    reference, hypothesis = words(reference), words(hypothesis)
+    distances = list(range(len(hypothesis) + 1))
+    for i, ref in enumerate(reference, 1):
+        previous, distances[0] = distances[0], i
+        for j, hyp in enumerate(hypothesis, 1):
+            previous, distances[j] = distances[j], min(
+                distances[j] + 1, distances[j - 1] + 1, previous + (ref != hyp)
+            )
+    return distances[-1] / max(len(reference), 1)
+
+
+def measure(backend, audio, repeat):
+    """Best-RTF transcript of ``repeat`` runs, after one warm-up run.
+
+    Raises ``sr.UnknownValueError`` or ``sr.RequestError`` like the backend.
+    """
+    # The first call pays for lazy initialisation inside the engine
+    try:
+        transcribe(audio, backend)
+    except sr.UnknownValueError:
+        pass
+    return min(
+        (transcribe(audio, backend) for _ in range(max(repeat, 1))),
+        key=lambda transcript: transcript.rtf,
+    )
+
+
+def report(name, path, transcript, expected=None):
+    line = (
+        f"{name:>8} {os.path.basename(path)}: "
+        f"{transcript.audio_seconds:.2f}s audio, "
+        f"best RTF {transcript.rtf:.3f}, "
+    )
+    if expected is not None:
+        line += f"WER {word_error_rate(expected, transcript.text):.0%}, "
+    return line + f"text: {transcript.text!r}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("wavs", nargs="*", default=DEFAULT_FIXTURES)
+    parser.add_argument("--backend", action="append", dest="backends")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    utterances = [(path, load(path), label(path)) for path in args.wavs]
+    for name in args.backends or [None]:
+        try:
+            backend = get_backend(name)
+        except Exception as e:
+            print(f"{name or 'default':>8}: backend unavailable: {e}")
+            continue
+        for path, audio, expected in utterances:
+            try:
+                transcript = measure(backend, audio, args.repeat)
+            except sr.UnknownValueError:
+                print(
+                    f"{backend.name:>8} {os.path.basename(path)}: "
+                    "no speech recognized"
+                )
+            except sr.RequestError as e:
+                print(f"{backend.name:>8}: request failed, skipping backend: {e}")
+                break
+            else:
+                print(report(backend.name, path, transcript, expected))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Tokens spent on main9.py's conversation summary over long conversations.
+
+Replays synthetic conversations against a local mock LLM and refreshes the
+summary whenever it is due, either the old way (re-summarize the last 10
+messages from scratch) or incrementally (the previous summary plus only
+the messages since the last checkpoint). Reports summarization calls and
+tokens per conversation, prompt tokens per update early and late in the
+conversation, and how much of the conversation the final summary was
+built from.
+
+    python -m benchmarks.bench_summary --conversations 5 --turns 200
+"""
+
+import argparse
+import random
+import statistics
+
+from groq import Groq
+
+from benchmarks.bench_combined import SUMMARY
+from benchmarks.fakes import DEFAULT_REPLY, FakeLLMServer
+from conversation import MODEL, summary_due, update_summary
+
+TOPICS = [
+    "moving from finance into HR",
+    "preparing for a behavioural interview",
+    "negotiating a first salary offer",
+    "asking my manager for more flexible hours",
+    "getting a SHRM certification",
+    "handling a conflict with a teammate",
+    "writing a cover letter for a recruiter role",
+]
+QUESTION = "Turn {turn}: I'd like some advice on {topic}. {detail}"
+DETAILS = [
+    "I have two years of experience and I'm not sure where to start.",
+    "What would you suggest as a first step this week?",
+    "How do people usually approach this in Indian companies?",
+    "I tried once before and it didn't go well, so I'm a bit nervous.",
+]
+
+
+def resummarize_last_10(client, summary, messages, checkpoint):
+    """The previous approach, for comparison: the last 10 messages, no memory"""
+    conversation_text = "\n".join(
+        f"{msg['role']}: {msg['content'][:200]}" for msg in messages[-10:]
+    )
+    response = client.chat.completions.create(
+        model=MODEL,
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a conversation summarizer. Create a brief 2-3 sentence summary of the key topics and user goals from this conversation.",
+            },
+            {
+                "role": "user",
+                "content": f"Summarize this conversation:\n{conversation_text}",
+            },
+        ],
+        max_tokens=150,
+        temperature=0.3,
+    )
+    return response.choices[0].message.content, len(messages)
+
+
+def replay(server, client, turns, seed, summarize, window):
+    """One conversation; returns (prompt tokens per update, completion, coverage)
+
+    ``window`` is how many messages one update reads from scratch, or None
+    if each update builds on the previous summary.
+    """
+    rng = random.Random(seed)
+    messages = [{"role": "assistant", "content": "Hello! I'm Bhumika."}]
+    summary, checkpoint = "", 0
+    updates = []
+    completion = 0
+    for turn in range(turns):
+        question = QUESTION.format(
+            turn=turn, topic=rng.choice(TOPICS), detail=rng.choice(DETAILS)
+        )
+        for role, content in (("user", question), ("assistant", DEFAULT_REPLY)):
+            messages.append({"role": role, "content": content})
+            if not summary_due(messages):
+                continue
+            server.prompt_tokens = server.completion_tokens = 0
+            summary, checkpoint = summarize(client, summary, messages, checkpoint)
+            updates.append(server.prompt_tokens)
+            completion += server.completion_tokens
+    # Share of the conversation that found its way into the final summary
+    coverage = min(window or checkpoint, checkpoint) / len(messages)
+    return updates, completion, coverage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(reply=SUMMARY, first_token_delay=0.0, token_delay=0.0)
+    with server:
+        client = Groq(base_url=server.url, api_key="benchmark")
+        for name, summarize, window in (
+            ("last 10", resummarize_last_10, 10),
+            ("incremental", update_summary, None),
+        ):
+            per_update, totals, coverage = [], [], []
+            early, late = [], []
+            for seed in range(args.conversations):
+                updates, completion, covered = replay(
+                    server, client, args.turns, seed, summarize, window
+                )
+                per_update += updates
+                totals.append(sum(updates) + completion)
+                coverage.append(covered)
+                early += updates[:5]
+                late += updates[-5:]
+            print(
+                f"{name:>11}: {len(per_update) / args.conversations:.0f} updates, "
+                f"{statistics.mean(totals):7.0f} tokens/conversation, "
+                f"prompt {statistics.mean(early):4.0f} -> "
+                f"{statistics.mean(late):4.0f} tokens/update (first -> last 5), "
+                f"summary built from {statistics.mean(coverage):4.0%} of messages"
+            )
+
+
+if __name__ == "__main__":
+    main()
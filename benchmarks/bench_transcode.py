@@ -0,0 +1,113 @@
+"""Encoded size and encode cost of the reply audio at each delivery quality.
+
+Re-encodes provider-style MP3 (24 kHz mono at 48 kbps, what Edge TTS
+returns) with ``transcode.encode`` for every quality and reports, per
+quality: bytes per second of speech and size against the original, CPU
+and wall time of the encode (ffmpeg runs as a child process, so its CPU is
+counted from os.times), and time until the reply can start playing on a
+few link speeds, which for a whole-reply ``st.audio`` blob is the encode
+plus the transfer. Needs ffmpeg on PATH.
+
+    python -m benchmarks.bench_transcode
+    python -m benchmarks.bench_transcode reply.mp3 --qualities original low opus:16k
+
+Defaults to the recordings bench_stt uses, encoded as the provider's MP3
+first.
+"""
+
+import argparse
+import io
+import os
+import time
+
+from pydub import AudioSegment
+
+from benchmarks.bench_stt import DEFAULT_FIXTURES
+from transcode import encode, ffmpeg_available, parse_profile
+
+# Downlink speeds in Mbps, with the connection they stand for
+LINKS = {"2G": 0.05, "slow 3G": 0.4, "3G": 1.6, "4G": 10.0}
+
+
+def provider_mp3(path):
+    """``path`` as the providers' MP3, unless it already is an MP3"""
+    format = os.path.splitext(path)[1].lstrip(".").lower()
+    if format == "mp3":
+        with open(path, "rb") as f:
+            return f.read()
+    segment = AudioSegment.from_file(path, format=format)
+    output = io.BytesIO()
+    segment.set_channels(1).set_frame_rate(24000).export(
+        output, format="mp3", bitrate="48k"
+    )
+    return output.getvalue()
+
+
+def cpu_seconds():
+    """User and system CPU of this process and its waited-for children"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def measure(audio, profile, repeat):
+    """Best-of-``repeat`` encode of ``audio``: (encoded, wall, cpu)"""
+    best = None
+    for _ in range(repeat):
+        cpu = cpu_seconds()
+        start = time.perf_counter()
+        encoded = encode(audio, profile) if not profile.original else audio
+        wall = time.perf_counter() - start
+        cpu = cpu_seconds() - cpu
+        if best is None or wall < best[1]:
+            best = (encoded, wall, cpu)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="*", default=DEFAULT_FIXTURES)
+    parser.add_argument(
+        "--qualities",
+        nargs="+",
+        default=["original", "mp3:32k", "medium", "opus:16k", "low"],
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if not ffmpeg_available():
+        parser.error("ffmpeg is needed to transcode")
+
+    for path in args.inputs:
+        audio = provider_mp3(path)
+        seconds = (
+            len(AudioSegment.from_file(io.BytesIO(audio), format="mp3", codec="mp3"))
+            / 1000
+        )
+        print(
+            f"{os.path.basename(path)}: {seconds:.1f}s of speech, "
+            f"{len(audio) / 1024:.0f} KiB as provider MP3"
+        )
+        print(
+            f"{'quality':>10} {'KiB':>6} {'kbps':>5} {'size':>5} "
+            f"{'CPU ms':>7} {'wall ms':>7} {'x realtime':>10}  time to play (s): "
+            + "  ".join(LINKS)
+        )
+        for quality in args.qualities:
+            profile = parse_profile(quality)
+            encoded, wall, cpu = measure(audio, profile, args.repeat)
+            to_play = "  ".join(
+                f"{wall + len(encoded) * 8 / (mbps * 1e6):.2f}"
+                for mbps in LINKS.values()
+            )
+            speed = f"{seconds / wall:10.0f}" if not profile.original else " " * 10
+            print(
+                f"{str(profile):>10} {len(encoded) / 1024:6.1f} "
+                f"{len(encoded) * 8 / seconds / 1000:5.1f} "
+                f"{len(encoded) / len(audio):5.0%} "
+                f"{cpu * 1000:7.0f} {wall * 1000:7.0f} "
+                f"{speed}  {to_play}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Streamlit script run time and transcript payload vs conversation length.
+
+Loads main9.py in Streamlit's AppTest harness with a synthetic history of
+N turns already in session state and times plain reruns (no new message),
+rendering every message ("all", TRANSCRIPT_PAGE_SIZE=0) or the paginated
+transcript. Also reports the markdown elements and bytes the run emits,
+a proxy for the websocket payload.
+
+    python -m benchmarks.bench_transcript --turns 2 25 100 250
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.bench_keywords import make_text
+from transcript import TRANSCRIPT_PAGE_SIZE, Transcript
+
+APP = os.path.join(os.path.dirname(os.path.dirname(__file__)), "main9.py")
+LABELS = {
+    "user": ("user-message", "👤 You"),
+    "assistant": ("assistant-message", "👩‍💼 Bhumika"),
+}
+
+
+def history(turns):
+    rng = random.Random(turns)
+    messages = [{"role": "assistant", "content": "Hello! I'm Bhumika."}]
+    for _ in range(turns):
+        messages.append({"role": "user", "content": make_text(rng, 25)})
+        messages.append({"role": "assistant", "content": make_text(rng, 120)})
+    return messages
+
+
+def measure(turns, page_size, reruns):
+    app = AppTest.from_file(APP, default_timeout=60)
+    app.session_state["messages"] = history(turns)
+    app.session_state["transcript"] = Transcript(LABELS, page_size=page_size)
+    app.run()
+    times = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        times.append(time.perf_counter() - start)
+    assert not app.exception, app.exception
+    chat = [m.value for m in app.markdown if m.value.startswith("<div class=")]
+    return statistics.median(times), len(chat), sum(len(v.encode()) for v in chat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=[2, 25, 100, 250])
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=TRANSCRIPT_PAGE_SIZE)
+    args = parser.parse_args()
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ["GROQ_WARMUP"] = "0"
+
+    print(f"{'turns':>5} | {'all messages':^32} | {'paginated':^32}")
+    for turns in args.turns:
+        cells = []
+        for page_size in (0, args.page_size):
+            elapsed, elements, size = measure(turns, page_size, args.reruns)
+            cells.append(
+                f"{elapsed * 1000:6.1f} ms {elements:4d} msgs {size / 1024:7.1f} KiB"
+            )
+        print(f"{turns:>5} | " + " | ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+"""Local stand-ins for the remote services the voice assistant talks to.
+
+Every fake runs a server on 127.0.0.1 in a daemon thread, with an
+artificial latency, so benchmarks can exercise the real client code paths
+(Groq SDK, requests, SpeechRecognition, edge-tts) without network access or
+API keys. Delays are medians; ``jitter`` spreads them log-normally to give
+the long tails real services have.
+"""
+
+import base64
+import json
+import os
+import random
+import re
+import ssl
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.server import serve as serve_websocket
+
+DEFAULT_REPLY = (
+    "That's a great question, and I'm glad you asked it. "
+    "The short answer is that it depends on what you want to achieve. "
+    "Let's break it down into a few simple steps you can try this week. "
+    "First, write down the one outcome that matters most to you. "
+    "Then pick the smallest action that moves you towards it. "
+    "Finally, check in with yourself on Friday and celebrate the progress."
+)
+
+
+def make_certificate(directory):
+    """Self-signed certificate for 127.0.0.1 in ``directory``.
+
+    Returns (server PEM holding key and certificate, CA file for clients).
+    """
+    path = os.path.join(directory, "localhost.pem")
+    subprocess.run(
+        [
+            "openssl",
+            "req",
+            "-x509",
+            "-newkey",
+            "rsa:2048",
+            "-nodes",
+            "-days",
+            "1",
+            "-subj",
+            "/CN=127.0.0.1",
+            "-addext",
+            "subjectAltName=IP:127.0.0.1",
+            "-keyout",
+            path,
+            "-out",
+            path + ".crt",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    with open(path, "a") as pem, open(path + ".crt") as crt:
+        pem.write(crt.read())
+    return path, path + ".crt"
+
+
+class _CountingHTTPServer(ThreadingHTTPServer):
+    def process_request(self, request, client_address):
+        self.fake.count_connection()
+        super().process_request(request, client_address)
+
+
+class FakeServer:
+    """Base class: serves ``handler_class`` on an ephemeral local port.
+
+    Pass ``certfile`` (a PEM with certificate and key) to serve HTTPS.
+    ``connections`` counts accepted TCP connections and ``requests`` the
+    requests served over them.
+    """
+
+    handler_class = None
+
+    def __init__(self, certfile=None, jitter=0.0, seed=0):
+        self.httpd = _CountingHTTPServer(("127.0.0.1", 0), self.handler_class)
+        self.httpd.fake = self
+        self.scheme = "http"
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile)
+            self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+            self.scheme = "https"
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"{self.scheme}://{host}:{port}"
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def sleep(self, seconds):
+        """Sleep ``seconds``, scaled by a log-normal factor with median 1"""
+        if self.jitter:
+            seconds *= self.random.lognormvariate(0.0, self.jitter)
+        time.sleep(seconds)
+
+    def fails(self):
+        """Whether this request should fail, at the fake's ``error_rate``"""
+        return self.random.random() < self.error_rate
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY a reused
+    # connection stalls ~40 ms on delayed ACKs, which real servers avoid
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def write_chunk(self, data):
+        """One chunk of a Transfer-Encoding: chunked body; b"" ends it"""
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+
+class _LLMHandler(_QuietHandler):
+    def do_POST(self):
+        fake = self.server.fake
+        fake.count_request()
+        request = self.read_json()
+        reply = fake.reply(request) if callable(fake.reply) else fake.reply
+        words = reply.split(" ")
+        tokens = [w if i == 0 else " " + w for i, w in enumerate(words)]
+        prompt_tokens = len(json.dumps(request.get("messages"))) // 4
+        fake.record_usage(prompt_tokens, len(tokens))
+
+        # Prefill time grows with the prompt, as on the real service
+        fake.sleep(fake.first_token_delay + fake.prompt_token_delay * prompt_tokens)
+        if fake.fails():
+            self.send_json({"error": {"message": "service unavailable"}}, status=503)
+            return
+
+        if not request.get("stream"):
+            time.sleep(fake.token_delay * len(tokens))
+            self.send_json(
+                {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "fake"),
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": reply},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": len(tokens),
+                        "total_tokens": len(tokens),
+                    },
+                }
+            )
+            return
+
+        # Chunked, like the real API, so the connection survives the stream
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, token in enumerate(tokens):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"role": "assistant", "content": token},
+                        "finish_reason": "stop" if i == len(tokens) - 1 else None,
+                    }
+                ],
+            }
+            self.write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+            time.sleep(fake.token_delay)
+        self.write_chunk(b"data: [DONE]\n\n")
+        self.write_chunk(b"")
+
+    def do_GET(self):
+        # Model listing; the client warm-up uses it to open a connection
+        self.server.fake.count_request()
+        self.send_json(
+            {
+                "object": "list",
+                "data": [{"id": "llama-3.3-70b-versatile", "object": "model"}],
+            }
+        )
+
+
+class FakeLLMServer(FakeServer):
+    """OpenAI-compatible chat completions endpoint (streaming and blocking).
+
+    Point the Groq SDK at it with ``Groq(base_url=server.url, api_key="x")``.
+    ``reply`` is the text of every completion, or a function of the request
+    body returning it.
+    Time to first token is ``first_token_delay`` plus ``prompt_token_delay``
+    per prompt token (estimated at 4 characters each); ``prompt_tokens`` and
+    ``completion_tokens`` total the usage of every request served. A
+    fraction ``error_rate`` of requests fail with HTTP 503 instead of
+    streaming, which the SDK retries.
+    """
+
+    handler_class = _LLMHandler
+
+    def __init__(
+        self,
+        reply=DEFAULT_REPLY,
+        first_token_delay=0.3,
+        token_delay=0.02,
+        prompt_token_delay=0.0,
+        error_rate=0.0,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.reply = reply
+        self.error_rate = error_rate
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.prompt_token_delay = prompt_token_delay
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record_usage(self, prompt_tokens, completion_tokens):
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+
+class _PuterHandler(_QuietHandler):
+    def do_POST(self):
+        fake = self.server.fake
+        fake.count_request()
+        text = self.read_json().get("text", "")
+        fake.sleep(fake.base_delay + fake.per_char_delay * len(text))
+        if fake.fails():
+            self.send_json({"error": "service unavailable"}, status=503)
+            return
+        # Roughly 48 kbit/s MP3 at ~15 characters per second of speech
+        audio = b"\xff\xf3" * (fake.audio_bytes // 2 or len(text) * 200)
+        self.send_json(
+            {"audio": {"data": base64.b64encode(audio).decode(), "format": "mp3"}}
+        )
+
+
+class FakePuterServer(FakeServer):
+    """Puter text2speech endpoint; latency grows with the text length.
+
+    A fraction ``error_rate`` of requests fail with HTTP 503 after the same
+    delay; set it to 1.0 to simulate an outage. ``audio_bytes`` fixes the
+    size of every reply instead.
+    """
+
+    handler_class = _PuterHandler
+
+    def __init__(
+        self,
+        base_delay=0.25,
+        per_char_delay=0.002,
+        error_rate=0.0,
+        audio_bytes=0,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.audio_bytes = audio_bytes
+        self.base_delay = base_delay
+        self.per_char_delay = per_char_delay
+        self.error_rate = error_rate
+
+
+class _GoogleSTTHandler(_QuietHandler):
+    def do_POST(self):
+        fake = self.server.fake
+        fake.count_request()
+        length = int(self.headers.get("Content-Length") or 0)
+        # FLAC of 16-bit mono is about half the size of the raw samples
+        rate = int(self.headers.get("Content-Type", "").rpartition("=")[2] or 16000)
+        audio_seconds = length / rate
+        self.rfile.read(length)
+        fake.sleep(fake.base_delay + fake.per_second_delay * audio_seconds)
+        if fake.fails():
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        transcript = fake.random.choice(fake.transcripts)
+        result = {
+            "result": [
+                {
+                    "alternative": [{"transcript": transcript, "confidence": 0.9}],
+                    "final": True,
+                }
+            ],
+            "result_index": 0,
+        }
+        body = ('{"result":[]}\n' + json.dumps(result) + "\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeGoogleSTTServer(FakeServer):
+    """The Google Web Speech API that ``recognize_google`` calls.
+
+    SpeechRecognition has no endpoint setting, but it posts over plain HTTP
+    with urllib, so route urllib through this server as a proxy::
+
+        urllib.request.install_opener(
+            urllib.request.build_opener(
+                urllib.request.ProxyHandler({"http": server.url})
+            )
+        )
+
+    Every request answers with one of ``transcripts`` after ``base_delay``
+    plus ``per_second_delay`` per second of audio (estimated from the FLAC
+    size); a fraction ``error_rate`` fail with HTTP 503 instead.
+    """
+
+    handler_class = _GoogleSTTHandler
+
+    def __init__(
+        self,
+        transcripts=("I want to change careers, where should I start?",),
+        base_delay=0.4,
+        per_second_delay=0.05,
+        error_rate=0.0,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.transcripts = list(transcripts)
+        self.base_delay = base_delay
+        self.per_second_delay = per_second_delay
+        self.error_rate = error_rate
+
+
+EDGE_SSML_TEXT = re.compile(r"<prosody[^>]*>(.*?)</prosody>", re.DOTALL)
+
+
+class FakeEdgeTTSServer:
+    """The Edge read-aloud websocket that edge-tts streams speech from.
+
+    Speaks the service's framing (text ``turn.start``/``turn.end`` messages
+    around binary ``audio`` frames), without TLS. Point edge-tts at it with
+    ``edge_tts.communicate.WSS_URL = server.wss_url``. Audio starts after
+    ``base_delay`` plus ``per_char_delay`` per character and is sent in
+    ``chunk_bytes`` frames; a fraction ``error_rate`` of requests have the
+    connection closed instead.
+    """
+
+    def __init__(
+        self,
+        base_delay=0.3,
+        per_char_delay=0.001,
+        error_rate=0.0,
+        chunk_bytes=4096,
+        jitter=0.0,
+        seed=0,
+    ):
+        self.base_delay = base_delay
+        self.per_char_delay = per_char_delay
+        self.error_rate = error_rate
+        self.chunk_bytes = chunk_bytes
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self.server = serve_websocket(self._handle, "127.0.0.1", 0)
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    sleep = FakeServer.sleep
+    fails = FakeServer.fails
+    count_request = FakeServer.count_request
+    count_connection = FakeServer.count_connection
+
+    @property
+    def url(self):
+        host, port = self.server.socket.getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+    @property
+    def wss_url(self):
+        """Replacement for ``edge_tts.constants.WSS_URL``"""
+        return f"{self.url}/edge/v1?TrustedClientToken=fake"
+
+    def _handle(self, websocket):
+        self.count_connection()
+        try:
+            self._serve(websocket)
+        except ConnectionClosed:
+            # The client gave up, e.g. a hedged request that lost the race
+            pass
+
+    def _serve(self, websocket):
+        for message in websocket:
+            if "Path:ssml" not in message:
+                # speech.config
+                continue
+            self.count_request()
+            match = EDGE_SSML_TEXT.search(message)
+            text = match.group(1) if match else ""
+            self.sleep(self.base_delay + self.per_char_delay * len(text))
+            if self.fails():
+                websocket.close(1011, "service unavailable")
+                return
+            websocket.send("X-RequestId:fake\r\nPath:turn.start\r\n\r\n{}")
+            headers = b"X-RequestId:fake\r\nContent-Type:audio/mpeg\r\nPath:audio\r\n"
+            # Roughly 48 kbit/s MP3 at ~15 characters per second of speech
+            audio = b"\xff\xf3" * (len(text) * 100 or 1)
+            for start in range(0, len(audio), self.chunk_bytes):
+                chunk = audio[start : start + self.chunk_bytes]
+                websocket.send(len(headers).to_bytes(2, "big") + headers + chunk)
+            websocket.send("X-RequestId:fake\r\nPath:turn.end\r\n\r\n{}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
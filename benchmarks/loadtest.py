@@ -0,0 +1,347 @@
+"""Concurrent voice turns against local stand-ins for every provider.
+
+Runs fake Groq, Puter, Edge TTS and Google STT servers in a child process
+(so their CPU isn't counted against the app), points the real clients at
+them and replays WAV utterances through what main7.py does for a recording
+(``process_audio_input``: listen, then answer and speak the reply), using
+the shared engine. Each simulated user has its own VoiceSession and takes
+turns back to back, with ``--think`` seconds (exponentially distributed)
+between them, for ``--duration`` seconds at each concurrency level.
+
+Reports turns per second, p50/p95/p99 of every stage, CPU and RSS of this
+process for each level, plus the same percentiles per span and provider
+from tracing.py (``spans``); set ``OTLP_TRACES_FILE`` to keep the spans; ``--output`` saves it all as JSON to diff across
+releases. Streamlit's per-rerun script cost is not included: this measures
+how many sessions the turn pipeline of one process sustains.
+
+    python -m benchmarks.loadtest --users 1 10 25 50 --duration 30 \\
+        --output loadtest.json
+    python -m benchmarks.loadtest --users 20 --llm-errors 0.05 --jitter 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import threading
+import time
+import urllib.request
+
+from benchmarks.bench_stt import DEFAULT_FIXTURES
+from benchmarks.fakes import (
+    FakeEdgeTTSServer,
+    FakeGoogleSTTServer,
+    FakeLLMServer,
+    FakePuterServer,
+)
+
+STAGES = ("stt", "llm_first_token", "llm", "first_audio", "tts", "total")
+TRANSCRIPTS = (
+    "I want to change careers, where should I start?",
+    "How do I prepare for a technical interview?",
+    "Can you explain what the role involves day to day?",
+    "What salary should I ask for as a junior developer?",
+    "I'm nervous about my first week, any advice?",
+)
+
+
+def percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+    if len(values) == 1:
+        cuts = values * 99
+    else:
+        cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        "p50": round(cuts[49], 4),
+        "p95": round(cuts[94], 4),
+        "p99": round(cuts[98], 4),
+        "mean": round(statistics.fmean(values), 4),
+    }
+
+
+def rss_bytes():
+    """Current resident set size, or None where /proc isn't available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class RSSSampler:
+    """Peak RSS seen while running, sampled every ``interval`` seconds"""
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.peak = rss_bytes() or 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes() or 0)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def serve_fakes(options, connection):
+    """Child process: run the fakes until told to stop, reporting counters"""
+    fakes = {
+        "llm": FakeLLMServer(
+            first_token_delay=options["llm_first_token"],
+            token_delay=options["llm_token"],
+            error_rate=options["llm_errors"],
+            jitter=options["jitter"],
+        ),
+        "puter": FakePuterServer(
+            base_delay=options["puter_delay"],
+            error_rate=options["puter_errors"],
+            jitter=options["jitter"],
+        ),
+        "edge": FakeEdgeTTSServer(
+            base_delay=options["edge_delay"],
+            error_rate=options["edge_errors"],
+            jitter=options["jitter"],
+        ),
+        "stt": FakeGoogleSTTServer(
+            transcripts=TRANSCRIPTS,
+            base_delay=options["stt_delay"],
+            error_rate=options["stt_errors"],
+            jitter=options["jitter"],
+        ),
+    }
+    for fake in fakes.values():
+        fake.__enter__()
+    connection.send(
+        {
+            "llm": fakes["llm"].url,
+            "puter": fakes["puter"].url,
+            "edge": fakes["edge"].wss_url,
+            "stt": fakes["stt"].url,
+        }
+    )
+    while connection.recv() == "requests":
+        connection.send({name: fake.requests for name, fake in fakes.items()})
+    for fake in fakes.values():
+        fake.__exit__(None, None, None)
+
+
+def point_clients_at(urls):
+    """Send every provider call of this process to the fakes"""
+    # Read when llm.py and tts.py are imported
+    os.environ["GROQ_BASE_URL"] = urls["llm"]
+    os.environ["GROQ_API_KEY"] = "loadtest"
+    os.environ["GROQ_WARMUP"] = "0"
+    os.environ["PUTER_TTS_URL"] = urls["puter"]
+    os.environ["STT_BACKEND"] = "google"
+
+    import edge_tts.communicate
+
+    edge_tts.communicate.WSS_URL = urls["edge"]
+    # recognize_google posts to a fixed plain-HTTP URL with urllib
+    urllib.request.install_opener(
+        urllib.request.build_opener(urllib.request.ProxyHandler({"http": urls["stt"]}))
+    )
+
+
+async def user(number, utterances, deadline, think, samples):
+    import speech_recognition as sr
+
+    from engine import PRIYA, VoiceSession
+
+    rng = random.Random(number)
+    loop = asyncio.get_running_loop()
+    session = VoiceSession(PRIYA)
+    # Users don't all start talking in the same instant
+    await asyncio.sleep(rng.uniform(0, think))
+    while time.monotonic() < deadline:
+        try:
+            text = await loop.run_in_executor(
+                None, session.listen, rng.choice(utterances)
+            )
+        except (sr.UnknownValueError, sr.RequestError) as e:
+            samples.append({"error": f"stt: {type(e).__name__}"})
+            await asyncio.sleep(rng.expovariate(1 / think) if think else 0)
+            continue
+        result = await session.turn(text)
+        sample = {"timings": result.timings, "bytes": sum(map(len, result.clips))}
+        if result.error is not None:
+            sample["error"] = f"turn: {type(result.error).__name__}"
+        samples.append(sample)
+        await asyncio.sleep(rng.expovariate(1 / think) if think else 0)
+
+
+async def run_level(users, utterances, duration, think):
+    samples = []
+    deadline = time.monotonic() + duration
+    await asyncio.gather(
+        *(user(n, utterances, deadline, think, samples) for n in range(users))
+    )
+    return samples
+
+
+def measure(users, utterances, args, fakes):
+    from pipeline import run_sync
+    from tracing import stage_metrics
+
+    stage_metrics.reset()
+    fakes.send("requests")
+    before = fakes.recv()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    with RSSSampler() as rss:
+        samples = run_sync(run_level(users, utterances, args.duration, args.think))
+    elapsed = time.perf_counter() - start
+    end_usage = resource.getrusage(resource.RUSAGE_SELF)
+    fakes.send("requests")
+    after = fakes.recv()
+
+    cpu = (end_usage.ru_utime - usage.ru_utime) + (end_usage.ru_stime - usage.ru_stime)
+    turns = [s for s in samples if "timings" in s]
+    errors = {}
+    for sample in samples:
+        if "error" in sample:
+            errors[sample["error"]] = errors.get(sample["error"], 0) + 1
+    return {
+        "users": users,
+        "elapsed": round(elapsed, 3),
+        "turns": len(turns),
+        "failed_turns": sum(errors.values()),
+        "errors": errors,
+        "throughput": round(len(turns) / elapsed, 3),
+        "stages": {
+            stage: percentiles(
+                [s["timings"][stage] for s in turns if stage in s["timings"]]
+            )
+            for stage in STAGES
+        },
+        "spans": stage_metrics.report(),
+        "audio_bytes": sum(s.get("bytes", 0) for s in samples),
+        "cpu": {
+            "seconds": round(cpu, 3),
+            # Cores busy on average; 1.0 is one core fully used
+            "utilization": round(cpu / elapsed, 3),
+        },
+        "rss_mb": {
+            "end": round((rss_bytes() or 0) / 2**20, 1),
+            "peak": round(rss.peak / 2**20, 1),
+        },
+        "provider_requests": {name: after[name] - before[name] for name in after},
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_level(level):
+    stages = level["stages"]
+    cells = "  ".join(
+        f"{stage} {stages[stage]['p50']:.2f}/{stages[stage]['p95']:.2f}"
+        f"/{stages[stage]['p99']:.2f}"
+        for stage in ("stt", "first_audio", "total")
+        if stages[stage]
+    )
+    print(
+        f"{level['users']:>5} users: {level['throughput']:6.2f} turns/s "
+        f"({level['turns']} turns, {level['failed_turns']} failed)  {cells}  "
+        f"CPU {level['cpu']['utilization']:.2f} cores  "
+        f"RSS {level['rss_mb']['peak']:.0f} MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("wavs", nargs="*", default=DEFAULT_FIXTURES)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 5, 10, 25])
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--think", type=float, default=2.0)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--label", default="", help="stored with the results")
+    fakes = parser.add_argument_group("providers (seconds are medians)")
+    fakes.add_argument("--jitter", type=float, default=0.3, help="log-normal sigma")
+    fakes.add_argument("--stt-delay", type=float, default=0.4)
+    fakes.add_argument("--stt-errors", type=float, default=0.0)
+    fakes.add_argument("--llm-first-token", type=float, default=0.3)
+    fakes.add_argument("--llm-token", type=float, default=0.02)
+    fakes.add_argument("--llm-errors", type=float, default=0.0)
+    fakes.add_argument("--puter-delay", type=float, default=0.25)
+    fakes.add_argument("--puter-errors", type=float, default=0.0)
+    fakes.add_argument("--edge-delay", type=float, default=0.3)
+    fakes.add_argument("--edge-errors", type=float, default=0.0)
+    args = parser.parse_args()
+
+    utterances = []
+    for path in args.wavs:
+        with open(path, "rb") as f:
+            utterances.append(f.read())
+    if not utterances:
+        parser.error("no WAV utterances to replay")
+
+    connection, child_connection = multiprocessing.Pipe()
+    child = multiprocessing.Process(
+        target=serve_fakes, args=(vars(args), child_connection), daemon=True
+    )
+    child.start()
+    point_clients_at(connection.recv())
+
+    import tts
+    from tts_cache import TTSCache
+
+    # Every turn should reach the TTS providers
+    tts.audio_cache = TTSCache(max_memory_bytes=0)
+
+    levels = []
+    try:
+        for users in args.users:
+            level = measure(users, utterances, args, connection)
+            print_level(level)
+            levels.append(level)
+    finally:
+        connection.send("stop")
+        child.join()
+
+    if args.output:
+        result = {
+            "label": args.label,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "config": {
+                key: value
+                for key, value in vars(args).items()
+                if key not in ("output", "label")
+            },
+            "levels": levels,
+        }
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
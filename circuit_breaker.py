@@ -0,0 +1,133 @@
+import logging
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Process-wide closed/open/half-open breaker for one provider.
+
+    The breaker opens after ``failure_threshold`` consecutive bad calls,
+    where a call slower than ``slow_call_seconds`` counts as bad even if it
+    succeeded. While open, ``allow_request`` returns False so callers can go
+    straight to a fallback. After ``reset_timeout`` seconds a single probe
+    request is let through (half-open): success closes the breaker, failure
+    re-opens it for another ``reset_timeout``. A probe dropped before it ran
+    should be reported with ``record_cancelled``; one that goes unreported
+    for ``reset_timeout`` anyway is given up on and another is let through.
+
+    ``health`` is an exponentially weighted success rate in [0, 1] for
+    dashboards; it does not drive state changes.
+    """
+
+    def __init__(
+        self,
+        name,
+        failure_threshold=3,
+        slow_call_seconds=None,
+        reset_timeout=30.0,
+        health_decay=0.2,
+        clock=time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self.health_decay = health_decay
+        self.clock = clock
+
+        self.health = 1.0
+        self.trips = 0
+        self.rejected = 0
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def allow_request(self):
+        """Whether the caller may use the provider right now"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if (
+                self._state == OPEN
+                and self.clock() - self._opened_at >= self.reset_timeout
+            ):
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if (
+                self._state == HALF_OPEN
+                and self._probe_in_flight
+                and self.clock() - self._probe_started >= self.reset_timeout
+            ):
+                logging.warning(
+                    "%s circuit probe unreported for %.0fs, probing again",
+                    self.name,
+                    self.reset_timeout,
+                )
+                self._probe_in_flight = False
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self._probe_started = self.clock()
+                logging.info("%s circuit half-open, probing", self.name)
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, elapsed=None):
+        if (
+            elapsed is not None
+            and self.slow_call_seconds is not None
+            and elapsed > self.slow_call_seconds
+        ):
+            self.record_failure(reason=f"slow call ({elapsed:.2f}s)")
+            return
+        with self._lock:
+            self._update_health(1.0)
+            self._failures = 0
+            if self._state != CLOSED:
+                logging.info("%s circuit closed", self.name)
+            self._state = CLOSED
+            self._probe_in_flight = False
+
+    def record_cancelled(self):
+        """A call let through was dropped before it reached the provider.
+
+        Says nothing about the provider, except that a dropped probe counts
+        as a failed one, so the breaker doesn't wait for its outcome forever.
+        """
+        with self._lock:
+            probe = self._state == HALF_OPEN and self._probe_in_flight
+        if probe:
+            self.record_failure(reason="cancelled probe")
+
+    def record_failure(self, reason="error"):
+        with self._lock:
+            self._update_health(0.0)
+            self._failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self.failure_threshold
+            ):
+                logging.warning(
+                    "%s circuit open for %.0fs after %s",
+                    self.name,
+                    self.reset_timeout,
+                    reason,
+                )
+                self._state = OPEN
+                self._opened_at = self.clock()
+                self._probe_in_flight = False
+                self.trips += 1
+
+    def _update_health(self, outcome):
+        self.health += self.health_decay * (outcome - self.health)
@@ -0,0 +1,255 @@
+"""Conversation intelligence calls for main9.py: summaries and follow-ups.
+
+Nothing here touches Streamlit state, so these can run on worker threads.
+They either make their own LLM round trip ("separate" mode) or are folded
+into the reply request as one structured call ("combined" mode): the model
+answers with a JSON object whose ``reply`` is streamed to TTS as it
+arrives, and whose ``follow_up_questions`` and, when due, ``summary`` are
+validated afterwards, falling back to the separate calls if invalid.
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass
+
+from tracing import span
+
+MODEL = "llama-3.3-70b-versatile"
+
+FALLBACK_FOLLOW_UP_QUESTIONS = [
+    "What specific aspect would you like to explore further?",
+    "How does this align with your career goals?",
+    "What's your timeline for this?",
+]
+
+# Static, so it can sit right after the persona in the cacheable prefix
+COMBINED_INSTRUCTIONS = """RESPONSE FORMAT:
+Answer with a single JSON object and nothing else, with the keys in this order:
+{"reply": "<your spoken reply to the user>", "follow_up_questions": ["<question 1>", "<question 2>", "<question 3>"], "summary": null}
+- "reply" is exactly what you would otherwise have said, written as plain text.
+- "follow_up_questions" are 3 short questions you could ask next to better understand the user's needs.
+- "summary" stays null unless you are asked for one below."""
+
+SUMMARY_REQUEST = 'Also set "summary" to a brief 2-3 sentence summary of the key topics and user goals of the conversation so far, including this turn: the CONVERSATION CONTEXT summary above, if any, updated with the messages since.'
+
+_REPLY_KEY = re.compile(r'"reply"\s*:\s*"')
+_CODE_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+
+def summary_due(messages):
+    """Whether the rolling conversation summary should be refreshed now"""
+    return len(messages) % 5 == 0 and len(messages) > 5
+
+
+def summarize_conversation(client, summary, new_messages):
+    """Fold the messages since the last summary into the running summary.
+
+    Only the previous summary and ``new_messages`` are sent, so every update
+    costs about the same however long the conversation gets, and nothing
+    said before the latest messages is forgotten. Raises on failure; the
+    caller keeps the old summary and retries with the same messages later.
+    """
+    conversation_text = "\n".join(
+        [f"{msg['role']}: {msg['content'][:200]}" for msg in new_messages]
+    )
+
+    with span(
+        "summary", provider="groq", bytes_in=len(conversation_text.encode())
+    ) as call:
+        response = client.chat.completions.create(
+            model=MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are a conversation summarizer. Update the existing summary with the new messages into a brief 2-3 sentence summary of the key topics and user goals of the whole conversation.",
+                },
+                {
+                    "role": "user",
+                    "content": f"Existing summary:\n{summary or '(none yet)'}\n\nNew messages:\n{conversation_text}",
+                },
+            ],
+            max_tokens=150,
+            temperature=0.3,
+        )
+        summary = response.choices[0].message.content.strip()
+        call.set(bytes_out=len(summary.encode()))
+    return summary
+
+
+def update_summary(client, summary, messages, checkpoint):
+    """Summarize ``messages[checkpoint:]`` into ``summary``.
+
+    Returns ``(summary, checkpoint)`` with the checkpoint moved past the
+    messages now covered.
+    """
+    summary = summarize_conversation(client, summary, messages[checkpoint:])
+    return summary, len(messages)
+
+
+def generate_follow_up_questions(client, user_message, conversation_context):
+    """Generate smart follow-up questions based on conversation"""
+    try:
+        prompt = f"""Based on this conversation context and the user's last message, generate 3 relevant follow-up questions that Bhumika (an HR professional) would ask to better understand the user's needs.
+
+Conversation context: {conversation_context}
+User's last message: {user_message}
+
+Return ONLY a JSON array of 3 questions, nothing else. Format: ["question 1", "question 2", "question 3"]"""
+
+        with span("follow_ups", provider="groq", bytes_in=len(prompt.encode())) as call:
+            response = client.chat.completions.create(
+                model=MODEL,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a helpful assistant that generates follow-up questions. Return only valid JSON.",
+                    },
+                    {"role": "user", "content": prompt},
+                ],
+                max_tokens=200,
+                temperature=0.7,
+            )
+            result = response.choices[0].message.content.strip()
+            call.set(bytes_out=len(result.encode()))
+        # Clean up potential markdown formatting
+        result = result.replace("```json", "").replace("```", "").strip()
+
+        questions = json.loads(result)
+        return questions[:3]
+    except Exception as e:
+        logging.error(f"Follow-up generation error: {e}")
+        return list(FALLBACK_FOLLOW_UP_QUESTIONS)
+
+
+@dataclass
+class CombinedReply:
+    """Validated fields of a combined response; None where invalid or absent"""
+
+    reply: str = None
+    follow_up_questions: list = None
+    summary: str = None
+
+
+def parse_combined_reply(text, want_summary=False):
+    """Strictly validate a combined JSON response, field by field"""
+    result = CombinedReply()
+    try:
+        data = json.loads(_CODE_FENCE.sub("", text))
+    except ValueError as e:
+        logging.warning(f"Combined response is not valid JSON: {e}")
+        return result
+    if not isinstance(data, dict):
+        logging.warning("Combined response is not a JSON object")
+        return result
+
+    reply = data.get("reply")
+    if isinstance(reply, str) and reply.strip():
+        result.reply = reply.strip()
+
+    questions = data.get("follow_up_questions")
+    if (
+        isinstance(questions, list)
+        and questions
+        and all(isinstance(q, str) and q.strip() for q in questions)
+    ):
+        result.follow_up_questions = [q.strip() for q in questions[:3]]
+    else:
+        logging.warning(
+            f"Invalid follow_up_questions in combined response: {questions!r}"
+        )
+
+    summary = data.get("summary")
+    if want_summary:
+        if isinstance(summary, str) and summary.strip():
+            result.summary = summary.strip()
+        else:
+            logging.warning(f"Missing summary in combined response: {summary!r}")
+    return result
+
+
+class CombinedReplyStream:
+    """Pull the ``reply`` string out of a streamed combined JSON response.
+
+    ``iter_reply(deltas)`` yields the decoded reply text as soon as it
+    arrives, so sentences can go to TTS before the JSON is complete. If the
+    model ignores the format and answers in plain text, that text is passed
+    through unchanged. ``result()`` validates the whole response afterwards.
+    """
+
+    def __init__(self):
+        self.raw = ""
+        self.plain_text = False
+        self._pos = 0
+        self._state = "start"
+
+    def iter_reply(self, deltas):
+        for delta in deltas:
+            text = self.feed(delta)
+            if text:
+                yield text
+
+    def feed(self, delta):
+        """Add a delta of the raw response; returns new reply text"""
+        self.raw += delta
+        if self._state == "start":
+            stripped = self.raw.lstrip()
+            if not stripped or (len(stripped) < 3 and "```".startswith(stripped)):
+                return ""
+            if not stripped.startswith(("{", "```")):
+                self.plain_text = True
+                self._state = "plain"
+            else:
+                self._state = "seek"
+        if self._state == "plain":
+            text, self._pos = self.raw[self._pos :], len(self.raw)
+            return text
+        if self._state == "seek":
+            match = _REPLY_KEY.search(self.raw, self._pos)
+            if match is None:
+                return ""
+            self._pos = match.end()
+            self._state = "reply"
+        if self._state == "reply":
+            return self._scan_reply()
+        return ""
+
+    def _scan_reply(self):
+        parts = []
+        raw, i = self.raw, self._pos
+        while i < len(raw):
+            char = raw[i]
+            if char == '"':
+                self._state = "done"
+                i += 1
+                break
+            if char != "\\":
+                end = i
+                while end < len(raw) and raw[end] not in '"\\':
+                    end += 1
+                parts.append(raw[i:end])
+                i = end
+                continue
+            # An escape; wait for the rest of it if it is split across deltas
+            length = 2
+            if raw[i + 1 : i + 2] == "u":
+                length = 6
+                # A surrogate pair (emoji) is two escapes that decode together
+                if "d800" <= raw[i + 2 : i + 6].lower() < "dc00":
+                    length = 12
+            if i + length > len(raw):
+                break
+            try:
+                parts.append(json.loads(f'"{raw[i:i + length]}"'))
+            except ValueError:
+                parts.append(raw[i + 1 : i + length])
+            i += length
+        self._pos = i
+        return "".join(parts)
+
+    def result(self, want_summary=False):
+        """Validated fields of the complete response (all None for plain text)"""
+        if self.plain_text:
+            logging.warning("Combined response was plain text, not JSON")
+            return CombinedReply()
+        return parse_combined_reply(self.raw, want_summary)
@@ -0,0 +1,323 @@
+"""The voice turn engine shared by the Streamlit apps and server.py.
+
+Speech to text, the streamed Groq reply and per-sentence TTS, with no
+Streamlit in sight: the apps keep their UI and session state and call in
+here for the work, and the HTTP/WebSocket server drives the same code
+directly. ``VoiceSession`` is one whole conversation; ``Listener`` and
+``stream_reply`` are the pieces for callers that keep the conversation
+themselves, like main9.py.
+"""
+
+import asyncio
+import io
+import logging
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass
+
+import speech_recognition as sr
+
+from background import executor as background_executor
+from history import HistoryWindow, llm_summarizer
+from llm import get_client, request_slot
+from personas import BHUMIKA_PERSONA, PRIYA_PERSONA
+from pipeline import (
+    TurnPipeline,
+    TurnResult,
+    run_in_executor,
+    run_sync_streaming,
+)
+from streaming import iter_text_deltas
+from stt import estimate_energy_threshold, transcribe, trim_silence
+from tracing import annotate, session, span
+from transcode import ORIGINAL, transcode
+from tts import synthesize
+
+MODEL = "llama-3.3-70b-versatile"
+MAX_TOKENS = 1024
+# Cut silence around recordings before STT; off, since a word that starts
+# softly can be cut with it
+STT_TRIM_SILENCE = os.getenv("STT_TRIM_SILENCE", "off").lower() in ("1", "true", "on")
+
+# Strip emojis and special characters before TTS
+EMOJI_PATTERN = re.compile(
+    "["
+    "\U0001f600-\U0001f64f"  # emoticons
+    "\U0001f300-\U0001f5ff"  # symbols & pictographs
+    "\U0001f680-\U0001f6ff"  # transport & map symbols
+    "\U0001f1e0-\U0001f1ff"  # flags (iOS)
+    "\U00002702-\U000027b0"
+    "\U000024c2-\U0001f251"
+    "\U0001f900-\U0001f9ff"  # supplemental symbols
+    "\U0001fa00-\U0001faff"  # more symbols
+    "]+",
+    flags=re.UNICODE,
+)
+
+
+@dataclass(frozen=True)
+class Persona:
+    name: str
+    system_prompt: str
+    greeting: str
+    voice: str
+    # Drop emojis before TTS, for personas that use them
+    clean_speech: bool = False
+
+
+PRIYA = Persona(
+    name="Priya",
+    system_prompt=PRIYA_PERSONA,
+    greeting="Hello, I am Priya. How can I help you?",
+    voice="en-US-AriaNeural",
+)
+BHUMIKA = Persona(
+    name="Bhumika",
+    system_prompt=BHUMIKA_PERSONA,
+    greeting="Hello! I'm Bhumika Prasad, Head of Talent Acquisition at 100x. How can I help you today?",
+    voice="en-IN-NeerjaNeural",
+    clean_speech=True,
+)
+PERSONAS = {"priya": PRIYA, "bhumika": BHUMIKA}
+# Edge TTS voices clients may pick, by label
+VOICES = {
+    "Aria (Female, US)": "en-US-AriaNeural",
+    "Jenny (Female, US)": "en-US-JennyNeural",
+    "Guy (Male, US)": "en-US-GuyNeural",
+    "Sonia (Female, UK)": "en-GB-SoniaNeural",
+    "Ryan (Male, UK)": "en-GB-RyanNeural",
+    "Neerja (Female, India)": "en-IN-NeerjaNeural",
+    "Prabhat (Male, India)": "en-IN-PrabhatNeural",
+}
+
+
+def clean_for_speech(text):
+    """Remove emojis and collapse whitespace so TTS reads only the words"""
+    clean_text = EMOJI_PATTERN.sub("", text)
+    return " ".join(clean_text.split())
+
+
+def synthesize_speech(text, voice, clean=False):
+    """Thread-safe TTS for a piece of reply text; None if nothing to say"""
+    if clean:
+        text = clean_for_speech(text)
+    if not text:
+        return None
+    return synthesize(text, voice)
+
+
+def apology(error):
+    return f"I apologize, but I encountered an error: {str(error)}"
+
+
+class Listener:
+    """Speech to text for one conversation.
+
+    Keeps one recognizer across turns. With ``trim`` (``STT_TRIM_SILENCE``),
+    leading and trailing silence is cut before the audio goes to the STT
+    backend, against a noise floor estimated from each recording on its
+    own, so a loud first recording can't make later, quieter ones lose
+    speech.
+    """
+
+    def __init__(self, trim=STT_TRIM_SILENCE):
+        self.recognizer = sr.Recognizer()
+        # Adjust recognizer settings for better accuracy
+        self.recognizer.energy_threshold = 300
+        self.recognizer.dynamic_energy_threshold = True
+        self.recognizer.pause_threshold = 0.8
+        self.trim = trim
+        # (text, seconds) of the last listen(), until a turn claims it
+        self.last_heard = None
+
+    def listen(self, wav_bytes):
+        """Text spoken in a WAV recording.
+
+        Raises ``sr.UnknownValueError`` when nothing intelligible was said
+        and ``sr.RequestError`` when the STT service fails.
+        """
+        self.last_heard = None
+        start = time.perf_counter()
+        with span("listen", bytes_in=len(wav_bytes)) as listen:
+            # Decode the WAV straight from memory
+            with sr.AudioFile(io.BytesIO(wav_bytes)) as source:
+                audio = self.recognizer.record(source)
+
+            if self.trim:
+                threshold = estimate_energy_threshold(audio)
+                if threshold:
+                    audio = trim_silence(audio, threshold)
+            text = transcribe(audio).text
+            listen.set(bytes_out=len(text.encode()))
+        self.last_heard = (text, time.perf_counter() - start)
+        return text
+
+    def stt_seconds(self, user_text):
+        """How long ``listen`` took to hear ``user_text``, or None if it was typed.
+
+        Each recording is claimed once, by the turn that answers it.
+        """
+        heard, self.last_heard = self.last_heard, None
+        if heard is not None and heard[0] == user_text:
+            return heard[1]
+        return None
+
+
+async def stream_reply(
+    client,
+    messages,
+    voice,
+    max_tokens=MAX_TOKENS,
+    transform=None,
+    clean_speech=False,
+    on_sentence=None,
+    on_clip=None,
+    profile=ORIGINAL,
+):
+    """Stream a reply to ``messages`` and speak it sentence by sentence.
+
+    ``voice=None`` skips TTS. ``transform`` may rewrite the stream of text
+    deltas (main9's combined mode pulls the reply out of a JSON object).
+    Each clip is transcoded to ``profile`` (see transcode.py) as it is made;
+    Opus clips are separate Ogg files, so don't join them into one.
+    If the reply fails before any text arrived, the result's reply is an
+    apology, spoken in place of it, and ``error`` is still set.
+    """
+
+    def complete(_):
+        annotate(provider="groq", model=MODEL)
+        stream = client.chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=0.7,
+            stream=True,
+        )
+        deltas = iter_text_deltas(stream)
+        return transform(deltas) if transform is not None else deltas
+
+    def speak(sentence):
+        if not voice:
+            return None
+        return transcode(synthesize_speech(sentence, voice, clean_speech), profile)
+
+    pipeline = TurnPipeline(
+        complete=complete, synthesize=speak, complete_slot=request_slot
+    )
+    result = await pipeline.run(
+        on_clip=on_clip, on_sentence=on_sentence, prompt_ready=True
+    )
+    if result.error is not None and not result.reply:
+        logging.error("AI Response error: %s", result.error)
+        result.reply = apology(result.error)
+        if on_sentence is not None:
+            on_sentence(result.reply)
+        try:
+            audio = await run_in_executor(
+                asyncio.get_running_loop(), speak, result.reply
+            )
+        except Exception as e:
+            logging.error("TTS Error: %s", e)
+            audio = None
+        result.clips = [audio] if audio else []
+        if audio and on_clip is not None:
+            on_clip(audio)
+    return result
+
+
+def reply_sync(client, messages, voice, on_clip=None, **options):
+    """``stream_reply`` for callers outside an event loop, like Streamlit.
+
+    ``on_clip`` is called on the calling thread as each clip is ready.
+    """
+    return run_sync_streaming(
+        lambda emit: stream_reply(client, messages, voice, on_clip=emit, **options),
+        on_clip,
+    )
+
+
+class VoiceSession:
+    """One conversation with a persona: its messages, history and listener.
+
+    Not thread-safe; run one turn at a time per session. ``id`` tags the
+    session's spans (see tracing.py); ``audio_profile`` is the encoding of
+    the clips ``turn`` hands to ``on_clip`` (see transcode.py).
+    """
+
+    def __init__(
+        self, persona=PRIYA, client=None, executor=background_executor, id=None
+    ):
+        self.id = id or uuid.uuid4().hex
+        self.persona = persona
+        self.client = client or get_client()
+        self.voice = persona.voice
+        self.audio_profile = ORIGINAL
+        self.listener = Listener()
+        self.history_window = HistoryWindow(
+            summarize=llm_summarizer(self.client), executor=executor
+        )
+        self.messages = []
+        self.last_timings = {}
+        self.reset()
+
+    def reset(self):
+        self.messages = [{"role": "assistant", "content": self.persona.greeting}]
+        self.history_window.reset()
+
+    def listen(self, wav_bytes):
+        with session(self.id):
+            return self.listener.listen(wav_bytes)
+
+    def build_messages(self):
+        """The conversation history sent to Groq.
+
+        Only the most recent turns that fit the token budget are sent
+        verbatim; older ones reach the model as a rolling summary.
+        """
+        return [
+            {"role": "system", "content": self.persona.system_prompt}
+        ] + self.history_window.build(self.messages)
+
+    async def turn(
+        self, user_text, speak=True, on_sentence=None, on_clip=None, profile=None
+    ):
+        """Answer ``user_text``; returns the TurnResult, reply included.
+
+        ``profile`` overrides ``audio_profile`` for this turn.
+        """
+        self.messages.append({"role": "user", "content": user_text})
+        with session(self.id):
+            try:
+                messages = self.build_messages()
+            except Exception as e:
+                logging.error("AI Response error: %s", e)
+                result = TurnResult(user_text=user_text, reply=apology(e), error=e)
+            else:
+                result = await stream_reply(
+                    self.client,
+                    messages,
+                    self.voice if speak else None,
+                    clean_speech=self.persona.clean_speech,
+                    on_sentence=on_sentence,
+                    on_clip=on_clip,
+                    profile=profile or self.audio_profile,
+                )
+                result.user_text = user_text
+        stt = self.listener.stt_seconds(user_text)
+        if stt is not None:
+            result.include_stt(stt)
+        self.messages.append({"role": "assistant", "content": result.reply})
+        self.last_timings = result.timings
+        return result
+
+    def turn_sync(self, user_text, speak=True, on_clip=None, profile=None):
+        """``turn`` for callers outside an event loop, like Streamlit.
+
+        ``on_clip`` is called on the calling thread as each clip is ready.
+        """
+        return run_sync_streaming(
+            lambda emit: self.turn(user_text, speak, on_clip=emit, profile=profile),
+            on_clip,
+        )
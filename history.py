@@ -0,0 +1,200 @@
+import contextvars
+import logging
+import os
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+from tracing import span
+
+# Prompt tokens of verbatim conversation history sent per turn
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+# When the window overflows, fold older turns until it is back under this
+# fraction of the budget, so the summarizer runs every few turns rather
+# than on every one
+HISTORY_LOW_WATERMARK = 0.6
+# Role markers and separators the chat template adds around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_MODEL = "llama-3.3-70b-versatile"
+SUMMARY_MAX_TOKENS = 200
+# Longest excerpt of a single message handed to the summarizer
+SUMMARY_MESSAGE_CHARS = 1000
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    # cl100k is not Llama's tokenizer, but within a few percent of it on
+    # English chat text, which is all a budget needs
+    return tiktoken.get_encoding("cl100k_base") if tiktoken else None
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text):
+    """Approximate token count of ``text``, cached per distinct string.
+
+    Uses tiktoken when it is installed and ~4 characters per token
+    otherwise.
+    """
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message):
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def prompt_tokens(messages):
+    return sum(message_tokens(message) for message in messages)
+
+
+class HistoryWindow:
+    """Token-budgeted view of one conversation for the LLM prompt.
+
+    ``build`` returns the most recent messages that fit in ``budget``
+    tokens, preceded by a system message with a rolling summary of
+    everything older. Older turns are folded into the summary by
+    ``summarize(previous_summary, messages) -> str`` in batches; without a
+    summarizer (or if it fails) they are simply left out. Keep one window
+    per conversation, e.g. in session state.
+
+    Given an ``executor``, folding runs there instead of inside ``build``:
+    the turns that overflow are left out until a later ``build`` finds the
+    new summary ready, so the reply never waits for the summarizer.
+    """
+
+    def __init__(self, budget=HISTORY_TOKEN_BUDGET, summarize=None, executor=None):
+        self.budget = budget
+        self.summarize = summarize
+        self.executor = executor
+        self.summary = ""
+        # messages[:folded] are represented by the summary
+        self.folded = 0
+        # (future, end) of a fold running on the executor
+        self._pending = None
+
+    def reset(self):
+        self.summary = ""
+        self.folded = 0
+        if self._pending is not None:
+            self._pending[0].cancel()
+            self._pending = None
+
+    def build(self, messages):
+        if len(messages) < self.folded:
+            # The conversation was cleared or replaced
+            self.reset()
+        self._collect_fold()
+
+        start = self._window_start(messages, self.budget)
+        if start > self.folded and self._pending is None:
+            low = self._window_start(messages, self.budget * HISTORY_LOW_WATERMARK)
+            if self._fold(messages, low):
+                start = low
+
+        window = list(messages[start:])
+        if self.summary:
+            window.insert(
+                0,
+                {
+                    "role": "system",
+                    "content": f"Summary of the earlier conversation: {self.summary}",
+                },
+            )
+        return window
+
+    def _window_start(self, messages, budget):
+        """Index of the oldest message that still fits in ``budget``.
+
+        The latest message is always included, and a window cut short by
+        the budget starts on a user turn so the model never sees a reply
+        without its question.
+        """
+        start = len(messages)
+        total = 0
+        while start > self.folded:
+            cost = message_tokens(messages[start - 1])
+            if total + cost > budget and start < len(messages):
+                break
+            total += cost
+            start -= 1
+        if start == self.folded:
+            return start
+        while start < len(messages) - 1 and messages[start]["role"] != "user":
+            start += 1
+        return start
+
+    def _fold(self, messages, end):
+        """Fold messages[folded:end] into the summary; True if done already"""
+        if self.summarize is None:
+            return False
+        batch = list(messages[self.folded : end])
+        if self.executor is not None:
+            # In this turn's context, so its span carries the session id
+            future = self.executor.submit(
+                contextvars.copy_context().run, self.summarize, self.summary, batch
+            )
+            self._pending = (future, end)
+            return False
+        try:
+            summary = self.summarize(self.summary, batch)
+        except Exception as e:
+            logging.warning("History summary failed, dropping older turns: %s", e)
+            return False
+        self.summary = summary.strip()
+        self.folded = end
+        return True
+
+    def _collect_fold(self):
+        if self._pending is None or not self._pending[0].done():
+            return
+        future, end = self._pending
+        self._pending = None
+        try:
+            summary = future.result()
+        except Exception as e:
+            logging.warning("History summary failed, dropping older turns: %s", e)
+            return
+        self.summary = summary.strip()
+        self.folded = end
+
+
+def llm_summarizer(client, model=SUMMARY_MODEL):
+    """A ``summarize`` callable for HistoryWindow backed by a chat model.
+
+    Each call sends only the previous summary and the newly folded
+    messages, so its cost doesn't grow with the conversation.
+    """
+
+    def summarize(summary, messages):
+        transcript = "\n".join(
+            f"{message['role']}: {message['content'][:SUMMARY_MESSAGE_CHARS]}"
+            for message in messages
+        )
+        with span(
+            "history_summary", provider="groq", bytes_in=len(transcript.encode())
+        ) as call:
+            response = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You maintain a running summary of a conversation. Merge the new messages into the existing summary in at most 5 sentences, keeping the user's goals, facts they shared and any advice already given.",
+                    },
+                    {
+                        "role": "user",
+                        "content": f"Existing summary:\n{summary or '(none yet)'}\n\nNew messages:\n{transcript}",
+                    },
+                ],
+                max_tokens=SUMMARY_MAX_TOKENS,
+                temperature=0.3,
+            )
+            summary = response.choices[0].message.content
+            call.set(bytes_out=len(summary.encode()))
+        return summary
+
+    return summarize
@@ -0,0 +1,51 @@
+import os
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+HTTP_RETRY_BACKOFF_MAX = float(os.getenv("HTTP_RETRY_BACKOFF_MAX", "4"))
+
+# One adapter, and therefore one keep-alive connection pool per host, for
+# the whole process. urllib3 pools are thread-safe; requests.Session objects
+# (cookies, default headers) are not, so each thread gets its own thin
+# session mounted on the shared adapter.
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=HTTP_POOL_SIZE,
+    # Retries are handled by the provider code so they can be logged
+    max_retries=0,
+)
+_local = threading.local()
+
+
+def get_session():
+    """This thread's requests.Session, sharing the process-wide pool"""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.mount("https://", _adapter)
+        session.mount("http://", _adapter)
+        _local.session = session
+    return session
+
+
+def close():
+    """Close the pooled keep-alive connections, e.g. at server shutdown.
+
+    Sessions stay usable: the next request opens a fresh connection.
+    """
+    _adapter.close()
+
+
+def backoff_delay(attempt):
+    """Seconds to wait before retry number ``attempt`` (1-based).
+
+    Exponential with full jitter, so retries from many sessions hitting the
+    same failing provider don't arrive in lockstep.
+    """
+    ceiling = min(HTTP_RETRY_BACKOFF * 2 ** (attempt - 1), HTTP_RETRY_BACKOFF_MAX)
+    return random.uniform(0, ceiling)
@@ -0,0 +1,163 @@
+import binascii
+import json
+import re
+
+_STRUCTURAL = re.compile(rb'["{}\[\]:,]')
+_STRING_SPECIAL = re.compile(rb'["\\]')
+
+# Never trust a Content-Length enough to preallocate more than this up front
+MAX_PREALLOCATE_BYTES = 32 * 1024 * 1024
+
+
+class StreamingAudioParser:
+    """Incremental parser for JSON bodies carrying base64 audio in one field.
+
+    Feed the response body chunk by chunk. The string at ``path`` (by
+    default ``{"audio": {"data": "..."}}``) is base64-decoded as it arrives
+    into ``buffer``, preallocated from ``size_hint``, so the encoded text is
+    never held in memory as a whole. Everything else in the document is kept
+    with that string blanked out and parsed by ``close()``, which returns it.
+
+    Decoding errors raise ``binascii.Error`` and malformed JSON raises other
+    ``ValueError`` subclasses (``binascii.Error`` is one too, so catch it
+    first).
+    """
+
+    def __init__(self, path=("audio", "data"), size_hint=0):
+        self.path = tuple(path)
+        self.buffer = bytearray(min(max(size_hint, 0), MAX_PREALLOCATE_BYTES))
+        self.size = 0
+        self.found = False
+        self.skeleton = bytearray()
+        # One [is_object, expecting_key, key] entry per open container
+        self._stack = []
+        self._in_string = False
+        self._is_key = False
+        self._is_target = False
+        self._escape = False
+        self._key = bytearray()
+        self._pending = b""
+
+    def feed(self, chunk):
+        """Consume the next piece of the body; returns how many audio bytes
+        were decoded from it (they are ``buffer[size - n:size]``)."""
+        start = self.size
+        i, n = 0, len(chunk)
+        while i < n:
+            if self._in_string:
+                i = self._scan_string(chunk, i)
+                continue
+            match = _STRUCTURAL.search(chunk, i)
+            end = match.start() if match else n
+            self.skeleton += chunk[i:end]
+            if match:
+                self._structural(chunk[end : end + 1])
+            i = end + 1
+        return self.size - start
+
+    def close(self):
+        """Finish parsing and return the document without the audio string"""
+        if self._in_string or self._stack:
+            raise ValueError("truncated JSON document")
+        document = json.loads(self.skeleton)
+        del self.buffer[self.size :]
+        return document
+
+    def _structural(self, char):
+        self.skeleton += char
+        top = self._stack[-1] if self._stack else None
+        if char == b'"':
+            self._in_string = True
+            self._is_key = top is not None and top[0] and top[1]
+            self._is_target = not self._is_key and self._at_path()
+            if self._is_key:
+                self._key.clear()
+            if self._is_target:
+                if self.found:
+                    raise ValueError(f"duplicate {'.'.join(self.path)} field")
+                self.found = True
+        elif char == b"{":
+            self._stack.append([True, True, None])
+        elif char == b"[":
+            self._stack.append([False, False, None])
+        elif char in (b"}", b"]"):
+            if not self._stack:
+                raise ValueError("unbalanced JSON document")
+            self._stack.pop()
+        elif char == b":" and top is not None and top[0]:
+            top[1] = False
+        elif char == b"," and top is not None and top[0]:
+            top[1] = True
+
+    def _at_path(self):
+        if len(self._stack) != len(self.path):
+            return False
+        return all(
+            frame[0] and frame[2] == key for frame, key in zip(self._stack, self.path)
+        )
+
+    def _scan_string(self, chunk, i):
+        if self._escape:
+            self._escape = False
+            self._escaped(chunk[i : i + 1])
+            return i + 1
+        match = _STRING_SPECIAL.search(chunk, i)
+        end = match.start() if match else len(chunk)
+        if end > i:
+            self._string_data(chunk[i:end])
+        if not match:
+            return end
+        if chunk[end : end + 1] == b'"':
+            self._end_string()
+        else:
+            # A backslash; its escaped character may be in the next chunk
+            self._escape = True
+        return end + 1
+
+    def _string_data(self, data):
+        if self._is_target:
+            self._decode(data)
+            return
+        self.skeleton += data
+        if self._is_key:
+            self._key += data
+
+    def _escaped(self, char):
+        if self._is_target:
+            # Some encoders escape "/" and wrap long base64 lines
+            if char == b"/":
+                self._decode(char)
+            elif char not in (b"n", b"r"):
+                raise binascii.Error(f"unexpected escape \\{char.decode()} in base64")
+            return
+        self.skeleton += b"\\" + char
+        if self._is_key:
+            self._key += b"\\" + char
+
+    def _end_string(self):
+        self._in_string = False
+        self.skeleton += b'"'
+        if self._is_key:
+            self._stack[-1][2] = json.loads(b'"' + self._key + b'"')
+        if self._is_target:
+            if self._pending:
+                self._write(binascii.a2b_base64(self._pending))
+                self._pending = b""
+            self._is_target = False
+
+    def _decode(self, data):
+        if self._pending:
+            data = self._pending + data
+        usable = len(data) - len(data) % 4
+        self._pending = bytes(data[usable:])
+        if usable:
+            self._write(binascii.a2b_base64(memoryview(data)[:usable]))
+
+    def _write(self, decoded):
+        end = self.size + len(decoded)
+        # Slice assignment grows the buffer if the size hint was too small
+        if end <= len(self.buffer):
+            self.buffer[self.size : end] = decoded
+        else:
+            self.buffer[self.size :] = decoded
+        self.size = end
@@ -0,0 +1,191 @@
+"""Keyword topics and sentiment for main9.py's conversation analytics.
+
+A message is lowercased, split into words once, and each word is looked up
+in a table built from the lexicon at import, so the cost is one pass over
+the text however many terms the lexicon has. Terms match whole words only
+("pay" doesn't fire on "repayment", nor "hard" on "hardware"), along with
+their plain inflections: "skill" also matches "skills", "move" also
+matches "moving". Multi-word terms such as "don't know" match as phrases.
+
+The built-in lexicon can be replaced by a JSON file named in
+``LEXICON_FILE``, shaped like ``DEFAULT_LEXICON``; either section may be
+left out to keep the default. Sentiments are listed in priority order: a
+message gets the first one with a hit, or "neutral".
+"""
+
+import json
+import logging
+import os
+import string
+from collections import Counter
+
+LEXICON_FILE = os.getenv("LEXICON_FILE")
+
+DEFAULT_LEXICON = {
+    "topics": {
+        "career": ["career", "job", "work", "position", "role"],
+        "skills": ["skill", "learn", "experience", "ability"],
+        "growth": ["growth", "development", "improve", "advance"],
+        "interview": ["interview", "hiring", "recruitment"],
+        "resume": ["resume", "cv", "portfolio"],
+        "salary": ["salary", "compensation", "pay", "benefits"],
+        "transition": ["change", "transition", "switch", "move"],
+    },
+    "sentiment": {
+        "positive": [
+            "happy",
+            "excited",
+            "great",
+            "love",
+            "good",
+            "excellent",
+            "wonderful",
+        ],
+        "negative": [
+            "worried",
+            "concerned",
+            "anxious",
+            "stressed",
+            "difficult",
+            "hard",
+            "struggle",
+        ],
+        "uncertain": ["maybe", "unsure", "confused", "don't know", "uncertain"],
+    },
+}
+
+NEUTRAL = "neutral"
+
+
+# Punctuation splits words, as in "job's" or "re-move"
+_SEPARATORS = str.maketrans(
+    {
+        char: " "
+        for char in string.punctuation + "\u2018\u2019\u201c\u201d\u2013\u2014\u2026"
+    }
+)
+
+
+def _words(text):
+    return text.lower().translate(_SEPARATORS).split()
+
+
+def _inflections(word):
+    if word.endswith("e"):
+        # move, moves, moved, moving
+        stem = word[:-1]
+        return [word, word + "s", word + "d", stem + "ing"]
+    # skill, skills, skilled, skilling; switch, switches
+    return [word, word + "s", word + "es", word + "ed", word + "ing"]
+
+
+def load_lexicon(path):
+    """The lexicon in the JSON file at ``path``, over the defaults"""
+    with open(path, encoding="utf-8") as f:
+        lexicon = json.load(f)
+    return {
+        "topics": lexicon.get("topics", DEFAULT_LEXICON["topics"]),
+        "sentiment": lexicon.get("sentiment", DEFAULT_LEXICON["sentiment"]),
+    }
+
+
+class KeywordMatcher:
+    """Single-pass, whole-word matcher for a topic/sentiment lexicon"""
+
+    def __init__(self, lexicon=DEFAULT_LEXICON):
+        self.topics = list(lexicon["topics"])
+        self.sentiments = list(lexicon["sentiment"])
+        # word -> labels it stands for; a phrase is keyed by its last word
+        # so it is only checked when that word occurs
+        self._labels = {}
+        self._phrases = {}
+        categories = [
+            ("topic", name, terms) for name, terms in lexicon["topics"].items()
+        ]
+        categories += [
+            ("sentiment", name, terms) for name, terms in lexicon["sentiment"].items()
+        ]
+        for kind, name, terms in categories:
+            for term in terms:
+                words = _words(term)
+                if not words:
+                    continue
+                label = (kind, name)
+                if len(words) == 1:
+                    for form in _inflections(words[0]):
+                        self._labels.setdefault(form, set()).add(label)
+                    continue
+                for form in _inflections(words[-1]):
+                    phrase = " ".join(words[:-1] + [form])
+                    self._phrases.setdefault(form, []).append((phrase, label))
+        # Intersecting two sets walks the smaller one, so a message costs the
+        # same whatever the size of the lexicon
+        self._keywords = frozenset(self._labels)
+        self._phrase_ends = frozenset(self._phrases)
+
+    def analyze(self, text):
+        """``(topics, sentiment)`` of one message, in one scan"""
+        words = _words(text)
+        present = set(words)
+        found = set()
+        for word in present.intersection(self._keywords):
+            found |= self._labels[word]
+        candidates = present.intersection(self._phrase_ends)
+        if candidates:
+            joined = f" {' '.join(words)} "
+            for word in candidates:
+                for phrase, label in self._phrases[word]:
+                    if f" {phrase} " in joined:
+                        found.add(label)
+        topics = [t for t in self.topics if ("topic", t) in found]
+        sentiment = next(
+            (s for s in self.sentiments if ("sentiment", s) in found), NEUTRAL
+        )
+        return topics, sentiment
+
+    def extract_topics(self, text):
+        return self.analyze(text)[0]
+
+    def analyze_sentiment(self, text):
+        return self.analyze(text)[1]
+
+    def analyze_many(self, texts):
+        """``analyze`` over a whole conversation log or batch of messages"""
+        return [self.analyze(text) for text in texts]
+
+    def tally(self, texts):
+        """Topic and sentiment counts over many messages, as two Counters"""
+        topic_counts, sentiment_counts = Counter(), Counter()
+        for topics, sentiment in self.analyze_many(texts):
+            topic_counts.update(topics)
+            sentiment_counts[sentiment] += 1
+        return topic_counts, sentiment_counts
+
+
+def _default_matcher():
+    if LEXICON_FILE:
+        try:
+            return KeywordMatcher(load_lexicon(LEXICON_FILE))
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            logging.warning(
+                "Could not load lexicon %s, using the default: %s", LEXICON_FILE, e
+            )
+    return KeywordMatcher()
+
+
+# Compiled once per process
+matcher = _default_matcher()
+
+
+def analyze(text):
+    return matcher.analyze(text)
+
+
+def extract_topics(text):
+    """Extract key topics from user message"""
+    return matcher.extract_topics(text)
+
+
+def analyze_sentiment(text):
+    """Simple sentiment analysis"""
+    return matcher.analyze_sentiment(text)
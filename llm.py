@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from functools import lru_cache
+
+import httpx
+from dotenv import load_dotenv
+from groq import DefaultHttpxClient, Groq
+
+from tracing import current_span
+
+# The tuning knobs below live in .env next to GROQ_API_KEY, and this module
+# is imported before the apps call load_dotenv()
+load_dotenv()
+
+# Requests in flight to Groq across every session in the process. Each one
+# holds a pooled connection (a streamed reply until it is fully read), so
+# the pool size is the concurrency limit; callers beyond it wait up to
+# GROQ_QUEUE_TIMEOUT seconds for a free connection. Streamed replies queue
+# on request_slot() instead, before they take a pipeline thread.
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "16"))
+GROQ_QUEUE_TIMEOUT = float(os.getenv("GROQ_QUEUE_TIMEOUT", "30"))
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "60"))
+# httpx drops idle connections after 5 s by default, shorter than a typical
+# pause between turns
+GROQ_KEEPALIVE_SECONDS = float(os.getenv("GROQ_KEEPALIVE_SECONDS", "60"))
+GROQ_WARMUP = os.getenv("GROQ_WARMUP", "1").lower() not in ("0", "false", "off")
+
+_request_slots = weakref.WeakKeyDictionary()
+
+
+@lru_cache(maxsize=None)
+def get_client():
+    """Process-wide Groq client shared by every session and script rerun.
+
+    Streamlit re-executes the app script on every interaction; building the
+    client there would also throw away its connection pool each time. With
+    GROQ_WARMUP on, a background request opens the first connection (DNS,
+    TCP, TLS) so the user's first message doesn't pay for it.
+    """
+    client = Groq(
+        api_key=os.getenv("GROQ_API_KEY"),
+        http_client=DefaultHttpxClient(
+            limits=httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_MAX_CONNECTIONS,
+                keepalive_expiry=GROQ_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(GROQ_TIMEOUT, connect=10.0, pool=GROQ_QUEUE_TIMEOUT),
+            event_hooks={"request": [count_request]},
+        ),
+    )
+    if GROQ_WARMUP:
+        threading.Thread(
+            target=warm_up, args=(client,), name="groq-warmup", daemon=True
+        ).start()
+    return client
+
+
+def request_slot():
+    """Semaphore of GROQ_MAX_CONNECTIONS streamed replies for the running loop.
+
+    Hold it on the loop for as long as a reply is being streamed. A pool
+    thread blocked on a free connection is a thread the streams holding the
+    connections can't use to read, so with enough of them waiting nothing
+    moves; waiting here costs no thread.
+    """
+    loop = asyncio.get_running_loop()
+    slots = _request_slots.get(loop)
+    if slots is None:
+        slots = _request_slots[loop] = asyncio.Semaphore(GROQ_MAX_CONNECTIONS)
+    return slots
+
+
+def count_request(request):
+    """Count HTTP requests on the current span; the SDK retries on its own,
+    so every request after the first one is a retry"""
+    span = current_span()
+    if span is None:
+        return
+    if span.attributes.get("requests"):
+        span.add("retries")
+    span.add("requests")
+
+
+def warm_up(client):
+    """Open a pooled connection with a cheap request (the model list)"""
+    start = time.perf_counter()
+    try:
+        client.with_options(max_retries=0).models.list()
+    except Exception as e:
+        logging.warning("Groq warm-up failed: %s", e)
+        return
+    logging.info(
+        "Groq connection warmed up in %.0f ms", (time.perf_counter() - start) * 1000
+    )
@@ -721,8 +721,7 @@
 # )
 
 import os
-import time
-import tempfile
+import io
 import asyncio
 from dotenv import load_dotenv
 import speech_recognition as sr
@@ -775,9 +774,6 @@ if "messages" not in st.session_state:
         {"role": "assistant", "content": "Hello, I am Priya. How can I help you?"}
     ]
 
-if "temp_dir" not in st.session_state:
-    st.session_state.temp_dir = tempfile.gettempdir()
-
 if "voice" not in st.session_state:
     st.session_state.voice = "en-US-AriaNeural"
 
@@ -800,10 +796,14 @@ if "show_recorder" not in st.session_state:
     st.session_state.show_recorder = False
 
 
-async def generate_audio(text, output_file, voice):
-    """Generate audio using Edge TTS"""
+async def generate_audio(text, voice):
+    """Generate audio using Edge TTS, collecting the MP3 chunks in memory"""
     communicate = edge_tts.Communicate(text, voice, rate="+10%")
-    await communicate.save(output_file)
+    buffer = bytearray()
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            buffer += chunk["data"]
+    return bytes(buffer)
 
 
 def speak(text):
@@ -812,19 +812,14 @@ def speak(text):
             st.session_state.stop_speaking = False
             return None
 
-        audio_file = os.path.join(st.session_state.temp_dir, f"tts_{time.time()}.mp3")
-        st.session_state.current_audio_file = audio_file
-
         loop = asyncio.new_event_loop()
-        loop.run_until_complete(
-            generate_audio(text, audio_file, st.session_state.voice)
-        )
-        loop.close()
-
-        with open(audio_file, "rb") as f:
-            audio_bytes = f.read()
+        try:
+            audio_bytes = loop.run_until_complete(
+                generate_audio(text, st.session_state.voice)
+            )
+        finally:
+            loop.close()
 
-        st.session_state.current_audio_file = None
         return audio_bytes
 
     except Exception as e:
@@ -845,15 +840,8 @@ def listen(audio_data):
     recognizer.pause_threshold = 0.8
 
     try:
-        # Save audio to temporary file
-        temp_file = os.path.join(
-            st.session_state.temp_dir, f"recording_{time.time()}.wav"
-        )
-
-        with open(temp_file, "wb") as f:
-            f.write(audio_data.getvalue())
-
-        with sr.AudioFile(temp_file) as source:
+        # Decode the uploaded WAV straight from memory
+        with sr.AudioFile(io.BytesIO(audio_data.getvalue())) as source:
             # Adjust for ambient noise
             recognizer.adjust_for_ambient_noise(source, duration=0.5)
             audio = recognizer.record(source)
@@ -861,12 +849,6 @@ def listen(audio_data):
         # Try to recognize speech
         text = recognizer.recognize_google(audio)
 
-        # Clean up
-        try:
-            os.remove(temp_file)
-        except:
-            pass
-
         return text
 
     except sr.UnknownValueError:
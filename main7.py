@@ -1,24 +1,27 @@
-import asyncio
-import base64
 import logging
-import os
-import tempfile
-import time
 
-import edge_tts
-import requests
 import speech_recognition as sr
 import streamlit as st
 from dotenv import load_dotenv
-from groq import Groq
+
+from engine import PRIYA, VOICES, VoiceSession
+from llm import get_client
+from player import STOP_HTML, ReplyStream
+from tracing import start_metrics_server
+from transcode import APP_AUDIO_QUALITY, AUDIO_QUALITIES, ORIGINAL, parse_profile
+from transcript import Transcript
+from tts import audio_cache, latency_report
 
 # Load API Key
 load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+client = get_client()
 
 # Configure basic logging to console
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
+# Prometheus stage metrics on METRICS_PORT, if set; once per process
+start_metrics_server()
+
 st.set_page_config(
     page_title="Priya Voice Assistant",
     page_icon="🎙️",
@@ -54,16 +57,21 @@ st.markdown(
 )
 
 # Session state setup
-if "messages" not in st.session_state:
-    st.session_state.messages = [
-        {"role": "assistant", "content": "Hello, I am Priya. How can I help you?"}
-    ]
-
-if "temp_dir" not in st.session_state:
-    st.session_state.temp_dir = tempfile.gettempdir()
+# The conversation itself (messages, history window, recognizer) lives in a
+# VoiceSession, shared with the headless server in server.py
+if "session" not in st.session_state:
+    st.session_state.session = VoiceSession(PRIYA, client)
+
+if "transcript" not in st.session_state:
+    st.session_state.transcript = Transcript(
+        {
+            "user": ("user-message", "👤 You"),
+            "assistant": ("assistant-message", "🤖 Priya"),
+        }
+    )
 
 if "voice" not in st.session_state:
-    st.session_state.voice = "en-US-AriaNeural"
+    st.session_state.voice = PRIYA.voice
 
 if "recording_count" not in st.session_state:
     st.session_state.recording_count = 0
@@ -74,148 +82,23 @@ if "stop_speaking" not in st.session_state:
 if "current_audio_file" not in st.session_state:
     st.session_state.current_audio_file = None
 
-if "show_audio_player" not in st.session_state:
-    st.session_state.show_audio_player = False
-
-if "current_response_audio" not in st.session_state:
-    st.session_state.current_response_audio = None
-
 if "show_recorder" not in st.session_state:
     st.session_state.show_recorder = False
 
+if "last_turn_timings" not in st.session_state:
+    st.session_state.last_turn_timings = {}
 
-async def generate_audio(text, output_file, voice):
-    """Generate audio using Edge TTS"""
-    communicate = edge_tts.Communicate(text, voice, rate="+10%")
-    await communicate.save(output_file)
+if "audio_quality" not in st.session_state:
+    st.session_state.audio_quality = APP_AUDIO_QUALITY
 
 
-def puter_tts(text):
-    """Call Puter TTS endpoint and return raw audio bytes.
-
-    This is defensive: it checks status codes, handles non-JSON responses,
-    and raises informative errors instead of letting json.decoder.JSONDecodeError
-    bubble up with no context.
-    """
-    url = "https://api.puter.com/v1/ai/text2speech"
-    retries = 2
-    timeout = 10
-
-    for attempt in range(1, retries + 1):
-        try:
-            response = requests.post(url, json={"text": text}, timeout=timeout)
-        except requests.RequestException as e:
-            logging.warning("Puter TTS request failed (attempt %s): %s", attempt, e)
-            if attempt == retries:
-                raise RuntimeError(f"Puter TTS request failed: {e}") from e
-            time.sleep(1)
-            continue
-
-        # Non-200 responses
-        if response.status_code != 200:
-            logging.warning(
-                "Puter TTS returned status %s (attempt %s): %s",
-                response.status_code,
-                attempt,
-                response.text[:1000],
-            )
-            if attempt == retries:
-                raise RuntimeError(
-                    f"Puter TTS returned HTTP {response.status_code}: {response.text}"
-                )
-            time.sleep(1)
-            continue
-
-        # Try to parse JSON safely
-        try:
-            data = response.json()
-        except ValueError as e:
-            # Provide the response text for debugging
-            logging.error(
-                "Failed to parse JSON from Puter TTS (status %s). Response text: %s",
-                response.status_code,
-                response.text[:2000],
-            )
-            raise RuntimeError(
-                f"Invalid JSON returned from TTS provider. Response text: {response.text[:2000]}"
-            ) from e
-
-        # Validate expected structure
-        if (
-            not isinstance(data, dict)
-            or "audio" not in data
-            or "data" not in data.get("audio", {})
-        ):
-            logging.error("Unexpected JSON structure from Puter TTS: %s", repr(data))
-            raise RuntimeError(f"Unexpected JSON structure from TTS provider: {data}")
-
-        audio_b64 = data["audio"]["data"]
-        try:
-            audio_bytes = base64.b64decode(audio_b64)
-        except Exception as e:
-            logging.error("Failed to decode base64 audio: %s", e)
-            raise RuntimeError("Failed to decode audio from TTS provider") from e
-
-        return audio_bytes
-
-
-def speak(text):
+def audio_profile():
+    """How to encode reply audio for the quality picked in the sidebar"""
     try:
-        if st.session_state.stop_speaking:
-            st.session_state.stop_speaking = False
-            return None
-
-        # Primary TTS provider: Puter
-        try:
-            audio_bytes = puter_tts(text)
-            return audio_bytes
-        except Exception as e:
-            # Don't crash on provider failure — log and try fallback
-            logging.warning("Puter TTS failed: %s", e)
-
-            # Fallback: try using Edge TTS (generate a temp file then read it)
-            try:
-                tmp_file = os.path.join(
-                    st.session_state.temp_dir, f"edge_tts_{int(time.time() * 1000)}.mp3"
-                )
-
-                # Try to run the async generator. In some environments asyncio.run
-                # can raise if there's already a running loop; handle that case.
-                try:
-                    asyncio.run(generate_audio(text, tmp_file, st.session_state.voice))
-                except RuntimeError:
-                    # Event loop already running — create a new loop explicitly
-                    loop = asyncio.new_event_loop()
-                    try:
-                        loop.run_until_complete(
-                            generate_audio(text, tmp_file, st.session_state.voice)
-                        )
-                    finally:
-                        try:
-                            loop.close()
-                        except Exception:
-                            pass
-
-                # Read generated audio and cleanup
-                with open(tmp_file, "rb") as f:
-                    data = f.read()
-
-                try:
-                    os.remove(tmp_file)
-                except Exception:
-                    pass
-
-                return data
-            except Exception as e2:
-                logging.error("Fallback Edge TTS failed: %s", e2)
-                st.error(
-                    f"TTS Error: primary provider failed ({e}); fallback failed ({e2})"
-                )
-                return None
-
-    except Exception as e:
-        st.error(f"TTS Error: {e}")
-        return None
+        return parse_profile(st.session_state.audio_quality)
+    except ValueError as e:
+        logging.warning("Audio quality: %s", e)
+        return ORIGINAL
 
 
 def listen(audio_data):
@@ -223,37 +106,8 @@ def listen(audio_data):
     if audio_data is None:
         return ""
 
-    recognizer = sr.Recognizer()
-
-    # Adjust recognizer settings for better accuracy
-    recognizer.energy_threshold = 300
-    recognizer.dynamic_energy_threshold = True
-    recognizer.pause_threshold = 0.8
-
     try:
-        # Save audio to temporary file
-        temp_file = os.path.join(
-            st.session_state.temp_dir, f"recording_{time.time()}.wav"
-        )
-
-        with open(temp_file, "wb") as f:
-            f.write(audio_data.getvalue())
-
-        with sr.AudioFile(temp_file) as source:
-            # Adjust for ambient noise
-            recognizer.adjust_for_ambient_noise(source, duration=0.5)
-            audio = recognizer.record(source)
-
-        # Try to recognize speech
-        text = recognizer.recognize_google(audio)
-
-        # Clean up
-        try:
-            os.remove(temp_file)
-        except Exception:
-            pass
-
-        return text
+        return st.session_state.session.listen(audio_data.getvalue())
 
     except sr.UnknownValueError:
         st.warning(
@@ -268,27 +122,34 @@ def listen(audio_data):
         return ""
 
 
-def get_ai_response(user_text):
-    """Get AI response from Groq"""
-    try:
-        # Build conversation history
-        messages = [
-            {
-                "role": "system",
-                "content": "You are Priya, a helpful and friendly conversational assistant. Give complete, well-structured responses. Always finish your thoughts and sentences completely. Be conversational but thorough.",
-            }
-        ] + st.session_state.messages
-
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=messages,
-            max_tokens=1024,
-            temperature=0.7,
-        )
-        return response.choices[0].message.content
+def respond(user_text):
+    """Answer the user and speak the reply.
 
-    except Exception as e:
-        return f"I apologize, but I encountered an error: {str(e)}"
+    The session adds both messages to the conversation. Speech for the
+    first sentence is generated while Groq is still producing the rest of
+    the reply, and each sentence's clip is sent to the browser's player as
+    soon as it is ready, so playback starts before the reply is finished.
+    Returns the reply.
+    """
+    session = st.session_state.session
+    if st.session_state.stop_speaking:
+        st.session_state.stop_speaking = False
+        speak = False
+    else:
+        speak = True
+    session.voice = st.session_state.voice
+
+    stream = ReplyStream()
+    result = session.turn_sync(
+        user_text,
+        speak=speak,
+        on_clip=lambda clip: st.html(
+            stream.clip_html(clip), unsafe_allow_javascript=True
+        ),
+        profile=audio_profile(),
+    )
+    st.session_state.last_turn_timings = result.timings
+    return result.reply
 
 
 def process_audio_input(audio_data):
@@ -302,23 +163,9 @@ def process_audio_input(audio_data):
         if user_text:
             st.success(f"✅ You said: {user_text}")
 
-            # Add user message
-            st.session_state.messages.append({"role": "user", "content": user_text})
-
-            # Get AI response
+            # Stream AI response straight into speech
             with st.spinner("🤔 Thinking..."):
-                reply = get_ai_response(user_text)
-
-            # Add assistant message
-            st.session_state.messages.append({"role": "assistant", "content": reply})
-
-            # Generate speech audio
-            with st.spinner("🔊 Generating speech..."):
-                audio_bytes = speak(reply)
-
-            if audio_bytes:
-                st.session_state.current_response_audio = audio_bytes
-                st.session_state.show_audio_player = True
+                respond(user_text)
 
             # Hide recorder and increment count
             st.session_state.show_recorder = False
@@ -329,18 +176,26 @@ def process_audio_input(audio_data):
 st.title("🎙️ Priya Voice Assistant")
 st.markdown("---")
 
+
 # Display chat messages
-for message in st.session_state.messages:
-    if message["role"] == "user":
-        st.markdown(
-            f'<div class="user-message">👤 You: {message["content"]}</div>',
-            unsafe_allow_html=True,
-        )
-    else:
-        st.markdown(
-            f'<div class="assistant-message">🤖 Priya: {message["content"]}</div>',
-            unsafe_allow_html=True,
+@st.fragment
+def show_transcript():
+    """The latest page of messages; each message's HTML is built only once"""
+    transcript = st.session_state.transcript
+    transcript.sync(st.session_state.session.messages)
+    if transcript.hidden:
+        # Only this fragment reruns to reveal older messages
+        st.button(
+            f"⬆️ Show earlier messages ({transcript.hidden} hidden)",
+            key="transcript_more",
+            on_click=transcript.show_more,
+            use_container_width=True,
         )
+    for html in transcript.visible():
+        st.markdown(html, unsafe_allow_html=True)
+
+
+show_transcript()
 
 st.markdown("---")
 
@@ -353,34 +208,32 @@ col1, col2, col3 = st.columns(3)
 with col1:
     if st.button("🎙️ Start Recording", use_container_width=True):
         st.session_state.show_recorder = True
-        st.session_state.show_audio_player = False
-        st.session_state.current_response_audio = None
+        # Silence the last reply once, so it isn't recorded
+        st.session_state.stop_before_recording = True
         st.rerun()
 
 if st.button("🛑 Stop Speaking", use_container_width=True):
     st.session_state.stop_speaking = True
-    st.session_state.show_audio_player = False
-    st.session_state.current_response_audio = None
+    st.html(STOP_HTML, unsafe_allow_javascript=True)
 
     # Reset after stopping so next speech works
     st.session_state.stop_speaking = False
 
     st.info("⏸️ Audio stopped")
-    st.rerun()
 with col3:
     if st.button("🗑️ Clear Chat", use_container_width=True):
-        st.session_state.messages = [
-            {"role": "assistant", "content": "Hello, I am Priya. How can I help you?"}
-        ]
+        st.session_state.session.reset()
         st.session_state.show_recorder = False
-        st.session_state.show_audio_player = False
-        st.session_state.current_response_audio = None
         st.session_state.recording_count = 0
         st.rerun()
 
 # Show audio recorder when enabled
 if st.session_state.show_recorder:
     st.info("🎤 Recording... Please speak now")
+    # Only on the rerun right after the click: a stop on every rerun would
+    # also cut off replies to typed questions while the recorder is open
+    if st.session_state.pop("stop_before_recording", False):
+        st.html(STOP_HTML, unsafe_allow_javascript=True)
 
     # Use recording_count to create unique key for each recording session
     audio_data = st.audio_input(
@@ -396,19 +249,6 @@ if st.session_state.show_recorder:
 
 st.markdown("---")
 
-# Show audio player if there's a response to play
-if st.session_state.show_audio_player and st.session_state.current_response_audio:
-    st.info("🔊 Playing Priya's response...")
-    st.audio(st.session_state.current_response_audio, format="audio/mp3", autoplay=True)
-
-    # Add a button to mark audio as finished
-    if st.button("✅ Audio Finished - Ready for Next", use_container_width=True):
-        st.session_state.show_audio_player = False
-        st.session_state.current_response_audio = None
-        st.rerun()
-
-st.markdown("---")
-
 # Text input alternative
 st.subheader("💬 Text Input (Alternative)")
 
@@ -417,23 +257,9 @@ with st.form(key="text_form", clear_on_submit=True):
     submit_button = st.form_submit_button("📤 Send Text", use_container_width=True)
 
     if submit_button and text_input:
-        # Add user message
-        st.session_state.messages.append({"role": "user", "content": text_input})
-
-        # Get AI response
+        # Stream AI response straight into speech
         with st.spinner("🤔 Thinking..."):
-            reply = get_ai_response(text_input)
-
-        # Add assistant message
-        st.session_state.messages.append({"role": "assistant", "content": reply})
-
-        # Generate speech audio
-        with st.spinner("🔊 Generating speech..."):
-            audio_bytes = speak(reply)
-
-        if audio_bytes:
-            st.session_state.current_response_audio = audio_bytes
-            st.session_state.show_audio_player = True
+            respond(text_input)
 
         st.rerun()
 
@@ -442,21 +268,17 @@ st.markdown("---")
 with st.expander("⚙️ Settings"):
     # Voice selection
     st.write("**🔊 Voice Selection**")
-    voice_options = {
-        "Aria (Female, US)": "en-US-AriaNeural",
-        "Jenny (Female, US)": "en-US-JennyNeural",
-        "Guy (Male, US)": "en-US-GuyNeural",
-        "Sonia (Female, UK)": "en-GB-SoniaNeural",
-        "Ryan (Male, UK)": "en-GB-RyanNeural",
-        "Neerja (Female, India)": "en-IN-NeerjaNeural",
-        "Prabhat (Male, India)": "en-IN-PrabhatNeural",
-    }
-
-    selected_voice = st.selectbox(
-        "Select Voice", options=list(voice_options.keys()), index=0
-    )
+    selected_voice = st.selectbox("Select Voice", options=list(VOICES), index=0)
+
+    st.session_state.voice = VOICES[selected_voice]
 
-    st.session_state.voice = voice_options[selected_voice]
+    # Smaller audio for slow or metered connections
+    st.selectbox(
+        "🔊 Audio quality",
+        list(dict.fromkeys([*AUDIO_QUALITIES, st.session_state.audio_quality])),
+        format_func=lambda quality: AUDIO_QUALITIES.get(quality, quality),
+        key="audio_quality",
+    )
 
     st.info(f"Current voice: {selected_voice}")
 
@@ -466,6 +288,17 @@ with st.expander("⚙️ Settings"):
         "Max tokens set to 1024 to ensure complete responses. If responses still seem cut off, try rephrasing your question to be more specific."
     )
 
+    # Speech cache
+    st.write("**🗄️ Speech Cache**")
+    cache_stats = audio_cache.stats()
+    st.caption(
+        f"Hits: {cache_stats['hits'] + cache_stats['disk_hits']} | "
+        f"Misses: {cache_stats['misses']} | "
+        f"Evictions: {cache_stats['evictions']} | "
+        f"Hit rate: {cache_stats['hit_rate']:.0%}"
+    )
+    st.caption(f"Speech latency: {latency_report()}")
+
 st.markdown("---")
 st.markdown(
     "<p style='text-align:center;'>Powered by Groq & Edge TTS | 🎙️ Click 'Start Recording' to speak | 🛑 Click 'Stop Speaking' to interrupt</p>",
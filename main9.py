@@ -1,26 +1,55 @@
-import asyncio
-import base64
-import json
 import logging
 import os
-import re
-import tempfile
 import time
+import uuid
 
-import edge_tts
-import requests
 import speech_recognition as sr
 import streamlit as st
 from dotenv import load_dotenv
-from groq import Groq
+
+from analytics import ConversationStats, turn_log
+from background import BackgroundTasks
+from conversation import (
+    COMBINED_INSTRUCTIONS,
+    SUMMARY_REQUEST,
+    CombinedReplyStream,
+    generate_follow_up_questions,
+    summary_due,
+    update_summary,
+)
+from engine import BHUMIKA, Listener, apology, reply_sync, synthesize_speech
+from history import HistoryWindow, prompt_tokens
+from keywords import analyze as analyze_text
+from llm import get_client
+from personas import BHUMIKA_PERSONA, BHUMIKA_PERSONA_TOKENS
+from player import STOP_HTML, ReplyStream
+from tracing import session_id as tracing_session_id, start_metrics_server
+from transcode import (
+    APP_AUDIO_QUALITY,
+    AUDIO_QUALITIES,
+    ORIGINAL,
+    parse_profile,
+    transcode,
+)
+from transcript import Transcript
+from tts import audio_cache, latency_report
 
 # Load API Key
 load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+client = get_client()
+
+# "separate": summary and follow-up questions are their own LLM calls;
+# "combined": one structured request returns them with the reply
+BHUMIKA_LLM_MODE = os.getenv("BHUMIKA_LLM_MODE", "separate").lower()
+# How often the page checks on follow-ups and summaries still being made
+BACKGROUND_POLL_SECONDS = 1.0
 
 # Configure basic logging to console
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
+# Prometheus stage metrics on METRICS_PORT, if set; once per process
+start_metrics_server()
+
 # ============================================================================
 # PAGE CONFIG
 # ============================================================================
@@ -80,15 +109,29 @@ if "messages" not in st.session_state:
     st.session_state.messages = [
         {
             "role": "assistant",
-            "content": "Hello! I'm Bhumika Prasad, Head of Talent Acquisition at 100x. How can I help you today?",
+            "content": BHUMIKA.greeting,
         }
     ]
 
-if "temp_dir" not in st.session_state:
-    st.session_state.temp_dir = tempfile.gettempdir()
+if "transcript" not in st.session_state:
+    st.session_state.transcript = Transcript(
+        {
+            "user": ("user-message", "👤 You"),
+            "assistant": ("assistant-message", "👩‍💼 Bhumika"),
+        }
+    )
+
+# Turns that no longer fit the token budget are just left out of the
+# history: the conversation summary in the prompt context already covers
+# them, so the window doesn't run a second summarizer of its own
+if "history_window" not in st.session_state:
+    st.session_state.history_window = HistoryWindow()
 
 if "voice" not in st.session_state:
-    st.session_state.voice = "en-IN-NeerjaNeural"
+    st.session_state.voice = BHUMIKA.voice
+
+if "listener" not in st.session_state:
+    st.session_state.listener = Listener()
 
 if "recording_count" not in st.session_state:
     st.session_state.recording_count = 0
@@ -99,213 +142,97 @@ if "stop_speaking" not in st.session_state:
 if "current_audio_file" not in st.session_state:
     st.session_state.current_audio_file = None
 
-if "show_audio_player" not in st.session_state:
-    st.session_state.show_audio_player = False
-
-if "current_response_audio" not in st.session_state:
-    st.session_state.current_response_audio = None
-
 if "show_recorder" not in st.session_state:
     st.session_state.show_recorder = False
 
+if "last_turn_timings" not in st.session_state:
+    st.session_state.last_turn_timings = {}
+
+if "audio_quality" not in st.session_state:
+    st.session_state.audio_quality = APP_AUDIO_QUALITY
+
 # ============================================================================
 # NEW: Analytics & Conversation Intelligence State
 # ============================================================================
 if "conversation_start" not in st.session_state:
     st.session_state.conversation_start = time.time()
 
-if "topics_discussed" not in st.session_state:
-    st.session_state.topics_discussed = []
+# Per-message features and running totals for the sidebar
+if "analytics" not in st.session_state:
+    st.session_state.analytics = ConversationStats()
+    for message in st.session_state.messages:
+        st.session_state.analytics.record(message["role"], message["content"])
+
+if "conversation_id" not in st.session_state:
+    st.session_state.conversation_id = uuid.uuid4().hex
+
+# Spans of this run (STT, replies, background summaries) carry the id
+tracing_session_id.set(st.session_state.conversation_id)
 
 if "conversation_goal" not in st.session_state:
     st.session_state.conversation_goal = None
 
-if "user_sentiment" not in st.session_state:
-    st.session_state.user_sentiment = []
-
 if "follow_up_questions" not in st.session_state:
     st.session_state.follow_up_questions = []
 
 if "conversation_summary" not in st.session_state:
     st.session_state.conversation_summary = ""
 
+# Number of messages the conversation summary covers
+if "summary_checkpoint" not in st.session_state:
+    st.session_state.summary_checkpoint = 0
+
+if "background_tasks" not in st.session_state:
+    st.session_state.background_tasks = BackgroundTasks()
+
+# Summaries and follow-up questions are generated off the critical path;
+# pick up whatever finished since the last rerun (poll_background_tasks
+# triggers one when they are done). Task names are the session state keys
+# they fill.
+for name, value in st.session_state.background_tasks.collect().items():
+    if name == "conversation_summary":
+        # The summary job also reports how many messages it now covers
+        summary, checkpoint = value
+        st.session_state.conversation_summary = summary
+        st.session_state.summary_checkpoint = checkpoint
+    else:
+        st.session_state[name] = value
+
 
 # ============================================================================
 # HELPER FUNCTIONS: TTS & SPEECH
 # ============================================================================
-async def generate_audio(text, output_file, voice):
-    """Generate audio using Edge TTS"""
-    communicate = edge_tts.Communicate(text, voice, rate="+10%")
-    await communicate.save(output_file)
-
-
-def puter_tts(text):
-    """Call Puter TTS endpoint and return raw audio bytes."""
-    url = "https://api.puter.com/v1/ai/text2speech"
-    retries = 2
-    timeout = 10
-
-    for attempt in range(1, retries + 1):
-        try:
-            response = requests.post(url, json={"text": text}, timeout=timeout)
-        except requests.RequestException as e:
-            logging.warning("Puter TTS request failed (attempt %s): %s", attempt, e)
-            if attempt == retries:
-                raise RuntimeError(f"Puter TTS request failed: {e}") from e
-            time.sleep(1)
-            continue
-
-        if response.status_code != 200:
-            logging.warning(
-                "Puter TTS returned status %s (attempt %s): %s",
-                response.status_code,
-                attempt,
-                response.text[:1000],
-            )
-            if attempt == retries:
-                raise RuntimeError(
-                    f"Puter TTS returned HTTP {response.status_code}: {response.text}"
-                )
-            time.sleep(1)
-            continue
-
-        try:
-            data = response.json()
-        except ValueError as e:
-            logging.error(
-                "Failed to parse JSON from Puter TTS (status %s). Response text: %s",
-                response.status_code,
-                response.text[:2000],
-            )
-            raise RuntimeError(
-                f"Invalid JSON returned from TTS provider. Response text: {response.text[:2000]}"
-            ) from e
-
-        if (
-            not isinstance(data, dict)
-            or "audio" not in data
-            or "data" not in data.get("audio", {})
-        ):
-            logging.error("Unexpected JSON structure from Puter TTS: %s", repr(data))
-            raise RuntimeError(f"Unexpected JSON structure from TTS provider: {data}")
-
-        audio_b64 = data["audio"]["data"]
-        try:
-            audio_bytes = base64.b64decode(audio_b64)
-        except Exception as e:
-            logging.error("Failed to decode base64 audio: %s", e)
-            raise RuntimeError("Failed to decode audio from TTS provider") from e
-
-        return audio_bytes
-
-
 def speak(text):
     try:
         if st.session_state.stop_speaking:
             st.session_state.stop_speaking = False
             return None
 
-        # Strip emojis and special characters before TTS
-        emoji_pattern = re.compile(
-            "["
-            "\U0001f600-\U0001f64f"  # emoticons
-            "\U0001f300-\U0001f5ff"  # symbols & pictographs
-            "\U0001f680-\U0001f6ff"  # transport & map symbols
-            "\U0001f1e0-\U0001f1ff"  # flags (iOS)
-            "\U00002702-\U000027b0"
-            "\U000024c2-\U0001f251"
-            "\U0001f900-\U0001f9ff"  # supplemental symbols
-            "\U0001fa00-\U0001faff"  # more symbols
-            "]+",
-            flags=re.UNICODE,
-        )
-
-        clean_text = emoji_pattern.sub("", text)
-        clean_text = " ".join(clean_text.split())
-
-        if not clean_text.strip():
-            return None
-
-        text = clean_text
-
-        # Primary TTS provider: Puter
-        try:
-            audio_bytes = puter_tts(text)
-            return audio_bytes
-        except Exception as e:
-            logging.warning("Puter TTS failed: %s", e)
-
-            # Fallback: Edge TTS
-            try:
-                tmp_file = os.path.join(
-                    st.session_state.temp_dir, f"edge_tts_{int(time.time() * 1000)}.mp3"
-                )
-
-                try:
-                    asyncio.run(generate_audio(text, tmp_file, st.session_state.voice))
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    try:
-                        loop.run_until_complete(
-                            generate_audio(text, tmp_file, st.session_state.voice)
-                        )
-                    finally:
-                        try:
-                            loop.close()
-                        except Exception:
-                            pass
-
-                with open(tmp_file, "rb") as f:
-                    data = f.read()
-
-                try:
-                    os.remove(tmp_file)
-                except Exception:
-                    pass
-
-                return data
-            except Exception as e2:
-                logging.error("Fallback Edge TTS failed: %s", e2)
-                st.error(
-                    f"TTS Error: primary provider failed ({e}); fallback failed ({e2})"
-                )
-                return None
+        audio = synthesize_speech(text, st.session_state.voice, clean=True)
+        return transcode(audio, audio_profile())
 
     except Exception as e:
         st.error(f"TTS Error: {e}")
         return None
 
 
+def audio_profile():
+    """How to encode reply audio for the quality picked in the sidebar"""
+    try:
+        return parse_profile(st.session_state.audio_quality)
+    except ValueError as e:
+        logging.warning("Audio quality: %s", e)
+        return ORIGINAL
+
+
 def listen(audio_data):
     """Convert speech to text"""
     if audio_data is None:
         return ""
 
-    recognizer = sr.Recognizer()
-    recognizer.energy_threshold = 300
-    recognizer.dynamic_energy_threshold = True
-    recognizer.pause_threshold = 0.8
-
     try:
-        temp_file = os.path.join(
-            st.session_state.temp_dir, f"recording_{time.time()}.wav"
-        )
-
-        with open(temp_file, "wb") as f:
-            f.write(audio_data.getvalue())
-
-        with sr.AudioFile(temp_file) as source:
-            recognizer.adjust_for_ambient_noise(source, duration=0.5)
-            audio = recognizer.record(source)
-
-        text = recognizer.recognize_google(audio)
-
-        try:
-            os.remove(temp_file)
-        except Exception:
-            pass
-
-        return text
+        # The session's listener keeps its recognizer across turns
+        return st.session_state.listener.listen(audio_data.getvalue())
 
     except sr.UnknownValueError:
         st.warning(
@@ -321,262 +248,182 @@ def listen(audio_data):
 
 
 # ============================================================================
-# NEW: CONVERSATION INTELLIGENCE FUNCTIONS
+# CONVERSATION ANALYTICS
 # ============================================================================
-def summarize_conversation():
-    """Generate a summary of the last 5 messages for context"""
-    if len(st.session_state.messages) <= 5:
-        return ""
-
-    recent_messages = st.session_state.messages[-10:]
-    conversation_text = "\n".join(
-        [f"{msg['role']}: {msg['content'][:200]}" for msg in recent_messages]
-    )
-
-    try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a conversation summarizer. Create a brief 2-3 sentence summary of the key topics and user goals from this conversation.",
-                },
-                {
-                    "role": "user",
-                    "content": f"Summarize this conversation:\n{conversation_text}",
-                },
-            ],
-            max_tokens=150,
-            temperature=0.3,
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        logging.error(f"Summarization error: {e}")
-        return ""
-
-
-def extract_topics(text):
-    """Extract key topics from user message"""
-    keywords = {
-        "career": ["career", "job", "work", "position", "role"],
-        "skills": ["skill", "learn", "experience", "ability"],
-        "growth": ["growth", "development", "improve", "advance"],
-        "interview": ["interview", "hiring", "recruitment"],
-        "resume": ["resume", "cv", "portfolio"],
-        "salary": ["salary", "compensation", "pay", "benefits"],
-        "transition": ["change", "transition", "switch", "move"],
-    }
-
-    text_lower = text.lower()
-    detected_topics = []
-
-    for topic, words in keywords.items():
-        if any(word in text_lower for word in words):
-            detected_topics.append(topic)
-
-    return detected_topics
-
-
-def analyze_sentiment(text):
-    """Simple sentiment analysis"""
-    positive_words = [
-        "happy",
-        "excited",
-        "great",
-        "love",
-        "good",
-        "excellent",
-        "wonderful",
-    ]
-    negative_words = [
-        "worried",
-        "concerned",
-        "anxious",
-        "stressed",
-        "difficult",
-        "hard",
-        "struggle",
-    ]
-    uncertain_words = ["maybe", "unsure", "confused", "don't know", "uncertain"]
+def add_message(role, content):
+    """Append a message to the conversation and record its analytics row"""
+    st.session_state.messages.append({"role": role, "content": content})
+    if role == "user":
+        # Topics and sentiment, in one scan of the message
+        topics, sentiment = analyze_text(content)
+        features = {"topics": topics, "sentiment": sentiment}
+    else:
+        features = {"timings": st.session_state.last_turn_timings}
+    stats = st.session_state.analytics
+    stats.record(role, content, **features)
+    if turn_log is not None:
+        turn_log.write(st.session_state.conversation_id, stats.row(len(stats) - 1))
 
-    text_lower = text.lower()
 
-    if any(word in text_lower for word in positive_words):
-        return "positive"
-    elif any(word in text_lower for word in negative_words):
-        return "negative"
-    elif any(word in text_lower for word in uncertain_words):
-        return "uncertain"
-    else:
-        return "neutral"
+# ============================================================================
+# AI RESPONSE WITH ENHANCED CONTEXT
+# ============================================================================
+def build_messages(combined=False):
+    """Update conversation intelligence and build Bhumika's prompt messages.
 
+    With ``combined``, the prompt asks for the structured JSON response that
+    carries follow-up questions (and a summary, when due) with the reply,
+    instead of making separate calls for them.
+    """
+    # Update conversation summary every 5 messages, in the background; this
+    # turn still uses the previous one
+    if not combined and summary_due(st.session_state.messages):
+        refresh_summary()
 
-def generate_follow_up_questions(user_message, conversation_context):
-    """Generate smart follow-up questions based on conversation"""
-    try:
-        prompt = f"""Based on this conversation context and the user's last message, generate 3 relevant follow-up questions that Bhumika (an HR professional) would ask to better understand the user's needs.
-
-Conversation context: {conversation_context}
-User's last message: {user_message}
-
-Return ONLY a JSON array of 3 questions, nothing else. Format: ["question 1", "question 2", "question 3"]"""
-
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that generates follow-up questions. Return only valid JSON.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            max_tokens=200,
-            temperature=0.7,
+    # Per-conversation context, kept out of the static persona
+    context_parts = []
+    if st.session_state.conversation_summary:
+        context_parts.append(
+            f"CONVERSATION CONTEXT: {st.session_state.conversation_summary}"
         )
 
-        result = response.choices[0].message.content.strip()
-        # Clean up potential markdown formatting
-        result = result.replace("```json", "").replace("```", "").strip()
+    if st.session_state.conversation_goal:
+        context_parts.append(f"USER'S GOAL: {st.session_state.conversation_goal}")
+
+    topics = st.session_state.analytics.topics
+    if topics:
+        context_parts.append(f"TOPICS DISCUSSED: {', '.join(topics)}")
+    if combined and summary_due(st.session_state.messages):
+        context_parts.append(SUMMARY_REQUEST)
+    context = "\n\n".join(context_parts)
+
+    history = st.session_state.history_window.build(st.session_state.messages)
+    messages = [{"role": "system", "content": BHUMIKA_PERSONA}]
+    if combined:
+        messages.append({"role": "system", "content": COMBINED_INSTRUCTIONS})
+    messages += history
+    if context:
+        # Right before the new user message, so everything ahead of it is a
+        # prefix that stays the same from turn to turn
+        messages.insert(len(messages) - 1, {"role": "system", "content": context})
+
+    logging.info(
+        f"Prompt tokens: {prompt_tokens(messages)} "
+        f"(persona {BHUMIKA_PERSONA_TOKENS}, cacheable)"
+    )
+    return messages
+
+
+def refresh_summary():
+    """Fold the messages since the last summary into it, in the background"""
+    st.session_state.background_tasks.submit(
+        "conversation_summary",
+        update_summary,
+        client,
+        st.session_state.conversation_summary,
+        list(st.session_state.messages),
+        st.session_state.summary_checkpoint,
+    )
 
-        questions = json.loads(result)
-        return questions[:3]
-    except Exception as e:
-        logging.error(f"Follow-up generation error: {e}")
-        # Fallback generic questions
-        return [
-            "What specific aspect would you like to explore further?",
-            "How does this align with your career goals?",
-            "What's your timeline for this?",
-        ]
 
+def update_follow_up_questions(user_text):
+    """Generate follow-up questions for the next interaction in the background"""
+    if len(st.session_state.messages) > 2:
+        st.session_state.background_tasks.submit(
+            "follow_up_questions",
+            generate_follow_up_questions,
+            client,
+            user_text,
+            st.session_state.conversation_summary or "Initial conversation",
+        )
 
-# ============================================================================
-# AI RESPONSE WITH ENHANCED CONTEXT
-# ============================================================================
-def get_ai_response(user_text):
-    """Get AI response from Groq with Bhumika's persona and enhanced context"""
-    try:
-        # Update conversation summary every 5 messages
-        if (
-            len(st.session_state.messages) % 5 == 0
-            and len(st.session_state.messages) > 5
-        ):
-            st.session_state.conversation_summary = summarize_conversation()
-
-        # Extract topics and sentiment
-        topics = extract_topics(user_text)
-        for topic in topics:
-            if topic not in st.session_state.topics_discussed:
-                st.session_state.topics_discussed.append(topic)
-
-        sentiment = analyze_sentiment(user_text)
-        st.session_state.user_sentiment.append(sentiment)
-
-        # Build context-aware system prompt
-        context_addition = ""
-        if st.session_state.conversation_summary:
-            context_addition = (
-                f"\n\nCONVERSATION CONTEXT: {st.session_state.conversation_summary}"
-            )
-
-        if st.session_state.conversation_goal:
-            context_addition += f"\n\nUSER'S GOAL: {st.session_state.conversation_goal}"
-
-        if st.session_state.topics_discussed:
-            context_addition += (
-                f"\n\nTOPICS DISCUSSED: {', '.join(st.session_state.topics_discussed)}"
-            )
-
-        # Build conversation history with enhanced persona
-        messages = [
-            {
-                "role": "system",
-                "content": f"""You are Bhumika Prasad, Head of Talent Acquisition at 100x, Home.LLC, and Homie.LLC. You are a warm, philosophical, inspirational, AND joyful HR professional based in Bengaluru, India — cheerful, fresh, and enjoyable to talk to. You bring high energy, optimism, and a friendly smile into every conversation while remaining grounded, empathetic, and professional.
-
-CORE IDENTITY & BACKGROUND:
-- Leadership principles: "Lead. Align. Grow."
-- You're an enthusiastic academic, a passionate public speaker, and someone who celebrates small wins.
-- Education: Bachelor of Commerce from St. Joseph's University (2023-2026), previously at JAIN College (98% grade).
-- Areas of expertise: Public Relations, HR Management, Finance, Strategic Management, Talent Acquisition.
-- You were Co-licensee at TEDxSJU Bangalore and HR & Content Strategy Intern at Sangria by dotkonnekt.
-- You're a Campus Ambassador at Timbukdo.
-
-YOUR COMMUNICATION STYLE:
-- Conversational, cheerful, and lively without being childish. You sound energetic and approachable.
-- You speak naturally and like a friend and mentor — upbeat, encouraging, and easy to understand.
-- ALWAYS address the person directly using "you" — make every response feel personal and specific to THEM.
-- Instead of generic statements like "I work with incredible individuals every day", say "I work with incredible individuals like you every day".
-- Make the conversation feel like a real 1-on-1 chat, not a broadcast message.
-- You share personal experiences and vulnerabilities authentically, but with a lighter tone that leaves people feeling upbeat.
-- You reference psychology (Jung's Shadow, Pressfield's Resistance) and philosophical concepts when useful, but you keep explanations fresh and digestible.
-- You use bullet points (📌) when giving actionable advice and add light emojis (e.g., ☀️✨😊) when they fit naturally.
-- You're direct but empowering — honest, warm, and never heavy-handed.
-- You emphasize experimentation over perfection ("Consider everything an experiment") and celebrate small steps.
-- You believe in action over preparation ("You can just do things") and encourage joyful momentum.
-
-PERSONALIZATION IS KEY:
-- When introducing yourself, connect it to the person you're talking to: "which means I get to meet incredible people like you"
-- When sharing your story, make it relevant to THEIR context or question
-- Reference what they've shared in the conversation to show you're truly listening
-- Avoid generic statements — always anchor your responses to the specific person in front of you
-
-YOUR ROLE AS HR:
-- You're here to help THIS SPECIFIC person in front of you — not generic candidates
-- You ask thoughtful, warm questions to understand THEIR real motivations
-- You provide honest, direct feedback while remaining empathetic and encouraging
-- You help THEM see their blind spots and hidden strengths — and you celebrate their progress
-- You're not just filling roles; you're helping THIS PERSON find meaningful, joyful work
-
-CONVERSATION APPROACH:
-- Keep responses concise and conversational (2–4 paragraphs for most questions); be energetic and optimistic.
-- Be authentic and personal — share relatable experiences when relevant TO THEM.
-- Ask warm follow-ups to understand THEIR deeper motivations.
-- Be gently challenging when needed, but always supportive and light.
-- Use "you" and "your" constantly to make it personal and engaging.
-- When someone seems stuck, nudge them with curiosity and a playful challenge rather than pressure.
-- Mirror their energy and meet them where they are emotionally.
-- Reference earlier parts of YOUR conversation with THEM to show continuity.
-
-TONE AND EXAMPLES:
-- Cheerful encouragement: "You've got this — and I'm cheering for you! 😊"
-- Light reframing: "Instead of 'I must be perfect', try 'I can try, learn, and laugh about it'."
-- Celebrate small wins: "Small step — big vibe. Well done!"
-- Personal connection: "I love that you're thinking about this — it shows you're already on the path."
-
-Remember: You're not just an HR professional. You're a joyful guide who helps THIS SPECIFIC PERSON become the version of themselves they're a bit scared of — and you do it with enthusiasm and warmth.
-
-FINAL RULES:
-- Be lively, kind, emotionally intelligent, and enjoyable to chat with.
-- Avoid being overly formal or corporate — stay human and warm.
-- Use playful, professional energy: help THIS PERSON leave the conversation feeling lighter, clearer, and more motivated.
-- NEVER use generic corporate language — always make it personal and specific.
-- Treat every conversation like you're talking to a friend you genuinely care about.
-
-{context_addition}""",
-            }
-        ] + st.session_state.messages
 
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=messages,
-            max_tokens=1024,
-            temperature=0.7,
-        )
+def respond(user_text):
+    """Stream Bhumika's response and synthesize it sentence by sentence.
 
-        ai_response = response.choices[0].message.content
+    Runs as a turn on the shared pipeline loop, so speech for the first
+    sentence is generated while Groq is still producing the rest of the
+    reply. Each sentence's clip is sent to the browser's player as soon as
+    it is ready, so playback starts before the reply is finished. Returns
+    the reply.
 
-        # Generate follow-up questions for next interaction
-        if len(st.session_state.messages) > 2:
-            st.session_state.follow_up_questions = generate_follow_up_questions(
-                user_text,
-                st.session_state.conversation_summary or "Initial conversation",
-            )
+    In combined mode (BHUMIKA_LLM_MODE=combined) the same request also
+    returns the follow-up questions and, when due, the summary; whatever it
+    fails to provide validly is fetched with the separate calls instead.
+    """
+    st.session_state.last_turn_timings = {}
+    combined = BHUMIKA_LLM_MODE == "combined"
+    want_summary = combined and summary_due(st.session_state.messages)
+    stream = ReplyStream()
 
-        return ai_response
+    def play(clip):
+        st.html(stream.clip_html(clip), unsafe_allow_javascript=True)
 
+    try:
+        messages = build_messages(combined=combined)
     except Exception as e:
         logging.error(f"AI Response error: {e}")
-        return f"I apologize, but I encountered an error: {str(e)}"
+        reply = apology(e)
+        audio = speak(reply)
+        if audio:
+            play(audio)
+        return reply
+
+    structured = CombinedReplyStream() if combined else None
+
+    def reply_deltas(deltas):
+        """The reply text out of the structured response"""
+        empty = True
+        for delta in structured.iter_reply(deltas):
+            empty = False
+            yield delta
+        if empty:
+            # Valid JSON or not, the response had no reply text in it
+            raise ValueError("no reply in the structured response")
+
+    if st.session_state.stop_speaking:
+        st.session_state.stop_speaking = False
+        voice = None
+    else:
+        voice = st.session_state.voice
+
+    # The same streamed reply and per-sentence TTS as the headless server
+    result = reply_sync(
+        client,
+        messages,
+        voice,
+        # Room for the follow-ups and summary after a full-length reply
+        max_tokens=1400 if combined else 1024,
+        transform=reply_deltas if combined else None,
+        clean_speech=True,
+        on_clip=play,
+        profile=audio_profile(),
+    )
+    stt = st.session_state.listener.stt_seconds(user_text)
+    if stt is not None:
+        result.include_stt(stt)
+    st.session_state.last_turn_timings = result.timings
+
+    reply = result.reply
+    if result.error is not None and reply == apology(result.error):
+        # Nothing came back; the apology is already spoken
+        return reply
+
+    if combined:
+        extras = structured.result(want_summary)
+        if extras.summary:
+            st.session_state.conversation_summary = extras.summary
+            st.session_state.summary_checkpoint = len(st.session_state.messages)
+        elif want_summary:
+            refresh_summary()
+        if extras.follow_up_questions:
+            st.session_state.follow_up_questions = extras.follow_up_questions
+        else:
+            update_follow_up_questions(user_text)
+    else:
+        update_follow_up_questions(user_text)
+
+    return reply
 
 
 # ============================================================================
@@ -594,22 +441,14 @@ def process_audio_input(audio_data):
             st.success(f"✅ You said: {user_text}")
 
             # Add user message
-            st.session_state.messages.append({"role": "user", "content": user_text})
+            add_message("user", user_text)
 
-            # Get AI response
+            # Stream AI response straight into speech
             with st.spinner("🤔 Thinking..."):
-                reply = get_ai_response(user_text)
+                reply = respond(user_text)
 
             # Add assistant message
-            st.session_state.messages.append({"role": "assistant", "content": reply})
-
-            # Generate speech audio
-            with st.spinner("🔊 Generating speech..."):
-                audio_bytes = speak(reply)
-
-            if audio_bytes:
-                st.session_state.current_response_audio = audio_bytes
-                st.session_state.show_audio_player = True
+            add_message("assistant", reply)
 
             # Hide recorder and increment count
             st.session_state.show_recorder = False
@@ -634,39 +473,29 @@ with st.sidebar:
     duration_minutes = duration_seconds // 60
     duration_secs = duration_seconds % 60
 
-    # Message count
-    user_messages = len([m for m in st.session_state.messages if m["role"] == "user"])
-    assistant_messages = len(
-        [m for m in st.session_state.messages if m["role"] == "assistant"]
-    )
+    # Running totals, updated as messages are added
+    stats = st.session_state.analytics
 
     # Display metrics
     col1, col2 = st.columns(2)
     with col1:
         st.metric("Duration", f"{duration_minutes}m {duration_secs}s")
-        st.metric("Your Messages", user_messages)
+        st.metric("Your Messages", stats.user_messages)
     with col2:
-        st.metric("Exchanges", assistant_messages)
-        if st.session_state.topics_discussed:
-            st.metric("Topics", len(st.session_state.topics_discussed))
+        st.metric("Exchanges", stats.assistant_messages)
+        if stats.topics:
+            st.metric("Topics", len(stats.topics))
 
     # Topics discussed
-    if st.session_state.topics_discussed:
+    if stats.topics:
         st.subheader("💡 Topics Discussed")
-        for topic in st.session_state.topics_discussed:
+        for topic in stats.topics:
             st.markdown(f"- {topic.capitalize()}")
 
     # Sentiment trend
-    if st.session_state.user_sentiment:
+    dominant_sentiment = stats.dominant_sentiment()
+    if dominant_sentiment:
         st.subheader("😊 Your Sentiment")
-        sentiment_counts = {
-            "positive": st.session_state.user_sentiment.count("positive"),
-            "neutral": st.session_state.user_sentiment.count("neutral"),
-            "negative": st.session_state.user_sentiment.count("negative"),
-            "uncertain": st.session_state.user_sentiment.count("uncertain"),
-        }
-        dominant_sentiment = max(sentiment_counts, key=sentiment_counts.get)
-
         sentiment_emoji = {
             "positive": "😊 Positive",
             "neutral": "😐 Neutral",
@@ -681,34 +510,55 @@ with st.sidebar:
         st.info(st.session_state.conversation_summary)
 
     st.markdown("---")
+    cache_stats = audio_cache.stats()
+    st.caption(
+        f"🗄️ Speech cache: {cache_stats['hits'] + cache_stats['disk_hits']} hits, "
+        f"{cache_stats['misses']} misses, {cache_stats['evictions']} evictions"
+    )
+    st.caption(f"🔊 Speech latency: {latency_report()}")
     st.caption("Analytics update in real-time")
 
 # ============================================================================
 # UI: CHAT DISPLAY
 # ============================================================================
-for message in st.session_state.messages:
-    if message["role"] == "user":
-        st.markdown(
-            f'<div class="user-message">👤 You: {message["content"]}</div>',
-            unsafe_allow_html=True,
-        )
-    else:
-        st.markdown(
-            f'<div class="assistant-message">👩‍💼 Bhumika: {message["content"]}</div>',
-            unsafe_allow_html=True,
+@st.fragment
+def show_transcript():
+    """The latest page of messages; each message's HTML is built only once"""
+    transcript = st.session_state.transcript
+    transcript.sync(st.session_state.messages)
+    if transcript.hidden:
+        # Only this fragment reruns to reveal older messages
+        st.button(
+            f"⬆️ Show earlier messages ({transcript.hidden} hidden)",
+            key="transcript_more",
+            on_click=transcript.show_more,
+            use_container_width=True,
         )
+    for html in transcript.visible():
+        st.markdown(html, unsafe_allow_html=True)
+
+
+show_transcript()
 
 st.markdown("---")
 
 # ============================================================================
 # NEW: SMART FOLLOW-UP QUESTIONS
 # ============================================================================
-if st.session_state.follow_up_questions and len(st.session_state.messages) > 2:
+follow_ups_pending = "follow_up_questions" in st.session_state.background_tasks.pending
+if (st.session_state.follow_up_questions or follow_ups_pending) and len(
+    st.session_state.messages
+) > 2:
     st.subheader("💭 Quick Questions You Might Want to Ask")
 
-    cols = st.columns(len(st.session_state.follow_up_questions))
+    # Questions for an earlier message would be stale by now
+    if follow_ups_pending:
+        st.caption("⏳ Thinking of questions for your last message...")
+    cols = st.columns(len(st.session_state.follow_up_questions) or 1)
 
-    for idx, question in enumerate(st.session_state.follow_up_questions):
+    for idx, question in enumerate(
+        [] if follow_ups_pending else st.session_state.follow_up_questions
+    ):
         with cols[idx]:
             if st.button(
                 f"❓ {question[:50]}...",
@@ -716,21 +566,12 @@ if st.session_state.follow_up_questions and len(st.session_state.messages) > 2:
                 use_container_width=True,
             ):
                 # Process as user input
-                st.session_state.messages.append({"role": "user", "content": question})
+                add_message("user", question)
 
                 with st.spinner("🤔 Thinking..."):
-                    reply = get_ai_response(question)
+                    reply = respond(question)
 
-                st.session_state.messages.append(
-                    {"role": "assistant", "content": reply}
-                )
-
-                with st.spinner("🔊 Generating speech..."):
-                    audio_bytes = speak(reply)
-
-                if audio_bytes:
-                    st.session_state.current_response_audio = audio_bytes
-                    st.session_state.show_audio_player = True
+                add_message("assistant", reply)
 
                 st.rerun()
 
@@ -746,43 +587,48 @@ col1, col2, col3 = st.columns(3)
 with col1:
     if st.button("🎙️ Start Recording", use_container_width=True):
         st.session_state.show_recorder = True
-        st.session_state.show_audio_player = False
-        st.session_state.current_response_audio = None
+        # Silence the last reply once, so it isn't recorded
+        st.session_state.stop_before_recording = True
         st.rerun()
 
 with col2:
     if st.button("🛑 Stop Speaking", use_container_width=True):
         st.session_state.stop_speaking = True
-        st.session_state.show_audio_player = False
-        st.session_state.current_response_audio = None
+        st.html(STOP_HTML, unsafe_allow_javascript=True)
         st.session_state.stop_speaking = False
         st.info("⏸️ Audio stopped")
-        st.rerun()
 
 with col3:
     if st.button("🗑️ Clear Chat", use_container_width=True):
         st.session_state.messages = [
             {
                 "role": "assistant",
-                "content": "Hello! I'm Bhumika Prasad, Head of Talent Acquisition at 100x. How can I help you today?",
+                "content": BHUMIKA.greeting,
             }
         ]
         st.session_state.show_recorder = False
-        st.session_state.show_audio_player = False
-        st.session_state.current_response_audio = None
         st.session_state.recording_count = 0
         # Reset analytics
         st.session_state.conversation_start = time.time()
-        st.session_state.topics_discussed = []
+        st.session_state.analytics = ConversationStats()
+        for message in st.session_state.messages:
+            st.session_state.analytics.record(message["role"], message["content"])
+        st.session_state.conversation_id = uuid.uuid4().hex
         st.session_state.conversation_goal = None
-        st.session_state.user_sentiment = []
         st.session_state.follow_up_questions = []
         st.session_state.conversation_summary = ""
+        st.session_state.summary_checkpoint = 0
+        st.session_state.history_window.reset()
+        st.session_state.background_tasks.cancel_all()
         st.rerun()
 
 # Show audio recorder when enabled
 if st.session_state.show_recorder:
     st.info("🎤 Recording... Please speak now")
+    # Only on the rerun right after the click: a stop on every rerun would
+    # also cut off replies to typed questions while the recorder is open
+    if st.session_state.pop("stop_before_recording", False):
+        st.html(STOP_HTML, unsafe_allow_javascript=True)
 
     audio_data = st.audio_input(
         "Recording",
@@ -796,15 +642,13 @@ if st.session_state.show_recorder:
 
 st.markdown("---")
 
-# Show audio player if there's a response to play
-if st.session_state.show_audio_player and st.session_state.current_response_audio:
-    st.info("🔊 Playing Bhumika's response...")
-    st.audio(st.session_state.current_response_audio, format="audio/mp3", autoplay=True)
-
-    if st.button("✅ Audio Finished - Ready for Next", use_container_width=True):
-        st.session_state.show_audio_player = False
-        st.session_state.current_response_audio = None
-        st.rerun()
+# Smaller audio for slow or metered connections
+st.selectbox(
+    "🔊 Audio quality",
+    list(dict.fromkeys([*AUDIO_QUALITIES, st.session_state.audio_quality])),
+    format_func=lambda quality: AUDIO_QUALITIES.get(quality, quality),
+    key="audio_quality",
+)
 
 st.markdown("---")
 
@@ -819,18 +663,33 @@ with st.form(key="text_form", clear_on_submit=True):
 
     if submit_button and text_input:
         # Add user message
-        st.session_state.messages.append({"role": "user", "content": text_input})
+        add_message("user", text_input)
 
-        # Get AI response
+        # Stream AI response straight into speech
         with st.spinner("🤔 Thinking..."):
-            reply = get_ai_response(text_input)
+            reply = respond(text_input)
 
         # Add assistant message
-        st.session_state.messages.append({"role": "assistant", "content": reply})
+        add_message("assistant", reply)
+
+        # Show the new messages and, once ready, their follow-up questions
+        st.rerun()
+
+
+# ============================================================================
+# BACKGROUND RESULTS
+# ============================================================================
+@st.fragment(run_every=BACKGROUND_POLL_SECONDS)
+def poll_background_tasks():
+    """Rerun the page once the background jobs of the last reply are done.
+
+    Their results are collected at the top of the script, so the follow-up
+    questions and summary show up without waiting for the user's next
+    interaction.
+    """
+    if not st.session_state.background_tasks.pending:
+        st.rerun()
 
-        # Generate speech audio
-        with st.spinner("🔊 Generating speech..."):
-            audio_bytes = speak(reply)
 
-        if audio_bytes:
-            st.session_state.current_response_audio = audio_bytes
+if st.session_state.background_tasks.pending:
+    poll_background_tasks()
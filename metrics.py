@@ -0,0 +1,72 @@
+import bisect
+import threading
+
+# Upper bounds in seconds, roughly log-spaced from 25 ms to 30 s
+DEFAULT_BUCKETS = (
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    1.5,
+    2.0,
+    3.0,
+    5.0,
+    7.5,
+    10.0,
+    15.0,
+    30.0,
+)
+
+
+class Histogram:
+    """Thread-safe fixed-bucket latency histogram.
+
+    Cheap enough to observe on every provider call; quantiles are estimated
+    by linear interpolation inside the bucket that contains them.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        """Estimated q-quantile (0 < q < 1), or None before any observation"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return None
+
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "buckets": self.buckets,
+                "counts": list(self.counts),
+                "count": self.count,
+                "sum": self.sum,
+            }
@@ -0,0 +1,308 @@
+"""Asyncio turn pipeline: STT -> LLM -> TTS with overlapping stages.
+
+All turns in the process run on one long-lived event loop in a background
+thread. Blocking provider calls (SpeechRecognition, the Groq SDK, requests)
+are pushed to a shared thread pool sized by ``PIPELINE_WORKERS``, so a slow
+provider in one session only occupies pool threads, never the loop. Stages
+are connected by bounded queues: the TTS stage starts on the first finished
+sentence while the LLM keeps streaming, and a slow TTS provider applies
+backpressure to the reader instead of buffering the whole reply.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from streaming import SentenceSplitter
+from tracing import span
+
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "32"))
+
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+_END = object()
+
+
+def get_event_loop():
+    """The process-wide pipeline loop, started on first use"""
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(
+                ThreadPoolExecutor(
+                    max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline"
+                )
+            )
+            _loop_thread = threading.Thread(
+                target=loop.run_forever, name="pipeline-loop", daemon=True
+            )
+            _loop_thread.start()
+            _loop = loop
+    return _loop
+
+
+def run_sync(coro, timeout=None):
+    """Run a coroutine on the pipeline loop and wait for its result.
+
+    Must not be called from the loop thread itself; coroutines already on
+    the loop should simply await.
+    """
+    loop = get_event_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync() called from the pipeline loop thread")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+def run_sync_streaming(make_coro, on_item=None):
+    """``run_sync`` for a coroutine that reports items as it goes.
+
+    ``make_coro(emit)`` builds the coroutine; every ``emit(item)`` it makes
+    on the loop is handed to ``on_item`` on the calling thread, in order,
+    while the coroutine is still running. Lets a Streamlit script render a
+    reply's clips as they are made.
+    """
+    if on_item is None:
+        return run_sync(make_coro(None))
+    loop = get_event_loop()
+    if threading.current_thread() is _loop_thread:
+        raise RuntimeError("run_sync_streaming() called from the pipeline loop thread")
+    items = queue.SimpleQueue()
+    future = asyncio.run_coroutine_threadsafe(make_coro(items.put), loop)
+    future.add_done_callback(lambda _: items.put(_END))
+    while (item := items.get()) is not _END:
+        on_item(item)
+    return future.result()
+
+
+def run_in_executor(loop, fn, *args):
+    """``loop.run_in_executor(None, ...)`` keeping the caller's context.
+
+    The pool threads then see the current span and session id, so spans
+    opened by the blocking call nest under the stage that made it.
+    """
+    return loop.run_in_executor(None, contextvars.copy_context().run, fn, *args)
+
+
+@dataclass
+class TurnResult:
+    user_text: str = ""
+    reply: str = ""
+    clips: list = field(default_factory=list)
+    timings: dict = field(default_factory=dict)
+    error: Exception = None
+
+    def include_stt(self, seconds):
+        """Count speech recognition done before the pipeline ran in the turn.
+
+        Shifts every timing by ``seconds`` and records it as ``stt``, the
+        same timings the pipeline gives a turn it transcribes itself.
+        """
+        self.timings = {
+            "stt": seconds,
+            **{stage: seconds + value for stage, value in self.timings.items()},
+        }
+
+
+class TurnPipeline:
+    """One voice turn as overlapping stages.
+
+    ``transcribe(wav_bytes) -> str``, ``complete(user_text) -> iterable of
+    text deltas`` and ``synthesize(sentence) -> bytes | None`` are plain
+    blocking callables; they run in the loop's thread pool and must not
+    touch Streamlit state. ``timings`` in the result are in seconds since
+    the turn started: ``stt``, ``llm_first_token``, ``llm``,
+    ``first_audio``, ``tts`` and ``total``. The turn is also traced: a
+    ``turn`` span with ``listen``, ``llm`` and one ``tts`` span per sentence
+    under it. ``complete_slot()``, if given, returns an async context
+    manager entered on the loop before ``complete`` is called and held
+    until the reply has been read, to limit concurrent replies without
+    tying up pool threads. With ``prompt_ready=True``, ``run`` starts the
+    reply without any user text, for a ``complete`` that has already been
+    given the whole prompt.
+
+    ``run`` may also be awaited on another event loop (server.py does), in
+    which case that loop's default executor runs the blocking calls. The
+    ``on_sentence`` and ``on_clip`` callbacks are called on the loop, in
+    reply order, as each sentence of the reply and each clip are ready.
+    """
+
+    def __init__(
+        self,
+        transcribe=None,
+        complete=None,
+        synthesize=None,
+        queue_size=4,
+        tts_concurrency=3,
+        complete_slot=None,
+    ):
+        self.transcribe = transcribe
+        self.complete = complete
+        self.synthesize = synthesize
+        self.complete_slot = complete_slot
+        self.queue_size = queue_size
+        self.tts_concurrency = tts_concurrency
+
+    async def run(
+        self,
+        wav_bytes=None,
+        user_text=None,
+        on_clip=None,
+        on_sentence=None,
+        prompt_ready=False,
+    ):
+        with span("turn") as turn:
+            result = await self._run(
+                wav_bytes, user_text, on_clip, on_sentence, prompt_ready
+            )
+            turn.set(bytes_out=sum(map(len, result.clips)), clips=len(result.clips))
+            turn.error = result.error
+        return result
+
+    async def _run(self, wav_bytes, user_text, on_clip, on_sentence, prompt_ready):
+        loop = asyncio.get_running_loop()
+        result = TurnResult(user_text=user_text or "")
+        start = time.perf_counter()
+
+        def mark(stage):
+            result.timings[stage] = time.perf_counter() - start
+
+        try:
+            if wav_bytes is not None:
+                with span("listen", bytes_in=len(wav_bytes)):
+                    result.user_text = await run_in_executor(
+                        loop, self.transcribe, wav_bytes
+                    )
+                mark("stt")
+            if not result.user_text and not prompt_ready:
+                return result
+
+            sentences = asyncio.Queue(self.queue_size)
+            clips = asyncio.Queue(self.queue_size)
+            llm = asyncio.create_task(
+                self._llm_stage(result, sentences, mark, on_sentence)
+            )
+            tts = asyncio.create_task(self._tts_stage(sentences, clips))
+            try:
+                await self._output_stage(result, clips, mark, on_clip)
+                await llm
+                await tts
+            finally:
+                llm.cancel()
+                tts.cancel()
+        except Exception as e:
+            logging.error("Voice turn failed: %s", e)
+            result.error = e
+        finally:
+            mark("total")
+            logging.info(
+                "Turn timings: %s",
+                ", ".join(f"{k}={v:.3f}s" for k, v in result.timings.items()),
+            )
+        return result
+
+    def run_sync(
+        self,
+        wav_bytes=None,
+        user_text=None,
+        on_clip=None,
+        on_sentence=None,
+        prompt_ready=False,
+        timeout=None,
+    ):
+        """Blocking wrapper for callers outside the pipeline loop"""
+        return run_sync(
+            self.run(wav_bytes, user_text, on_clip, on_sentence, prompt_ready),
+            timeout,
+        )
+
+    async def _llm_stage(self, result, sentences, mark, on_sentence):
+        loop = asyncio.get_running_loop()
+        splitter = SentenceSplitter()
+        parts = []
+        with span("llm", bytes_in=len(result.user_text.encode())) as llm:
+            try:
+                slot = (
+                    self.complete_slot()
+                    if self.complete_slot is not None
+                    else contextlib.nullcontext()
+                )
+                async with slot:
+                    deltas = await run_in_executor(
+                        loop, self.complete, result.user_text
+                    )
+                    iterator = iter(deltas)
+                    while True:
+                        delta = await run_in_executor(loop, next, iterator, _END)
+                        if delta is _END:
+                            break
+                        if not parts:
+                            mark("llm_first_token")
+                        parts.append(delta)
+                        for sentence in splitter.feed(delta):
+                            await self._emit(sentence, sentences, on_sentence)
+                for sentence in splitter.flush():
+                    await self._emit(sentence, sentences, on_sentence)
+                mark("llm")
+            except Exception as e:
+                logging.error("Reply stream failed: %s", e)
+                result.error = llm.error = e
+            finally:
+                result.reply = "".join(parts)
+                llm.set(bytes_out=len(result.reply.encode()))
+                await sentences.put(_END)
+
+    @staticmethod
+    async def _emit(sentence, sentences, on_sentence):
+        if on_sentence is not None:
+            on_sentence(sentence)
+        await sentences.put(sentence)
+
+    async def _tts_stage(self, sentences, clips):
+        loop = asyncio.get_running_loop()
+        limit = asyncio.Semaphore(self.tts_concurrency)
+
+        async def synthesize(sentence):
+            async with limit:
+                with span("tts", bytes_in=len(sentence.encode())) as tts:
+                    audio = await run_in_executor(loop, self.synthesize, sentence)
+                    tts.set(bytes_out=len(audio) if audio else 0)
+                    return audio
+
+        while True:
+            sentence = await sentences.get()
+            if sentence is _END:
+                await clips.put(_END)
+                return
+            # Clips are queued in reply order; up to tts_concurrency of them
+            # are synthesized at once
+            await clips.put(asyncio.ensure_future(synthesize(sentence)))
+
+    async def _output_stage(self, result, clips, mark, on_clip):
+        while True:
+            task = await clips.get()
+            if task is _END:
+                break
+            try:
+                audio = await task
+            except Exception as e:
+                logging.warning("Sentence TTS failed: %s", e)
+                continue
+            if not audio:
+                continue
+            if not result.clips:
+                mark("first_audio")
+            result.clips.append(audio)
+            if on_clip is not None:
+                on_clip(audio)
+        if result.clips:
+            mark("tts")
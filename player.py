@@ -0,0 +1,87 @@
+"""Progressive reply playback for the Streamlit apps.
+
+``st.audio`` plays one finished blob: the reply is only heard once all of
+it is synthesized, and the bytes stay in session state to be sent again
+with the page until dismissed. Here each clip is handed to the browser as
+soon as the pipeline makes it, in a small script for
+``st.html(html, unsafe_allow_javascript=True)`` that queues it on a player
+living in the app's page, which starts on the first clip and plays the rest
+in order. The player outlives the elements that fed it, so the rerun after
+a turn doesn't cut the reply short and nothing is kept on the server once a
+clip has been sent; played clips are released in the browser too. Nothing
+here touches Streamlit, so the apps decide where to render.
+"""
+
+import base64
+import json
+import uuid
+
+from transcode import mime_type
+
+# Installed in the app's page by the first clip. Clips are played in index
+# order whatever order their scripts run in; a new reply stops the previous
+# one.
+PLAYER_JS = """
+(() => {
+  if (window.replyPlayer) return;
+  const audio = new Audio();
+  let reply = null, next = 0, clips = new Map(), playing = false;
+
+  function release() {
+    if (audio.src) URL.revokeObjectURL(audio.src);
+    audio.removeAttribute("src");
+  }
+  function advance() {
+    release();
+    const url = clips.get(next);
+    if (url === undefined) { playing = false; return; }
+    clips.delete(next++);
+    playing = true;
+    audio.src = url;
+    audio.play().catch(advance);
+  }
+  audio.addEventListener("ended", advance);
+  audio.addEventListener("error", advance);
+
+  window.replyPlayer = {
+    enqueue(id, index, mime, data) {
+      if (id !== reply) { this.stop(); reply = id; }
+      if (index < next || clips.has(index)) return;
+      const bytes = Uint8Array.from(atob(data), (c) => c.charCodeAt(0));
+      clips.set(index, URL.createObjectURL(new Blob([bytes], { type: mime })));
+      if (!playing) advance();
+    },
+    stop() {
+      audio.pause();
+      release();
+      clips.forEach((url) => URL.revokeObjectURL(url));
+      clips.clear();
+      reply = null; next = 0; playing = false;
+    },
+  };
+})();
+"""
+
+# Stops whatever reply is playing; render it where playback must end
+STOP_HTML = f"<script>{PLAYER_JS}window.replyPlayer.stop();</script>"
+
+
+class ReplyStream:
+    """The clips of one reply, as HTML for ``st.html``, one clip each"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.clips = 0
+
+    def clip_html(self, clip):
+        args = ", ".join(
+            json.dumps(value)
+            for value in (
+                self.id,
+                self.clips,
+                mime_type(clip),
+                base64.b64encode(clip).decode("ascii"),
+            )
+        )
+        self.clips += 1
+        return f"<script>{PLAYER_JS}window.replyPlayer.enqueue({args});</script>"
@@ -0,0 +1,347 @@
+"""Headless voice API: the engine's turns over HTTP and WebSocket.
+
+    uvicorn server:app --host 0.0.0.0 --port 8000
+
+Every turn streams events as they happen: ``session`` (the id to send back
+next time), ``transcript`` (what was heard, for audio input), ``text`` (one
+per sentence of the reply), ``audio`` (one MP3 clip per sentence, in reply
+order), then ``done`` with the whole reply and stage timings, or ``error``.
+
+HTTP: ``POST /v1/turn`` with a WAV body (``?session_id=&persona=&audio=``)
+or JSON ``{"text", "session_id", "persona", "speak", "audio"}`` answers with
+NDJSON, one event per line, clips base64-encoded in ``data`` with their
+``mime`` type.
+
+WebSocket: ``/v1/ws?persona=&session_id=&audio=``. Send a binary frame per
+WAV utterance or JSON ``{"type": "text", "text"}``, ``{"type": "reset"}`` or
+``{"type": "config", "voice", "speak", "audio"}`` (``voice`` one of
+``engine.VOICES``, ``speak`` a boolean); events come back as JSON text
+frames, except clips, which are sent as raw binary frames.
+
+``audio`` is the clips' encoding for the client's connection: ``original``
+MP3, ``medium``, ``low``, a ``format:bitrate`` spec like ``opus:16k``, or
+``auto`` (the default), chosen from the Client Hints headers the server
+asks for with ``Accept-CH`` (see transcode.py). Opus clips are Ogg files;
+clips fall back to MP3 if transcoding fails, so check the first bytes
+(``OggS``) rather than trusting the format asked for.
+
+``GET /metrics`` serves per-stage latency histograms and error, retry and
+byte counters in the Prometheus text format (see tracing.py).
+
+Conversations live in this process's memory, so a load balancer in front of
+several workers or hosts must route a session back to the same one (sticky
+sessions, e.g. on the session id).
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import speech_recognition as sr
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+import http_pool
+from engine import PERSONAS, VOICES, VoiceSession
+from pipeline import PIPELINE_WORKERS
+from tracing import prometheus_text
+from transcode import mime_type, parse_profile
+
+# Conversations idle longer than this are dropped; the oldest also go once
+# there are more than MAX_SESSIONS of them
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "1000"))
+
+# Network hints browsers should send with later requests, for "auto" audio
+ACCEPT_CH = "Save-Data, ECT, Downlink"
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+
+class SessionStore:
+    """This process's conversations by id, least recently used first"""
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        # id -> [session, lock, last used]
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id=None, persona="priya"):
+        """``(session_id, session, lock)``, starting a new session if needed.
+
+        The lock serializes turns: one conversation answers one message at a
+        time, however many requests arrive for it.
+        """
+        self._expire()
+        entry = self._sessions.get(session_id) if session_id else None
+        if entry is None:
+            if persona not in PERSONAS:
+                raise KeyError(persona)
+            session_id = session_id or uuid.uuid4().hex
+            entry = [
+                VoiceSession(PERSONAS[persona], id=session_id),
+                asyncio.Lock(),
+                0.0,
+            ]
+            self._sessions[session_id] = entry
+        self._sessions.move_to_end(session_id)
+        entry[2] = time.monotonic()
+        return session_id, entry[0], entry[1]
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if entry[2] > cutoff and len(self._sessions) < self.max_sessions:
+                break
+            del self._sessions[session_id]
+
+
+sessions = SessionStore()
+# Running turns; the loop only keeps weak references to tasks
+_turns = set()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Blocking provider calls (STT, the Groq SDK, TTS) run in the default
+    # executor; size it like the Streamlit apps' pipeline loop
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+    )
+    yield
+    http_pool.close()
+
+
+app = FastAPI(title="Voice assistant", lifespan=lifespan)
+
+
+async def run_turn(
+    session, lock, emit, wav_bytes=None, text=None, speak=True, profile=None
+):
+    """One turn of ``session``, reporting events through ``emit(event)``.
+
+    Clips are emitted as bytes, everything else as dicts. The turn runs to
+    the end even if the client goes away, so the conversation stays whole.
+    """
+    loop = asyncio.get_running_loop()
+    async with lock:
+        if wav_bytes is not None:
+            try:
+                text = await loop.run_in_executor(None, session.listen, wav_bytes)
+            except sr.UnknownValueError:
+                emit({"type": "error", "message": "Could not understand the audio"})
+                return
+            except Exception as e:
+                logging.error("Speech recognition error: %s", e)
+                emit({"type": "error", "message": f"Speech recognition error: {e}"})
+                return
+            emit({"type": "transcript", "text": text})
+        if not text:
+            emit({"type": "error", "message": "Empty message"})
+            return
+
+        result = await session.turn(
+            text,
+            speak=speak,
+            on_sentence=lambda sentence: emit({"type": "text", "text": sentence}),
+            on_clip=emit,
+            profile=profile,
+        )
+        emit(
+            {
+                "type": "done",
+                "reply": result.reply,
+                "timings": result.timings,
+                "error": str(result.error) if result.error is not None else None,
+            }
+        )
+
+
+def start_turn(queue, *args, **kwargs):
+    """Run a turn in its own task; its events, then None, go on ``queue``"""
+
+    async def turn():
+        try:
+            await run_turn(*args, emit=queue.put_nowait, **kwargs)
+        except Exception as e:
+            logging.error("Voice turn failed: %s", e)
+            queue.put_nowait({"type": "error", "message": str(e)})
+        finally:
+            queue.put_nowait(None)
+
+    task = asyncio.create_task(turn())
+    _turns.add(task)
+    task.add_done_callback(_turns.discard)
+    return task
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok", "sessions": len(sessions)}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Stage latency histograms and counters for Prometheus"""
+    return PlainTextResponse(prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/v1/turn")
+async def http_turn(request: Request):
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(400, "Body is not valid JSON")
+        if not isinstance(body, dict):
+            raise HTTPException(400, "Expected a JSON object")
+        wav_bytes, text = None, body.get("text")
+        if not isinstance(text, str) or not text.strip():
+            raise HTTPException(400, '"text" must be a non-empty string')
+        for key in ("session_id", "persona", "audio"):
+            if not isinstance(body.get(key, ""), str):
+                raise HTTPException(400, f"{key!r} must be a string")
+    else:
+        body = dict(request.query_params)
+        wav_bytes, text = await request.body(), None
+    try:
+        profile = parse_profile(body.get("audio"), request.headers)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    try:
+        session_id, session, lock = sessions.get(
+            body.get("session_id"), body.get("persona", "priya")
+        )
+    except KeyError:
+        raise HTTPException(404, f"Unknown persona {body.get('persona')!r}")
+
+    queue = asyncio.Queue()
+    queue.put_nowait({"type": "session", "session_id": session_id})
+    start_turn(
+        queue,
+        session,
+        lock,
+        wav_bytes=wav_bytes,
+        text=text,
+        speak=body.get("speak", True) not in (False, "0", "false"),
+        profile=profile,
+    )
+
+    async def events():
+        while (event := await queue.get()) is not None:
+            if isinstance(event, bytes):
+                event = {
+                    "type": "audio",
+                    "mime": mime_type(event),
+                    "data": base64.b64encode(event).decode(),
+                }
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={"X-Session-Id": session_id, "Accept-CH": ACCEPT_CH},
+    )
+
+
+@app.websocket("/v1/ws")
+async def websocket_turns(
+    websocket: WebSocket,
+    persona: str = "priya",
+    session_id: str = None,
+    audio: str = None,
+):
+    try:
+        session_id, session, lock = sessions.get(session_id, persona)
+        session.audio_profile = parse_profile(audio, websocket.headers)
+    except KeyError:
+        await websocket.close(code=1008, reason=f"Unknown persona {persona!r}")
+        return
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    await websocket.accept()
+    await websocket.send_json(
+        {
+            "type": "session",
+            "session_id": session_id,
+            "greeting": session.messages[0]["content"],
+            "audio": session.audio_profile.mime_type,
+        }
+    )
+    speak = True
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                turn = {"wav_bytes": message["bytes"]}
+            else:
+                try:
+                    command = json.loads(message.get("text") or "")
+                except ValueError:
+                    command = None
+                if not isinstance(command, dict):
+                    await websocket.send_json(
+                        {"type": "error", "message": "Expected a JSON object or WAV"}
+                    )
+                    continue
+                kind = command.get("type")
+                if kind == "reset":
+                    async with lock:
+                        session.reset()
+                    await websocket.send_json({"type": "reset"})
+                    continue
+                if kind == "config":
+                    voice = command.get("voice")
+                    try:
+                        if voice is not None and voice not in VOICES.values():
+                            raise ValueError(f"Unknown voice {voice!r}")
+                        if not isinstance(command.get("speak", speak), bool):
+                            raise ValueError('"speak" must be a boolean')
+                        profile = session.audio_profile
+                        if command.get("audio"):
+                            profile = parse_profile(command["audio"], websocket.headers)
+                    except ValueError as e:
+                        # Nothing is changed by a config with a bad value
+                        await websocket.send_json({"type": "error", "message": str(e)})
+                        continue
+                    session.voice = voice or session.voice
+                    speak = command.get("speak", speak)
+                    session.audio_profile = profile
+                    continue
+                if kind != "text":
+                    await websocket.send_json(
+                        {"type": "error", "message": f"Unknown message {kind!r}"}
+                    )
+                    continue
+                if not isinstance(command.get("text"), str):
+                    await websocket.send_json(
+                        {"type": "error", "message": '"text" must be a string'}
+                    )
+                    continue
+                turn = {"text": command["text"]}
+
+            # One turn at a time per connection, sent in the order produced
+            queue = asyncio.Queue()
+            start_turn(queue, session, lock, speak=speak, **turn)
+            while (event := await queue.get()) is not None:
+                if isinstance(event, bytes):
+                    await websocket.send_bytes(event)
+                else:
+                    await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
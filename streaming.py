@@ -0,0 +1,46 @@
+import re
+
+# A sentence ends at ., ! or ? (optionally followed by closing quotes/brackets)
+# and whitespace, or at a line break (bullet lists rarely end with a period).
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n+")
+
+# Very short fragments ("Hi!", "1.") are merged with the next sentence so we
+# don't pay a TTS round trip for half a second of audio.
+MIN_SENTENCE_CHARS = 25
+
+
+def iter_text_deltas(stream):
+    """Yield the text deltas of a streamed chat completion."""
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+class SentenceSplitter:
+    """Incrementally group text deltas into sentences as soon as they complete."""
+
+    def __init__(self, min_chars=MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, delta):
+        """Add a delta and return the sentences it completed"""
+        self._buffer += delta
+        sentences = []
+        while True:
+            match = SENTENCE_BOUNDARY.search(self._buffer, self.min_chars)
+            if match is None:
+                break
+            sentence = self._buffer[: match.start()].strip()
+            self._buffer = self._buffer[match.end() :]
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+
+    def flush(self):
+        """Return whatever is left once the stream has ended"""
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
@@ -0,0 +1,214 @@
+"""Speech-to-text backends.
+
+``STT_BACKEND`` selects the engine used by ``transcribe``:
+
+- ``google`` (default): the free Google Web Speech API via SpeechRecognition.
+- ``vosk``: offline Kaldi models (``pip install vosk``), model directory in
+  ``VOSK_MODEL_PATH``.
+- ``whisper``: offline CTranslate2 Whisper (``pip install faster-whisper``),
+  model name or path in ``WHISPER_MODEL`` (default ``base.en``).
+
+Local models are loaded once per process and shared by every session.
+Backends raise ``sr.UnknownValueError`` when no speech is recognized and
+``sr.RequestError`` when the engine itself fails, like ``recognize_google``.
+"""
+
+import audioop
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+import speech_recognition as sr
+
+from tracing import span
+
+
+@dataclass
+class Transcript:
+    text: str
+    backend: str
+    audio_seconds: float
+    elapsed: float
+
+    @property
+    def rtf(self):
+        """Real-time factor: processing time per second of audio"""
+        return self.elapsed / self.audio_seconds if self.audio_seconds else 0.0
+
+
+class STTBackend:
+    name = "base"
+
+    def transcribe(self, audio):
+        """Return the text spoken in ``audio`` (an ``sr.AudioData``)"""
+        raise NotImplementedError
+
+
+class GoogleSTT(STTBackend):
+    name = "google"
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, audio):
+        return self.recognizer.recognize_google(audio)
+
+
+class VoskSTT(STTBackend):
+    name = "vosk"
+    sample_rate = 16000
+
+    def __init__(self, model_path):
+        try:
+            import vosk
+        except ImportError as e:
+            raise RuntimeError("STT_BACKEND=vosk requires `pip install vosk`") from e
+
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.model = vosk.Model(model_path)
+
+    def transcribe(self, audio):
+        pcm = audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2)
+        # Recognizers are cheap and stateful; the model is shared
+        recognizer = self._vosk.KaldiRecognizer(self.model, self.sample_rate)
+        try:
+            recognizer.AcceptWaveform(pcm)
+            text = json.loads(recognizer.FinalResult()).get("text", "")
+        except Exception as e:
+            raise sr.RequestError(f"Vosk recognition failed: {e}") from e
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class WhisperSTT(STTBackend):
+    name = "whisper"
+    sample_rate = 16000
+
+    def __init__(self, model_name, threads=0):
+        try:
+            import numpy as np
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError(
+                "STT_BACKEND=whisper requires `pip install faster-whisper`"
+            ) from e
+
+        self._np = np
+        self.model = WhisperModel(
+            model_name, device="cpu", compute_type="int8", cpu_threads=threads
+        )
+        # CTranslate2 already uses every CPU thread for a single utterance
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio):
+        pcm = audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2)
+        samples = self._np.frombuffer(pcm, dtype=self._np.int16).astype(
+            self._np.float32
+        )
+        samples /= 32768.0
+        try:
+            with self._lock:
+                segments, _ = self.model.transcribe(samples, beam_size=1, language="en")
+                text = " ".join(segment.text.strip() for segment in segments)
+        except Exception as e:
+            raise sr.RequestError(f"Whisper recognition failed: {e}") from e
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+def window_energies(audio, window_seconds=0.03):
+    """RMS energy of consecutive fixed-size windows of ``audio``"""
+    width = audio.sample_width
+    step = max(int(audio.sample_rate * window_seconds), 1) * width
+    data = audio.frame_data
+    energies = [
+        audioop.rms(data[i : i + step], width) for i in range(0, len(data), step)
+    ]
+    return step, energies
+
+
+def estimate_energy_threshold(audio, ratio=1.5, quantile=0.2):
+    """Speech/silence threshold from one pass over a recording.
+
+    Takes the noise floor as the ``quantile`` of window energies (the quiet
+    stretches before, between and after words) and scales it by ``ratio``,
+    the same margin ``Recognizer.adjust_for_ambient_noise`` applies, without
+    consuming any of the recording.
+    """
+    _, energies = window_energies(audio)
+    if not energies:
+        return None
+    noise_floor = sorted(energies)[int((len(energies) - 1) * quantile)]
+    return max(noise_floor * ratio, 1.0)
+
+
+def trim_silence(audio, energy_threshold, padding_seconds=0.2):
+    """Drop leading and trailing silence so the STT engine sees less audio"""
+    step, energies = window_energies(audio)
+    voiced = [i for i, energy in enumerate(energies) if energy > energy_threshold]
+    if not voiced:
+        return audio
+
+    padding = int(audio.sample_rate * padding_seconds) * audio.sample_width
+    start = max(voiced[0] * step - padding, 0)
+    end = min((voiced[-1] + 1) * step + padding, len(audio.frame_data))
+    return sr.AudioData(
+        audio.frame_data[start:end], audio.sample_rate, audio.sample_width
+    )
+
+
+def get_backend(name=None):
+    """Process-wide backend instance for ``name`` (defaults to STT_BACKEND)"""
+    return _load_backend((name or os.getenv("STT_BACKEND", "google")).lower())
+
+
+@lru_cache(maxsize=None)
+def _load_backend(name):
+    if name == "google":
+        return GoogleSTT()
+    if name == "vosk":
+        return VoskSTT(os.getenv("VOSK_MODEL_PATH", "models/vosk-model-small-en-us"))
+    if name == "whisper":
+        return WhisperSTT(
+            os.getenv("WHISPER_MODEL", "base.en"),
+            threads=int(os.getenv("WHISPER_THREADS", "0")),
+        )
+    raise ValueError(f"Unknown STT_BACKEND: {name}")
+
+
+def transcribe(audio, backend=None):
+    """Transcribe ``audio`` and report how fast it ran"""
+    backend = backend or get_backend()
+    audio_seconds = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+
+    start = time.perf_counter()
+    with span(
+        "stt",
+        provider=backend.name,
+        bytes_in=len(audio.frame_data),
+        audio_seconds=round(audio_seconds, 3),
+    ) as call:
+        text = backend.transcribe(audio)
+        call.set(bytes_out=len(text.encode()))
+    transcript = Transcript(
+        text=text,
+        backend=backend.name,
+        audio_seconds=audio_seconds,
+        elapsed=time.perf_counter() - start,
+    )
+
+    logging.info(
+        "STT %s: %.2fs of audio in %.2fs (RTF %.2f)",
+        transcript.backend,
+        transcript.audio_seconds,
+        transcript.elapsed,
+        transcript.rtf,
+    )
+    return transcript
@@ -0,0 +1,112 @@
+import json
+import random
+
+import pytest
+
+from analytics import SENTIMENTS, ConversationStats, TurnLog
+
+TOPICS = ["career", "skills", "salary", "resume", "visa"]
+
+
+def conversation(seed, turns=40):
+    """(role, content, topics, sentiment, timings) rows of a made-up chat"""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(turns):
+        rows.append(
+            (
+                "user",
+                "x" * rng.randint(1, 200),
+                rng.sample(TOPICS, rng.randint(0, 3)),
+                rng.choice(SENTIMENTS + ("frustrated",)),
+                None,
+            )
+        )
+        timings = {"first_audio": rng.uniform(0.2, 2), "total": rng.uniform(2, 9)}
+        rows.append(("assistant", "y" * rng.randint(1, 900), [], None, timings))
+    return rows
+
+
+def old_sidebar(rows):
+    """Sidebar figures from per-message lists, as main9 had them before
+    ConversationStats, extended to sentiments from a custom lexicon"""
+    topics_discussed, user_sentiment = [], []
+    for role, _, topics, sentiment, _ in rows:
+        for topic in topics:
+            if topic not in topics_discussed:
+                topics_discussed.append(topic)
+        if sentiment is not None:
+            user_sentiment.append(sentiment)
+    counts = {name: user_sentiment.count(name) for name in dict.fromkeys(SENTIMENTS)}
+    for name in user_sentiment:
+        counts.setdefault(name, user_sentiment.count(name))
+    dominant = max(counts, key=counts.get) if user_sentiment else None
+    return {
+        "user": sum(role == "user" for role, *_ in rows),
+        "assistant": sum(role == "assistant" for role, *_ in rows),
+        "topics": topics_discussed,
+        "sentiment_counts": counts,
+        "dominant": dominant,
+    }
+
+
+def record(rows):
+    stats = ConversationStats()
+    for role, content, topics, sentiment, timings in rows:
+        stats.record(role, content, topics, sentiment, timings)
+    return stats
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_running_totals_match_per_message_counts(seed):
+    rows = conversation(seed)
+    stats = record(rows)
+    expected = old_sidebar(rows)
+    assert len(stats) == len(rows)
+    assert stats.user_messages == expected["user"]
+    assert stats.assistant_messages == expected["assistant"]
+    assert stats.topics == expected["topics"]
+    assert (
+        dict(zip(stats.sentiment_names, stats.sentiment_counts))
+        == expected["sentiment_counts"]
+    )
+    assert stats.dominant_sentiment() == expected["dominant"]
+
+
+def test_ties_go_to_the_earlier_sentiment():
+    stats = record(
+        [
+            ("user", "a", [], "uncertain", None),
+            ("user", "b", [], "negative", None),
+        ]
+    )
+    assert stats.dominant_sentiment() == "negative"
+    assert ConversationStats().dominant_sentiment() is None
+
+
+def test_rows_round_trip_each_message():
+    rows = conversation(7, turns=5)
+    stats = record(rows)
+    for index, (role, content, topics, sentiment, timings) in enumerate(rows):
+        row = stats.row(index)
+        assert row["role"] == role
+        assert row["length"] == len(content)
+        assert row["topics"] == topics
+        assert row["sentiment"] == sentiment
+        if timings is None:
+            assert row["first_audio"] is row["total"] is None
+        else:
+            # Stored as float32
+            for stage in ("first_audio", "total"):
+                assert row[stage] == pytest.approx(timings[stage], abs=1e-3)
+
+
+def test_turn_log_appends_rows(tmp_path):
+    path = tmp_path / "analytics.jsonl"
+    log = TurnLog(str(path))
+    stats = record(conversation(1, turns=2))
+    for index in range(len(stats)):
+        log.write("abc", stats.row(index))
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["conversation"] for line in lines] == ["abc"] * 4
+    assert [line["role"] for line in lines] == ["user", "assistant"] * 2
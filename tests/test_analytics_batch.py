@@ -0,0 +1,81 @@
+import json
+from collections import Counter
+
+import pytest
+
+from analytics import SENTIMENTS, TurnLog
+
+from test_analytics import conversation, old_sidebar, record
+
+np = pytest.importorskip("numpy")
+import analytics_batch  # noqa: E402
+
+
+@pytest.fixture
+def logs(tmp_path):
+    """Eight conversations spread over two log files, plus their rows"""
+    conversations = {}
+    paths = [tmp_path / "a.jsonl", tmp_path / "b.jsonl"]
+    for n in range(8):
+        rows = conversation(n, turns=5 + n)
+        conversations[f"c{n}"] = rows
+        log = TurnLog(str(paths[n % 2]))
+        stats = record(rows)
+        for index in range(len(stats)):
+            log.write(f"c{n}", stats.row(index))
+    with open(paths[0], "a") as f:
+        f.write("not json\n" + json.dumps({"role": "system"}) + "\n")
+    return [str(path) for path in paths], conversations
+
+
+def test_report_matches_per_conversation_counts(logs):
+    paths, conversations = logs
+    result = analytics_batch.report(analytics_batch.load(paths))
+
+    all_rows = [row for rows in conversations.values() for row in rows]
+    assert result["conversations"] == len(conversations)
+    assert result["messages"] == len(all_rows)
+    assert result["user_messages"] == sum(r[0] == "user" for r in all_rows)
+
+    mentions = Counter(topic for row in all_rows for topic in row[2])
+    reach = Counter(
+        topic
+        for rows in conversations.values()
+        for topic in {topic for row in rows for topic in row[2]}
+    )
+    assert {t["topic"]: t["mentions"] for t in result["topics"]} == mentions
+    assert {t["topic"]: t["conversations"] for t in result["topics"]} == reach
+    counts = [t["mentions"] for t in result["topics"]]
+    assert counts == sorted(counts, reverse=True)
+
+    sentiments = Counter(row[3] for row in all_rows if row[3] is not None)
+    dominant = Counter(old_sidebar(rows)["dominant"] for rows in conversations.values())
+    for name in [*SENTIMENTS, "frustrated"]:
+        assert result["sentiment"][name] == {
+            "messages": sentiments[name],
+            "dominant_in": dominant[name],
+        }
+
+
+def test_latency_percentiles(logs):
+    paths, conversations = logs
+    result = analytics_batch.report(analytics_batch.load(paths))
+    totals = [
+        row[4]["total"]
+        for rows in conversations.values()
+        for row in rows
+        if row[4] is not None
+    ]
+    expected = np.percentile(np.asarray(totals, dtype=np.float32), (50, 95, 99))
+    assert list(result["latency"]["total"].values()) == pytest.approx(
+        expected, abs=1e-3
+    )
+
+
+def test_empty_logs(tmp_path):
+    path = tmp_path / "empty.jsonl"
+    path.write_text("")
+    result = analytics_batch.report(analytics_batch.load([str(path)]))
+    assert result["messages"] == 0
+    assert result["topics"] == []
+    assert result["latency"] == {"first_audio": None, "total": None}
@@ -0,0 +1,96 @@
+import os
+
+import pytest
+import speech_recognition as sr
+
+import stt
+from benchmarks import bench_stt
+
+FIXTURE = os.path.join(bench_stt.FIXTURES_DIR, "hows_it_going.wav")
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "models/vosk-model-small-en-us")
+
+
+class StubVosk(stt.STTBackend):
+    name = "vosk"
+    loads = 0
+
+    def __init__(self, model_path):
+        StubVosk.loads += 1
+        self.model_path = model_path
+
+    def transcribe(self, audio):
+        return "hi how's it going"
+
+
+class OfflineGoogle(stt.STTBackend):
+    name = "google"
+
+    def transcribe(self, audio):
+        raise sr.RequestError("recognition connection failed")
+
+
+@pytest.fixture
+def stub_backends(monkeypatch):
+    StubVosk.loads = 0
+    monkeypatch.setattr(stt, "VoskSTT", StubVosk)
+    monkeypatch.setattr(stt, "GoogleSTT", OfflineGoogle)
+    monkeypatch.setenv("VOSK_MODEL_PATH", "models/test-model")
+    stt._load_backend.cache_clear()
+    yield
+    stt._load_backend.cache_clear()
+
+
+def test_fixture_is_labeled():
+    assert bench_stt.DEFAULT_FIXTURES[0] == FIXTURE
+    assert bench_stt.label(FIXTURE) == "Hi, how's it going?"
+    assert bench_stt.load(FIXTURE).sample_rate == 16000
+
+
+def test_word_error_rate():
+    assert bench_stt.word_error_rate("Hi, how's it going?", "hi how's it going") == 0
+    assert bench_stt.word_error_rate("Hi, how's it going?", "how is it going") == 0.5
+    assert bench_stt.word_error_rate("Hi there", "") == 1
+
+
+def test_backends_selected_and_loaded_once(stub_backends, monkeypatch, capsys):
+    monkeypatch.setenv("STT_BACKEND", "vosk")
+    bench_stt.main([FIXTURE, FIXTURE, "--repeat", "2"])
+    bench_stt.main([FIXTURE, "--backend", "vosk", "--repeat", "1"])
+
+    assert StubVosk.loads == 1
+    assert stt.get_backend().model_path == "models/test-model"
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3
+    for line in lines:
+        assert line.startswith("    vosk hows_it_going.wav: 1.94s audio, best RTF 0.")
+        assert "WER 0%" in line
+
+
+def test_request_error_skips_backend(stub_backends, capsys):
+    bench_stt.main([FIXTURE, FIXTURE, "--backend", "google", "--backend", "vosk"])
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == (
+        "  google: request failed, skipping backend: recognition connection failed"
+    )
+    assert lines[1:] and all(line.startswith("    vosk ") for line in lines[1:])
+
+
+def test_unknown_backend_reported(stub_backends, capsys):
+    bench_stt.main([FIXTURE, "--backend", "nope"])
+    assert "backend unavailable: Unknown STT_BACKEND: nope" in capsys.readouterr().out
+
+
+@pytest.mark.skipif(
+    not os.path.isdir(VOSK_MODEL_PATH), reason="no Vosk model in VOSK_MODEL_PATH"
+)
+def test_vosk_transcribes_fixture():
+    pytest.importorskip("vosk")
+    stt._load_backend.cache_clear()
+    backend = stt.get_backend("vosk")
+    assert backend is stt.get_backend("vosk")
+
+    transcript = stt.transcribe(bench_stt.load(FIXTURE), backend)
+    assert transcript.backend == "vosk"
+    assert 0 < transcript.rtf < 1
+    assert bench_stt.word_error_rate(bench_stt.label(FIXTURE), transcript.text) <= 0.5
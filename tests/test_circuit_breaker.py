@@ -0,0 +1,138 @@
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(
+        "test",
+        failure_threshold=3,
+        slow_call_seconds=2.0,
+        reset_timeout=30.0,
+        clock=clock,
+    )
+
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+    assert not breaker.allow_request()
+    assert breaker.rejected == 1
+
+
+def test_slow_calls_count_as_failures(breaker):
+    for _ in range(3):
+        breaker.record_success(2.5)
+    assert breaker.state == OPEN
+
+
+def test_half_open_lets_one_probe_through(breaker, clock):
+    trip(breaker)
+    clock.now = 29.9
+    assert not breaker.allow_request()
+
+    clock.now = 30.0
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    # Everyone else keeps using the fallback while the probe runs
+    assert not breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+def test_successful_probe_closes(breaker, clock):
+    trip(breaker)
+    clock.now = 30.0
+    assert breaker.allow_request()
+    breaker.record_success(0.5)
+
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+    # The failure count starts over
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+@pytest.mark.parametrize("fail", ["error", "slow"])
+def test_failed_probe_reopens_for_another_timeout(breaker, clock, fail):
+    trip(breaker)
+    clock.now = 30.0
+    assert breaker.allow_request()
+    if fail == "error":
+        breaker.record_failure()
+    else:
+        breaker.record_success(5.0)
+
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+    clock.now = 59.9
+    assert not breaker.allow_request()
+    clock.now = 60.0
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+
+
+def test_health_tracks_outcomes(breaker):
+    breaker.record_failure()
+    assert breaker.health == pytest.approx(0.8)
+    breaker.record_success(0.1)
+    assert breaker.health == pytest.approx(0.84)
+
+
+def test_unreported_probe_is_given_up_on(breaker, clock):
+    trip(breaker)
+    clock.now = 30.0
+    assert breaker.allow_request()
+    # The probe never reports back
+    clock.now = 59.9
+    assert not breaker.allow_request()
+    clock.now = 60.0
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+
+
+def test_cancelled_probe_reopens(breaker, clock):
+    trip(breaker)
+    clock.now = 30.0
+    assert breaker.allow_request()
+    breaker.record_cancelled()
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+    clock.now = 60.0
+    assert breaker.allow_request()
+
+
+def test_cancelled_call_while_closed_is_ignored(breaker):
+    breaker.record_cancelled()
+    assert breaker.state == CLOSED
+    assert breaker.health == 1.0
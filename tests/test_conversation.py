@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from conversation import CombinedReplyStream
+
+REPLY = 'She said "hi" \\ then left.\nNext line: café, 😀 and tab\tend / slash.'
+QUESTIONS = ["Which role?", "When can you start?", "Why 100x?"]
+
+
+def response(reply=REPLY, summary=None):
+    return json.dumps(
+        {"reply": reply, "follow_up_questions": QUESTIONS, "summary": summary}
+    )
+
+
+def chunks(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 13])
+def test_escapes_split_across_deltas(size):
+    raw = response()
+    # ensure_ascii escapes the accent and the emoji as \u sequences
+    assert "\\ud83d\\ude00" in raw and "\\u00e9" in raw
+
+    stream = CombinedReplyStream()
+    assert "".join(stream.iter_reply(chunks(raw, size))) == REPLY
+    extras = stream.result()
+    assert extras.reply == REPLY.strip()
+    assert extras.follow_up_questions == QUESTIONS
+    assert extras.summary is None
+
+
+def test_every_split_point():
+    raw = response()
+    for split in range(len(raw)):
+        stream = CombinedReplyStream()
+        reply = "".join(stream.iter_reply([raw[:split], raw[split:]]))
+        assert reply == REPLY, split
+
+
+def test_unescaped_unicode_and_code_fence():
+    raw = "```json\n" + json.dumps({"reply": REPLY}, ensure_ascii=False) + "\n```"
+    stream = CombinedReplyStream()
+    assert "".join(stream.iter_reply(chunks(raw, 1))) == REPLY
+    assert not stream.plain_text
+
+
+def test_reply_is_streamed_before_the_json_ends():
+    stream = CombinedReplyStream()
+    assert stream.feed('{"rep') == ""
+    assert stream.feed('ly": "Hello') == "Hello"
+    assert stream.feed(" there\\") == " there"
+    assert stream.feed('n", "follow') == "\n"
+    assert stream.feed('_up_questions": []}') == ""
+
+
+def test_plain_text_passes_through():
+    stream = CombinedReplyStream()
+    text = "  Sure, happy to help. "
+    assert "".join(stream.iter_reply(chunks(text, 4))) == text
+    assert stream.plain_text
+    assert stream.result(want_summary=True).reply is None
+
+
+def test_summary_only_when_wanted():
+    raw = response(summary="User wants a data role.")
+    stream = CombinedReplyStream()
+    list(stream.iter_reply([raw]))
+    assert stream.result().summary is None
+    assert stream.result(want_summary=True).summary == "User wants a data role."
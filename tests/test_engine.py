@@ -0,0 +1,94 @@
+import io
+import math
+import struct
+import wave
+
+import pytest
+import speech_recognition as sr
+
+import engine
+from stt import Transcript, estimate_energy_threshold, trim_silence
+
+RATE = 16000
+
+
+def wav(*parts):
+    """A WAV of (seconds, amplitude) stretches of a 440 Hz tone"""
+    samples = []
+    for seconds, amplitude in parts:
+        samples += [
+            int(amplitude * math.sin(2 * math.pi * 440 * i / RATE))
+            for i in range(int(seconds * RATE))
+        ]
+    output = io.BytesIO()
+    with wave.open(output, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(RATE)
+        f.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+    return output.getvalue()
+
+
+def load(wav_bytes):
+    with sr.AudioFile(io.BytesIO(wav_bytes)) as source:
+        return sr.Recognizer().record(source)
+
+
+@pytest.fixture
+def heard(monkeypatch):
+    """Seconds of audio each transcribe() call was given"""
+    seconds = []
+
+    def transcribe(audio):
+        seconds.append(len(audio.frame_data) / (audio.sample_rate * 2))
+        return Transcript("hello", "stub", seconds[-1], 0.0)
+
+    monkeypatch.setattr(engine, "transcribe", transcribe)
+    return seconds
+
+
+def test_listen_keeps_whole_recording_by_default(heard):
+    listener = engine.Listener(trim=False)
+    assert listener.listen(wav((1.0, 0), (0.5, 8000), (1.0, 0))) == "hello"
+    assert heard == [pytest.approx(2.5)]
+
+
+def test_trim_uses_each_recordings_own_noise_floor(heard):
+    listener = engine.Listener(trim=True)
+    # Loud throughout, as if recorded next to a fan
+    listener.listen(wav((2.0, 6000)))
+    # Silence, soft speech, loud speech, silence: only the silence goes
+    listener.listen(wav((1.0, 0), (0.5, 1000), (0.5, 8000), (1.0, 0)))
+    assert heard[0] == pytest.approx(2.0)
+    assert heard[1] == pytest.approx(1.0 + 2 * 0.2, abs=0.05)
+
+
+def test_soft_onset_is_kept(heard):
+    # Room noise, a word that starts softly, its loud part, room noise
+    recording = wav((1.0, 300), (0.3, 700), (0.5, 8000), (1.0, 300))
+
+    engine.Listener().listen(recording)
+    assert heard[-1] == pytest.approx(2.8)
+
+    engine.Listener(trim=True).listen(recording)
+    assert heard[-1] == pytest.approx(0.3 + 0.5 + 2 * 0.2, abs=0.05)
+
+    # A threshold kept from a loud earlier recording cuts the soft start
+    audio = trim_silence(
+        load(recording), estimate_energy_threshold(load(wav((2.0, 3000))))
+    )
+    assert len(audio.frame_data) / (RATE * 2) == pytest.approx(0.5 + 2 * 0.2, abs=0.05)
+
+
+def test_stt_time_is_claimed_once_by_the_spoken_turn(heard):
+    listener = engine.Listener()
+    assert listener.stt_seconds("hello") is None
+
+    listener.listen(wav((0.5, 8000)))
+    assert listener.stt_seconds("something typed") is None
+    # Claimed (or passed over) by the first turn after the recording
+    assert listener.stt_seconds("hello") is None
+
+    listener.listen(wav((0.5, 8000)))
+    assert listener.stt_seconds("hello") > 0
+    assert listener.stt_seconds("hello") is None
@@ -0,0 +1,150 @@
+from concurrent.futures import Future
+
+import pytest
+
+from history import HISTORY_LOW_WATERMARK, HistoryWindow, prompt_tokens
+
+GREETING = {"role": "assistant", "content": "Hello, how can I help?"}
+
+
+def conversation(turns):
+    messages = [GREETING]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i} " + "why " * 30})
+        messages.append({"role": "assistant", "content": f"answer {i} " + "so " * 60})
+    return messages
+
+
+# Room for about three turns
+BUDGET = prompt_tokens(conversation(3)) + 5
+
+
+class Summarizer:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, summary, messages):
+        self.calls.append((summary, list(messages)))
+        if self.fail:
+            raise RuntimeError("rate limited")
+        return f" summary of {len(self.calls)} folds "
+
+
+class ManualExecutor:
+    """Runs nothing; the test completes the futures"""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.job = (fn, args)
+        self.futures.append(future)
+        return future
+
+    def finish(self):
+        future = self.futures[-1]
+        fn, args = future.job
+        future.set_result(fn(*args))
+
+
+def verbatim(window):
+    return [message for message in window if message["role"] != "system"]
+
+
+def test_under_budget_is_sent_whole():
+    summarize = Summarizer()
+    window = HistoryWindow(budget=BUDGET, summarize=summarize)
+    messages = conversation(3)
+    assert window.build(messages) == messages
+    assert summarize.calls == []
+
+
+def test_fold_down_to_low_watermark():
+    summarize = Summarizer()
+    window = HistoryWindow(budget=BUDGET, summarize=summarize)
+    messages = conversation(5)
+
+    built = window.build(messages)
+    assert len(summarize.calls) == 1
+    summary, folded = summarize.calls[0]
+    assert summary == ""
+    assert folded == messages[: window.folded]
+    assert built[0] == {
+        "role": "system",
+        "content": "Summary of the earlier conversation: summary of 1 folds",
+    }
+    assert verbatim(built) == messages[window.folded :]
+    assert built[1]["role"] == "user"
+    assert prompt_tokens(verbatim(built)) <= BUDGET * HISTORY_LOW_WATERMARK
+
+    # Room to grow before the next fold, which only sends what's new
+    messages += conversation(1)[1:]
+    assert len(verbatim(window.build(messages))) == len(messages) - window.folded
+    assert len(summarize.calls) == 1
+    messages += conversation(2)[1:]
+    previous = window.folded
+    window.build(messages)
+    assert summarize.calls[1] == (
+        "summary of 1 folds",
+        messages[previous : window.folded],
+    )
+
+
+def test_background_fold_is_collected_on_a_later_build():
+    summarize = Summarizer()
+    executor = ManualExecutor()
+    window = HistoryWindow(budget=BUDGET, summarize=summarize, executor=executor)
+    messages = conversation(5)
+
+    built = window.build(messages)
+    # The overflow is left out while the summary is being made
+    assert len(executor.futures) == 1
+    assert all(message["role"] != "system" for message in built)
+    assert prompt_tokens(built) <= BUDGET
+    assert window.folded == 0
+
+    window.build(messages)
+    assert len(executor.futures) == 1
+
+    executor.finish()
+    built = window.build(messages)
+    assert window.summary == "summary of 1 folds"
+    assert built[0]["content"].endswith("summary of 1 folds")
+    assert verbatim(built) == messages[window.folded :]
+    assert window.folded > 0
+
+
+def test_failed_summary_drops_turns():
+    window = HistoryWindow(budget=BUDGET, summarize=Summarizer(fail=True))
+    built = window.build(conversation(5))
+    assert window.summary == ""
+    assert window.folded == 0
+    assert prompt_tokens(built) <= BUDGET
+    assert built[0]["role"] == "user"
+
+
+def test_reset_cancels_pending_fold():
+    executor = ManualExecutor()
+    window = HistoryWindow(budget=BUDGET, summarize=Summarizer(), executor=executor)
+    window.build(conversation(5))
+    window.reset()
+    assert executor.futures[0].cancelled()
+    assert window.build(conversation(1)) == conversation(1)
+
+
+@pytest.mark.parametrize("use_executor", [False, True])
+def test_cleared_conversation_starts_over(use_executor):
+    executor = ManualExecutor() if use_executor else None
+    window = HistoryWindow(budget=BUDGET, summarize=Summarizer(), executor=executor)
+    window.build(conversation(5))
+    if executor:
+        executor.finish()
+        window.build(conversation(5))
+    assert window.summary
+
+    # Fewer messages than were folded: the chat was cleared
+    assert window.build([GREETING]) == [GREETING]
+    assert window.summary == ""
+    assert window.folded == 0
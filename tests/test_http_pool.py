@@ -0,0 +1,60 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import http_pool
+import tts
+from benchmarks.fakes import FakePuterServer
+
+
+@pytest.fixture
+def puter(monkeypatch):
+    http_pool.close()
+    with FakePuterServer(base_delay=0) as server:
+        monkeypatch.setattr(tts, "PUTER_TTS_URL", server.url)
+        yield server
+    http_pool.close()
+
+
+def test_one_session_per_thread_on_one_adapter():
+    sessions = [http_pool.get_session(), http_pool.get_session()]
+    thread = threading.Thread(target=lambda: sessions.append(http_pool.get_session()))
+    thread.start()
+    thread.join()
+    assert sessions[0] is sessions[1]
+    assert sessions[2] is not sessions[0]
+    adapters = {id(s.get_adapter("https://example.com")) for s in sessions}
+    assert adapters == {id(http_pool._adapter)}
+
+
+def test_calls_reuse_pooled_connections(puter):
+    for _ in range(10):
+        assert tts.puter_tts("hello")
+    assert puter.requests == 10
+    assert puter.connections == 1
+
+    # Threads share the pool: no more connections than calls in flight
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert all(executor.map(tts.puter_tts, ["hello"] * 40))
+    assert puter.requests == 50
+    assert puter.connections <= 1 + 4
+
+
+def test_close_drops_connections_but_sessions_keep_working(puter):
+    tts.puter_tts("hello")
+    tts.puter_tts("hello")
+    assert puter.connections == 1
+
+    http_pool.close()
+    assert tts.puter_tts("hello")
+    assert puter.connections == 2
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    monkeypatch.setattr(http_pool, "HTTP_RETRY_BACKOFF", 0.5)
+    monkeypatch.setattr(http_pool, "HTTP_RETRY_BACKOFF_MAX", 4.0)
+    delays = [http_pool.backoff_delay(1) for _ in range(200)]
+    assert all(0 <= d <= 0.5 for d in delays)
+    assert len(set(delays)) > 1
+    assert all(0 <= http_pool.backoff_delay(10) <= 4.0 for _ in range(200))
@@ -0,0 +1,99 @@
+import base64
+import binascii
+import json
+
+import pytest
+
+from json_audio import MAX_PREALLOCATE_BYTES, StreamingAudioParser
+
+# Every byte value, so the base64 has "/" and "+" in it
+AUDIO = bytes(range(256)) * 4
+
+
+def body(data=None, **fields):
+    document = dict(fields)
+    if data is not None:
+        document["audio"] = {"format": "mp3", "data": data}
+    return json.dumps(document).encode()
+
+
+def parse(body, chunk_size=None, size_hint=0):
+    parser = StreamingAudioParser(size_hint=size_hint)
+    chunk_size = chunk_size or len(body)
+    decoded = 0
+    for i in range(0, len(body), chunk_size):
+        decoded += parser.feed(body[i : i + chunk_size])
+    document = parser.close()
+    assert decoded == parser.size
+    return parser, document
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 4, 7, 1024, None])
+def test_decodes_audio_in_any_chunking(chunk_size):
+    data = base64.b64encode(AUDIO).decode()
+    parser, document = parse(
+        body(data, model="tts-1", text='say "hi"\n'), chunk_size, len(data) * 3 // 4
+    )
+    assert parser.found
+    assert bytes(parser.buffer) == AUDIO
+    assert document == {
+        "model": "tts-1",
+        "text": 'say "hi"\n',
+        "audio": {"format": "mp3", "data": ""},
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, None])
+def test_escaped_slashes_and_wrapped_lines(chunk_size):
+    encoded = base64.encodebytes(AUDIO).decode()
+    assert "/" in encoded and "\n" in encoded
+    # json.dumps leaves "/" alone; escape it the way some encoders do
+    raw = body(encoded).replace(b"/", b"\\/")
+    assert b"\\/" in raw and b"\\n" in raw
+
+    parser, _ = parse(raw, chunk_size)
+    assert bytes(parser.buffer) == AUDIO
+
+
+@pytest.mark.parametrize("size_hint", [0, 10, len(AUDIO), len(AUDIO) * 3])
+def test_size_hint_only_preallocates(size_hint):
+    parser, _ = parse(body(base64.b64encode(AUDIO).decode()), 100, size_hint)
+    assert bytes(parser.buffer) == AUDIO
+    assert parser.size == len(AUDIO)
+
+
+def test_size_hint_is_capped():
+    parser = StreamingAudioParser(size_hint=MAX_PREALLOCATE_BYTES * 10)
+    assert len(parser.buffer) == MAX_PREALLOCATE_BYTES
+
+
+def test_missing_audio_field():
+    parser, document = parse(body(None, error="quota exceeded"), 1)
+    assert not parser.found
+    assert parser.size == 0
+    assert document == {"error": "quota exceeded"}
+
+
+def test_data_outside_the_path_is_kept():
+    raw = json.dumps({"data": "not audio", "audio": {"data": "AAEC"}}).encode()
+    parser, document = parse(raw, 1)
+    assert bytes(parser.buffer) == b"\x00\x01\x02"
+    assert document == {"data": "not audio", "audio": {"data": ""}}
+
+
+def test_duplicate_audio_field():
+    raw = b'{"audio": {"data": "AAEC", "data": "AAEC"}}'
+    with pytest.raises(ValueError, match="duplicate audio.data"):
+        parse(raw, 1)
+
+
+def test_bad_escape_in_audio():
+    with pytest.raises(binascii.Error):
+        parse(b'{"audio": {"data": "AA\\tEC"}}')
+
+
+def test_truncated_document():
+    parser = StreamingAudioParser()
+    parser.feed(b'{"audio": {"data": "AAEC')
+    with pytest.raises(ValueError, match="truncated"):
+        parser.close()
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+import keywords
+from keywords import NEUTRAL, KeywordMatcher, load_lexicon
+
+matcher = KeywordMatcher()
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["Loan repayment terms", "I build hardware", "A rolex", "Networking events"],
+)
+def test_terms_inside_other_words_do_not_match(text):
+    assert matcher.analyze(text) == ([], NEUTRAL)
+
+
+def test_whole_words_match():
+    assert matcher.extract_topics("How is the pay?") == ["salary"]
+    assert matcher.analyze_sentiment("It's hard.") == "negative"
+
+
+@pytest.mark.parametrize(
+    "text, topic",
+    [
+        ("Which skills matter?", "skills"),
+        ("I'm moving abroad", "transition"),
+        ("She moved teams", "transition"),
+        ("Switches between roles", "transition"),
+        ("I learned Python", "skills"),
+        ("Interviews make me nervous", "interview"),
+        ("JOB hunting", "career"),
+        ("the job's perks", "career"),
+    ],
+)
+def test_inflections_and_case(text, topic):
+    assert topic in matcher.extract_topics(text)
+
+
+def test_phrases_match_as_phrases():
+    assert matcher.analyze_sentiment("I don't know what to do") == "uncertain"
+    assert matcher.analyze_sentiment("I DON’T KNOW.") == "uncertain"
+    # Both words, but not as the phrase
+    assert matcher.analyze_sentiment("Don't you know Python?") == NEUTRAL
+
+
+def test_topics_in_lexicon_order_and_sentiment_by_priority():
+    topics, sentiment = matcher.analyze(
+        "I'm worried but excited about a salary change in my career"
+    )
+    assert topics == ["career", "salary", "transition"]
+    # Positive is listed before negative
+    assert sentiment == "positive"
+
+
+def test_tally_counts_every_message():
+    topics, sentiments = matcher.tally(
+        ["My resume", "My CV and portfolio", "I'm confused", "Hello"]
+    )
+    assert topics == {"resume": 2}
+    assert sentiments == {"uncertain": 1, NEUTRAL: 3}
+
+
+def test_custom_lexicon_keeps_missing_sections(tmp_path):
+    path = tmp_path / "lexicon.json"
+    path.write_text(json.dumps({"topics": {"visa": ["visa", "work permit"]}}))
+    custom = KeywordMatcher(load_lexicon(path))
+    assert custom.analyze("Do you sponsor work permits?") == (["visa"], NEUTRAL)
+    # The job topic is gone; the default sentiments are kept
+    assert custom.analyze("Great job") == ([], "positive")
+
+
+@pytest.mark.parametrize("contents", [None, "{not json", '{"topics": ["visa"]}'])
+def test_bad_lexicon_file_falls_back_to_default(tmp_path, monkeypatch, contents):
+    path = tmp_path / "lexicon.json"
+    if contents is not None:
+        path.write_text(contents)
+    monkeypatch.setattr(keywords, "LEXICON_FILE", str(path))
+    fallback = keywords._default_matcher()
+    assert fallback.topics == list(keywords.DEFAULT_LEXICON["topics"])
+    assert fallback.extract_topics("What's the pay?") == ["salary"]
@@ -0,0 +1,46 @@
+import pytest
+
+from pipeline import TurnPipeline, TurnResult
+
+
+def complete(user_text):
+    return iter(["Hello there. ", "How are ", "you?"])
+
+
+def test_prompt_ready_turn_needs_no_user_text():
+    asked = []
+
+    def remember(user_text):
+        asked.append(user_text)
+        return complete(user_text)
+
+    pipeline = TurnPipeline(complete=remember, synthesize=lambda s: s.encode())
+    result = pipeline.run_sync(prompt_ready=True, timeout=5)
+    assert result.error is None
+    assert asked == [""]
+    assert result.reply == "Hello there. How are you?"
+    assert b" ".join(result.clips) == b"Hello there. How are you?"
+    assert "stt" not in result.timings
+
+    # Without it, no user text means no turn
+    result = pipeline.run_sync(timeout=5)
+    assert result.reply == ""
+    assert asked == [""]
+
+
+def test_transcribed_turn_is_timed_from_the_recording():
+    pipeline = TurnPipeline(
+        transcribe=lambda wav: "hi",
+        complete=complete,
+        synthesize=lambda s: s.encode(),
+    )
+    result = pipeline.run_sync(wav_bytes=b"RIFF", timeout=5)
+    assert result.user_text == "hi"
+    assert list(result.timings)[0] == "stt"
+    assert result.timings["stt"] <= result.timings["llm"] <= result.timings["total"]
+
+
+def test_include_stt_shifts_every_stage():
+    result = TurnResult(timings={"llm": 1.0, "total": 2.0})
+    result.include_stt(0.5)
+    assert result.timings == {"stt": 0.5, "llm": 1.5, "total": pytest.approx(2.5)}
@@ -0,0 +1,65 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, "sessions", server.SessionStore())
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.mark.parametrize(
+    "request_args, detail",
+    [
+        (
+            {"content": b"{not json", "headers": {"content-type": "application/json"}},
+            "Body is not valid JSON",
+        ),
+        ({"json": ["hello"]}, "Expected a JSON object"),
+        ({"json": {}}, '"text" must be a non-empty string'),
+        ({"json": {"text": 5}}, '"text" must be a non-empty string'),
+        ({"json": {"text": "  "}}, '"text" must be a non-empty string'),
+        ({"json": {"text": "hi", "persona": ["priya"]}}, "'persona' must be a string"),
+        ({"json": {"text": "hi", "audio": "flac:9k"}}, "Unknown audio quality"),
+    ],
+)
+def test_http_turn_rejects_bad_json(client, request_args, detail):
+    response = client.post("/v1/turn", **request_args)
+    assert response.status_code == 400
+    assert detail in response.json()["detail"]
+    assert len(server.sessions) == 0
+
+
+@pytest.mark.parametrize(
+    "config, message",
+    [
+        ({"voice": "en-XX-NobodyNeural"}, "Unknown voice 'en-XX-NobodyNeural'"),
+        ({"voice": ""}, "Unknown voice ''"),
+        ({"voice": ["en-US-GuyNeural"]}, "Unknown voice"),
+        ({"speak": "false"}, '"speak" must be a boolean'),
+        ({"speak": 0}, '"speak" must be a boolean'),
+        ({"voice": "en-US-GuyNeural", "audio": "flac:9k"}, "Unknown audio quality"),
+    ],
+)
+def test_websocket_config_rejects_bad_values(client, monkeypatch, config, message):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    with client.websocket_connect("/v1/ws?persona=priya") as ws:
+        session_id = ws.receive_json()["session_id"]
+        session = server.sessions._sessions[session_id][0]
+        profile = session.audio_profile
+        ws.send_json({"type": "config", **config})
+        error = ws.receive_json()
+        assert error["type"] == "error"
+        assert message in error["message"]
+
+        # A bad config changes nothing
+        assert session.voice == server.PERSONAS["priya"].voice
+        assert session.audio_profile is profile
+
+        ws.send_json({"type": "config", "voice": "en-US-GuyNeural", "speak": False})
+        ws.send_json({"type": "nope"})
+        assert ws.receive_json()["message"] == "Unknown message 'nope'"
+        assert session.voice == "en-US-GuyNeural"
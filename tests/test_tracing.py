@@ -0,0 +1,157 @@
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import tracing
+from pipeline import TurnPipeline
+from tracing import OTLPFileExporter, StageMetrics, annotate, session, span
+
+
+class Recorder:
+    """Exporter that keeps finished spans in order"""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def named(self, name):
+        return [s for s in self.spans if s.name == name]
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    monkeypatch.setattr(tracing, "stage_metrics", StageMetrics())
+    recorder = Recorder()
+    monkeypatch.setattr(tracing, "exporter", recorder)
+    return recorder
+
+
+def test_spans_nest_and_carry_the_session(spans):
+    with session("abc"):
+        with span("turn") as turn:
+            with span("tts", bytes_in=5):
+                annotate(provider="edge")
+        with span("listen"):
+            pass
+    with span("outside"):
+        pass
+
+    tts, turn_span, listen, outside = spans.spans
+    assert turn_span is turn
+    assert tts.parent_id == turn.span_id and tts.trace_id == turn.trace_id
+    assert turn.parent_id is None
+    # A sibling root starts its own trace
+    assert listen.parent_id is None and listen.trace_id != turn.trace_id
+    assert tts.attributes == {"bytes_in": 5, "session_id": "abc", "provider": "edge"}
+    assert "session_id" not in outside.attributes
+    assert tracing.current_span() is None
+
+
+def test_pool_threads_keep_the_context_when_copied(spans):
+    def call():
+        with span("tts_provider"):
+            pass
+
+    with ThreadPoolExecutor(max_workers=1) as executor, session("abc"):
+        with span("tts") as parent:
+            executor.submit(contextvars.copy_context().run, call).result()
+            executor.submit(call).result()
+
+    copied, bare, _ = spans.spans
+    assert copied.parent_id == parent.span_id
+    assert copied.attributes["session_id"] == "abc"
+    assert bare.parent_id is None
+    assert "session_id" not in bare.attributes
+
+
+def test_pipeline_turn_spans(spans):
+    pipeline = TurnPipeline(
+        transcribe=lambda wav: "hi",
+        complete=lambda text: iter(["Hello there, nice to meet you. ", "Bye now."]),
+        synthesize=lambda sentence: sentence.encode(),
+    )
+    with session("abc"):
+        result = pipeline.run_sync(wav_bytes=b"RIFF", timeout=5)
+    assert result.error is None
+
+    (turn,) = spans.named("turn")
+    for name in ("listen", "llm", "tts"):
+        assert spans.named(name)
+        for child in spans.named(name):
+            assert child.parent_id == turn.span_id
+            assert child.attributes["session_id"] == "abc"
+    assert len(spans.named("tts")) == len(result.clips) == 2
+    assert turn.attributes["clips"] == 2
+
+
+def test_errors_and_cancellations_are_recorded(spans):
+    with pytest.raises(ValueError):
+        with span("llm", provider="groq"):
+            raise ValueError("rate limited")
+    with pytest.raises(KeyboardInterrupt):
+        with span("tts", provider="edge"):
+            raise KeyboardInterrupt
+
+    failed, cancelled = spans.spans
+    assert str(failed.error) == "rate limited"
+    assert cancelled.error is None
+    assert cancelled.attributes["cancelled"] is True
+    report = tracing.stage_metrics.report()
+    assert report["llm/groq"]["errors"] == 1
+    assert report["tts/edge"]["errors"] == 0
+
+
+def test_prometheus_text(spans):
+    for retries in (0, 2):
+        with span("tts_provider", provider="puter", bytes_in=10, retries=retries) as s:
+            s.set(bytes_out=100)
+    with pytest.raises(RuntimeError):
+        with span("tts_provider", provider="puter"):
+            raise RuntimeError("HTTP 503")
+    with span("turn"):
+        pass
+
+    lines = tracing.prometheus_text().splitlines()
+    samples = dict(line.rsplit(" ", 1) for line in lines if not line.startswith("#"))
+    labels = 'stage="tts_provider",provider="puter"'
+    assert samples[f"voice_stage_duration_seconds_count{{{labels}}}"] == "3"
+    assert samples[f'voice_stage_duration_seconds_bucket{{{labels},le="+Inf"}}'] == "3"
+    assert samples[f"voice_stage_errors_total{{{labels}}}"] == "1"
+    assert samples[f"voice_stage_retries_total{{{labels}}}"] == "2"
+    assert samples[f'voice_stage_bytes_total{{{labels},direction="in"}}'] == "20"
+    assert samples[f'voice_stage_bytes_total{{{labels},direction="out"}}'] == "200"
+    assert 'voice_stage_errors_total{stage="turn",provider=""}' in samples
+
+    # Buckets are cumulative
+    counts = [
+        int(value)
+        for key, value in samples.items()
+        if key.startswith(f"voice_stage_duration_seconds_bucket{{{labels}")
+    ]
+    assert counts == sorted(counts)
+    for metric in ("duration_seconds", "errors_total", "bytes_total"):
+        assert f"# TYPE voice_stage_{metric}" in "\n".join(lines)
+
+
+def test_otlp_file_export(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "stage_metrics", StageMetrics())
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "exporter", OTLPFileExporter(str(path)))
+    with session("abc"), span("turn"):
+        with span("llm", provider="groq", bytes_in=3):
+            pass
+        # Children are buffered until the root span finishes
+        assert not path.exists()
+
+    (line,) = path.read_text().splitlines()
+    exported = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    llm, turn = exported
+    assert llm["parentSpanId"] == turn["spanId"]
+    assert llm["traceId"] == turn["traceId"]
+    assert "parentSpanId" not in turn
+    assert {"key": "bytes_in", "value": {"intValue": "3"}} in llm["attributes"]
+    assert {"key": "session_id", "value": {"stringValue": "abc"}} in turn["attributes"]
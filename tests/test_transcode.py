@@ -0,0 +1,65 @@
+import pytest
+
+import transcode
+from transcode import ORIGINAL, PROFILES, AudioProfile, parse_profile
+
+
+@pytest.mark.parametrize("quality", ["original", "medium", "low"])
+def test_named_qualities(quality):
+    assert parse_profile(quality) is PROFILES[quality]
+    assert parse_profile(f" {quality.upper()} ") is PROFILES[quality]
+
+
+@pytest.mark.parametrize(
+    "quality, expected",
+    [
+        ("opus:16k", AudioProfile("opus", "16k")),
+        ("mp3:32", AudioProfile("mp3", "32k")),
+        ("OPUS:8K", AudioProfile("opus", "8k")),
+    ],
+)
+def test_format_bitrate_specs(quality, expected):
+    profile = parse_profile(quality)
+    assert profile == expected
+    assert str(profile) == f"{expected.format}:{expected.bitrate}"
+
+
+@pytest.mark.parametrize("quality", ["flac:64k", "opus", "opus:", "mp3:fast", "hi"])
+def test_unknown_quality_is_rejected(quality):
+    with pytest.raises(ValueError, match="Unknown audio quality"):
+        parse_profile(quality)
+
+
+def test_default_quality(monkeypatch):
+    monkeypatch.setattr(transcode, "AUDIO_QUALITY", "low")
+    assert parse_profile() is PROFILES["low"]
+    assert parse_profile("") is PROFILES["low"]
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        (None, "original"),
+        ({}, "original"),
+        ({"Downlink": "10", "ECT": "4g"}, "original"),
+        ({"Save-Data": "on", "Downlink": "10"}, "low"),
+        ({"save-data": "ON"}, "low"),
+        ({"Save-Data": "off"}, "original"),
+        ({"ECT": "2g"}, "low"),
+        ({"ECT": "slow-2g"}, "low"),
+        ({"ECT": "3g"}, "medium"),
+        ({"Downlink": "0.3"}, "low"),
+        ({"Downlink": "1.5", "ECT": "4g"}, "medium"),
+        ({"downlink": "not a number"}, "original"),
+    ],
+)
+def test_profile_from_headers(headers, expected):
+    assert transcode.profile_from_headers(headers) is PROFILES[expected]
+    assert parse_profile("auto", headers) is PROFILES[expected]
+
+
+def test_apps_do_not_offer_auto():
+    # Streamlit can't ask for Client Hints, so "auto" would always be original
+    assert "auto" not in transcode.AUDIO_QUALITIES
+    if transcode.AUDIO_QUALITY == "auto":
+        assert parse_profile(transcode.APP_AUDIO_QUALITY) is ORIGINAL
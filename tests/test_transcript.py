@@ -0,0 +1,100 @@
+import pytest
+
+from transcript import Transcript
+
+LABELS = {"user": ("user-message", "You"), "assistant": ("bot-message", "Bot")}
+
+
+def chat(count):
+    return [
+        {"role": "user" if i % 2 else "assistant", "content": f"message {i}"}
+        for i in range(count)
+    ]
+
+
+def shown(transcript):
+    return [
+        html.split(": ", 1)[1].removesuffix("</div>") for html in transcript.visible()
+    ]
+
+
+def test_short_chat_is_shown_whole():
+    transcript = Transcript(LABELS, page_size=5)
+    transcript.sync(chat(3))
+    assert transcript.hidden == 0
+    assert transcript.visible() == [
+        '<div class="bot-message">Bot: message 0</div>',
+        '<div class="user-message">You: message 1</div>',
+        '<div class="bot-message">Bot: message 2</div>',
+    ]
+
+
+def test_latest_page_then_earlier_pages_on_request():
+    transcript = Transcript(LABELS, page_size=5)
+    messages = chat(12)
+    transcript.sync(messages)
+    assert transcript.hidden == 7
+    assert shown(transcript) == [f"message {i}" for i in range(7, 12)]
+
+    transcript.show_more()
+    assert transcript.hidden == 2
+    assert len(transcript.visible()) == 10
+    transcript.show_more()
+    assert transcript.hidden == 0
+    assert shown(transcript) == [f"message {i}" for i in range(12)]
+
+    # New messages keep the pages already revealed
+    messages += chat(2)
+    transcript.sync(messages)
+    assert transcript.hidden == 0
+    assert len(transcript.visible()) == 14
+
+
+def test_page_size_zero_shows_everything():
+    transcript = Transcript(LABELS, page_size=0)
+    transcript.sync(chat(100))
+    assert transcript.hidden == 0
+    assert len(transcript.visible()) == 100
+
+
+def test_each_message_is_rendered_once():
+    transcript = Transcript(LABELS, page_size=5)
+    messages = chat(4)
+    transcript.sync(messages)
+    rendered = list(transcript.visible())
+    messages.append({"role": "user", "content": "message 4"})
+    transcript.sync(messages)
+    transcript.sync(messages)
+    assert transcript.visible()[:4] == rendered
+    assert len(transcript.visible()) == 5
+    assert all(a is b for a, b in zip(transcript.visible(), rendered))
+
+
+@pytest.mark.parametrize("cleared", ["shorter", "replaced"])
+def test_cleared_chat_starts_over(cleared):
+    transcript = Transcript(LABELS, page_size=2)
+    transcript.sync(chat(6))
+    transcript.show_more()
+    if cleared == "shorter":
+        messages = [{"role": "assistant", "content": "Hello again"}]
+    else:
+        # Same length, different messages (a reset then new turns)
+        messages = chat(5) + [{"role": "user", "content": "a new question"}]
+    transcript.sync(messages)
+    assert transcript.pages == 1
+    assert shown(transcript)[-1] == messages[-1]["content"]
+
+
+def test_message_text_is_escaped():
+    transcript = Transcript(LABELS)
+    transcript.sync(
+        [
+            {"role": "user", "content": '<img src=x onerror="alert(1)"> & <b>'},
+            {"role": "assistant", "content": "Use a <div> & 5 > 3"},
+        ]
+    )
+    assert transcript.visible() == [
+        '<div class="user-message">You: '
+        "&lt;img src=x onerror=&quot;alert(1)&quot;&gt; &amp; &lt;b&gt;</div>",
+        '<div class="bot-message">Bot: Use a &lt;div&gt; &amp; 5 &gt; 3</div>',
+    ]
@@ -0,0 +1,296 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+import tts
+from circuit_breaker import CLOSED, OPEN, CircuitBreaker
+from metrics import Histogram
+from pipeline import run_sync
+from tts_cache import TTSCache
+
+AUDIO = b"ID3" + bytes(range(256))
+BODY = json.dumps({"audio": {"data": base64.b64encode(AUDIO).decode()}}).encode()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeResponse:
+    """A streamed response whose body fails after ``fail_after`` bytes"""
+
+    def __init__(self, body=BODY, status_code=200, fail_after=None):
+        self.status_code = status_code
+        self.headers = {"Content-Length": str(len(body))}
+        self.text = body.decode()
+        self.body = body
+        self.fail_after = fail_after
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def iter_content(self, chunk_size):
+        body = self.body if self.fail_after is None else self.body[: self.fail_after]
+        for i in range(0, len(body), 16):
+            yield body[i : i + 16]
+        if self.fail_after is not None:
+            raise requests.ConnectionError("connection reset by peer")
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.posts = 0
+
+    def post(self, url, **kwargs):
+        self.posts += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def session(monkeypatch):
+    def install(*responses):
+        fake = FakeSession(*responses)
+        monkeypatch.setattr(tts, "get_session", lambda: fake)
+        return fake
+
+    monkeypatch.setattr(tts, "backoff_delay", lambda attempt: 0)
+    return install
+
+
+def test_retries_body_cut_before_any_audio(session):
+    fake = session(FakeResponse(fail_after=12), FakeResponse())
+    assert tts.puter_tts("hello") == AUDIO
+    assert fake.posts == 2
+
+
+def test_retries_body_cut_after_some_audio(session):
+    # Nothing is handed out before the whole clip is decoded, so a body cut
+    # part way through the audio is safe to fetch again
+    fake = session(FakeResponse(fail_after=len(BODY) // 2), FakeResponse())
+    assert tts.puter_tts("hello") == AUDIO
+    assert fake.posts == 2
+
+
+def test_retries_connection_errors_and_statuses(session):
+    fake = session(requests.ConnectionError("refused"), FakeResponse())
+    assert tts.puter_tts("hello") == AUDIO
+    fake = session(FakeResponse(b"busy", status_code=503), FakeResponse())
+    assert tts.puter_tts("hello") == AUDIO
+    assert fake.posts == 2
+
+
+def test_gives_up_after_last_attempt(session):
+    fake = session(FakeResponse(fail_after=5), FakeResponse(b"busy", status_code=503))
+    with pytest.raises(RuntimeError, match="Puter TTS returned HTTP 503: busy"):
+        tts.puter_tts("hello")
+    assert fake.posts == tts.PUTER_ATTEMPTS
+
+
+def test_probe_cancelled_in_the_queue_reopens_breaker(monkeypatch):
+    clock = Clock()
+    breaker = CircuitBreaker(
+        "Puter TTS", failure_threshold=1, reset_timeout=30.0, clock=clock
+    )
+    breaker.record_failure()
+    clock.now = 30.0
+    assert breaker.allow_request()
+    monkeypatch.setattr(tts, "puter_breaker", breaker)
+
+    # Every Puter thread is busy, so the probe is still queued when Edge wins
+    busy = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=1)
+    executor.submit(busy.wait)
+    monkeypatch.setattr(tts, "_puter_executor", executor)
+    monkeypatch.setattr(tts, "call_puter", lambda text: pytest.fail("probe ran"))
+
+    async def edge(text, voice):
+        return b"ID3edge"
+
+    monkeypatch.setattr(tts, "generate_audio", edge)
+    try:
+        assert run_sync(tts.synthesize_hedged("hello", "voice", 0.01), 5) == (
+            "edge",
+            b"ID3edge",
+        )
+        deadline = time.monotonic() + 5
+        while breaker.state != OPEN and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert breaker.state == OPEN
+        clock.now = 60.0
+        assert breaker.allow_request()
+    finally:
+        busy.set()
+        executor.shutdown()
+
+
+class Providers:
+    """Stand-ins for Puter and Edge with scripted latency and failures"""
+
+    def __init__(self):
+        self.puter_delay = 0.0
+        self.puter_error = None
+        self.edge_delay = 0.0
+        self.edge_error = None
+        self.puter_calls = 0
+        self.edge_calls = 0
+        self.edge_cancelled = threading.Event()
+
+    def puter_tts(self, text):
+        self.puter_calls += 1
+        time.sleep(self.puter_delay)
+        if self.puter_error:
+            raise self.puter_error
+        return b"ID3puter"
+
+    async def generate_audio(self, text, voice):
+        self.edge_calls += 1
+        try:
+            await asyncio.sleep(self.edge_delay)
+        except asyncio.CancelledError:
+            self.edge_cancelled.set()
+            raise
+        if self.edge_error:
+            raise self.edge_error
+        return b"ID3edge"
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    fake = Providers()
+    monkeypatch.setattr(tts, "puter_tts", fake.puter_tts)
+    monkeypatch.setattr(tts, "generate_audio", fake.generate_audio)
+    monkeypatch.setattr(
+        tts, "provider_latency", {"puter": Histogram(), "edge": Histogram()}
+    )
+    monkeypatch.setattr(tts, "puter_breaker", CircuitBreaker("Puter TTS"))
+    monkeypatch.setattr(tts, "audio_cache", TTSCache(1 << 20))
+    return fake
+
+
+def hedged(delay):
+    return run_sync(tts.synthesize_hedged("hello", "voice", delay), 5)
+
+
+def test_puter_within_the_delay_never_starts_edge(providers):
+    assert hedged(1.0) == ("puter", b"ID3puter")
+    assert providers.edge_calls == 0
+    assert tts.puter_breaker.state == CLOSED
+
+
+def test_edge_wins_when_puter_is_slow(providers):
+    providers.puter_delay = 0.5
+    providers.edge_delay = 0.01
+    assert hedged(0.05) == ("edge", b"ID3edge")
+    # The slow Puter call still finishes and is recorded
+    deadline = time.monotonic() + 5
+    while tts.provider_latency["puter"].count == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert tts.provider_latency["puter"].count == 1
+    assert tts.provider_latency["edge"].count == 1
+
+
+def test_puter_winning_the_race_cancels_edge(providers):
+    providers.puter_delay = 0.2
+    providers.edge_delay = 5.0
+    assert hedged(0.05) == ("puter", b"ID3puter")
+    assert providers.edge_cancelled.wait(5)
+    # A cancelled Edge call is not a latency sample
+    assert tts.provider_latency["edge"].count == 0
+
+
+def test_puter_failing_starts_edge_without_waiting(providers):
+    providers.puter_error = RuntimeError("Puter TTS returned HTTP 500")
+    start = time.monotonic()
+    assert hedged(5.0) == ("edge", b"ID3edge")
+    assert time.monotonic() - start < 1.0
+    assert tts.puter_breaker.health < 1.0
+
+
+def test_both_failing_names_both_errors(providers):
+    providers.puter_error = RuntimeError("HTTP 500")
+    providers.edge_error = RuntimeError("no route")
+    with pytest.raises(
+        RuntimeError,
+        match=r"primary provider failed \(HTTP 500\); fallback failed \(no route\)",
+    ):
+        hedged(0.05)
+
+
+def test_open_breaker_goes_straight_to_edge(providers):
+    for _ in range(tts.puter_breaker.failure_threshold):
+        tts.puter_breaker.record_failure()
+    assert tts.synthesize("hello", "voice") == b"ID3edge"
+    assert providers.puter_calls == 0
+    assert tts.puter_breaker.rejected == 1
+
+
+def test_failing_puter_trips_the_breaker_through_synthesize(providers, monkeypatch):
+    monkeypatch.setattr(tts, "TTS_HEDGE_DELAY", "0.05")
+    providers.puter_error = RuntimeError("HTTP 500")
+    for i in range(tts.puter_breaker.failure_threshold):
+        # Distinct text so the cache doesn't answer
+        assert tts.synthesize(f"hello {i}", "voice") == b"ID3edge"
+    assert providers.puter_calls == tts.puter_breaker.failure_threshold
+    assert tts.puter_breaker.state == OPEN
+
+    tts.synthesize("hello again", "voice")
+    assert providers.puter_calls == tts.puter_breaker.failure_threshold
+
+
+def test_winner_is_cached_under_its_own_provider(providers, monkeypatch):
+    monkeypatch.setattr(tts, "TTS_HEDGE_DELAY", "0.05")
+    providers.puter_delay = 0.5
+    assert tts.synthesize("hello", "voice") == b"ID3edge"
+    keys = tts.provider_cache_keys("hello", "voice")
+    assert tts.audio_cache.get(keys["edge"]) == b"ID3edge"
+    assert tts.audio_cache.get(keys["puter"]) is None
+
+    assert tts.synthesize("hello", "voice") == b"ID3edge"
+    assert providers.edge_calls == 1
+
+
+@pytest.mark.parametrize(
+    "setting, samples, expected",
+    [
+        ("off", [], None),
+        ("0.8", [], 0.8),
+        ("auto", [], tts.AUTO_HEDGE_DEFAULT),
+        # Too few samples to trust the p95 yet
+        ("auto", [4.0] * (tts.AUTO_HEDGE_MIN_SAMPLES - 1), tts.AUTO_HEDGE_DEFAULT),
+        ("auto", [0.01] * tts.AUTO_HEDGE_MIN_SAMPLES, tts.AUTO_HEDGE_BOUNDS[0]),
+        ("auto", [25.0] * tts.AUTO_HEDGE_MIN_SAMPLES, tts.AUTO_HEDGE_BOUNDS[1]),
+    ],
+)
+def test_hedge_delay(providers, monkeypatch, setting, samples, expected):
+    monkeypatch.setattr(tts, "TTS_HEDGE_DELAY", setting)
+    for seconds in samples:
+        tts.provider_latency["puter"].observe(seconds)
+    assert tts.hedge_delay() == expected
+
+
+def test_auto_hedge_delay_follows_puter_p95(providers, monkeypatch):
+    monkeypatch.setattr(tts, "TTS_HEDGE_DELAY", "auto")
+    for _ in range(tts.AUTO_HEDGE_MIN_SAMPLES):
+        tts.provider_latency["puter"].observe(0.4)
+    fast = tts.hedge_delay()
+    for _ in range(tts.AUTO_HEDGE_MIN_SAMPLES * 4):
+        tts.provider_latency["puter"].observe(2.5)
+    assert 0.25 < fast <= 0.5
+    assert 2.0 < tts.hedge_delay() <= 3.0
@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+from tts_cache import TTSCache, cache_key
+
+CLIP = b"ID3" + b"x" * 97
+
+
+def key(n):
+    return cache_key(f"sentence {n}", "en-US-AriaNeural", "+10%", "edge")
+
+
+def test_keys_ignore_whitespace_but_not_voice_or_provider():
+    assert key(1) == cache_key("  sentence\n1 ", "en-US-AriaNeural", "+10%", "edge")
+    assert key(1) != cache_key("sentence 1", "en-US-GuyNeural", "+10%", "edge")
+    assert key(1) != cache_key("sentence 1", "en-US-AriaNeural", "+10%", "puter")
+
+
+def test_memory_lru_evicts_least_recently_used():
+    cache = TTSCache(max_memory_bytes=3 * len(CLIP))
+    for n in range(3):
+        cache.put(key(n), CLIP)
+    # Reading 0 makes 1 the oldest
+    assert cache.get(key(0)) == CLIP
+    cache.put(key(3), CLIP)
+
+    assert cache.get(key(1)) is None
+    assert cache.get(key(0)) == cache.get(key(2)) == cache.get(key(3)) == CLIP
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 3
+    assert stats["memory_bytes"] == 3 * len(CLIP)
+
+
+def test_get_takes_the_first_key_present_as_one_lookup():
+    cache = TTSCache(max_memory_bytes=1 << 20)
+    cache.put(key(2), b"ID3two")
+    assert cache.get(key(1), key(2)) == b"ID3two"
+    assert cache.get(key(3), key(4)) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_clip_bigger_than_memory_is_kept_on_disk_only(tmp_path):
+    cache = TTSCache(10, directory=tmp_path, max_disk_bytes=1 << 20)
+    cache.put(key(1), CLIP)
+    assert cache.stats()["entries"] == 0
+    assert cache.get(key(1)) == CLIP
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_disk_hit_is_promoted_to_memory(tmp_path):
+    TTSCache(1 << 20, directory=tmp_path, max_disk_bytes=1 << 20).put(key(1), CLIP)
+    # Another process on the same host
+    cache = TTSCache(1 << 20, directory=tmp_path, max_disk_bytes=1 << 20)
+    assert cache.get(key(1)) == CLIP
+    os.remove(cache._path(key(1)))
+    assert cache.get(key(1)) == CLIP
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["hits"], stats["entries"]) == (1, 1, 1)
+
+
+def test_no_directory_means_no_disk_tier(tmp_path):
+    cache = TTSCache(1 << 20, max_disk_bytes=1 << 20)
+    assert cache.max_disk_bytes == 0
+    cache.put(key(1), CLIP)
+    assert not list(tmp_path.iterdir())
+
+
+def test_disk_is_pruned_oldest_first_to_below_budget(tmp_path):
+    budget = 10 * len(CLIP)
+    cache = TTSCache(0, directory=tmp_path, max_disk_bytes=budget)
+    for n in range(10):
+        cache.put(key(n), CLIP)
+        os.utime(cache._path(key(n)), (n, n))
+    assert cache.stats()["disk_evictions"] == 0
+
+    cache.put(key(10), CLIP)
+    os.utime(cache._path(key(10)), (10, 10))
+    # Down to 90% of the budget: the two oldest clips go
+    assert cache.stats()["disk_evictions"] == 2
+    assert cache.get(key(0)) is None
+    assert cache.get(key(1)) is None
+    assert all(cache.get(key(n)) == CLIP for n in range(2, 11))
+
+
+def test_disk_budget_counts_clips_already_there(tmp_path):
+    budget = 10 * len(CLIP)
+    first = TTSCache(0, directory=tmp_path, max_disk_bytes=budget)
+    for n in range(10):
+        first.put(key(n), CLIP)
+    second = TTSCache(0, directory=tmp_path, max_disk_bytes=budget)
+    second.put(key(10), CLIP)
+    assert second.stats()["disk_evictions"] == 2
+
+
+@pytest.mark.parametrize("damage", ["missing", "empty", "directory"])
+def test_damaged_disk_entry_is_a_miss(tmp_path, damage):
+    cache = TTSCache(0, directory=tmp_path, max_disk_bytes=1 << 20)
+    path = cache._path(key(1))
+    os.makedirs(os.path.dirname(path))
+    if damage == "empty":
+        open(path, "wb").close()
+    elif damage == "directory":
+        os.mkdir(path)
+
+    assert cache.get(key(1)) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_empty_audio_is_not_cached(tmp_path):
+    cache = TTSCache(1 << 20, directory=tmp_path, max_disk_bytes=1 << 20)
+    cache.put(key(1), b"")
+    assert cache.get(key(1)) is None
+    assert not list(tmp_path.iterdir())
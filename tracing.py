@@ -0,0 +1,350 @@
+"""Spans around every stage of a voice turn, and metrics built from them.
+
+``span(name, **attributes)`` times a block: speech recognition, each Groq
+call, each TTS provider call, and so on. Spans nest through a context
+variable, so a provider call made inside the pipeline's ``tts`` span
+becomes its child, and carry the session id set with ``session()``.
+Blocking calls pushed to a thread pool keep the context only if submitted
+through ``contextvars.copy_context().run``, as pipeline.py does.
+
+Every finished span is observed into an in-process histogram keyed by
+stage and provider, with error, byte and retry counters next to it.
+``prometheus_text()`` renders them in the Prometheus text format: server.py
+serves it on ``/metrics``, and the Streamlit apps on ``METRICS_PORT`` when
+it is set. With ``OTLP_TRACES_FILE`` set, spans are also appended to that
+file as OTLP/JSON lines, one export request per line, which the
+OpenTelemetry Collector's file receiver (or any OTLP tooling) can load.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from metrics import Histogram
+
+OTLP_TRACES_FILE = os.getenv("OTLP_TRACES_FILE")
+METRICS_PORT = os.getenv("METRICS_PORT")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "voice-assistant")
+# Spans buffered before writing to OTLP_TRACES_FILE; a finished root span
+# flushes early
+OTLP_BATCH_SPANS = 64
+
+session_id = contextvars.ContextVar("session_id", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = (
+        "name",
+        "attributes",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "error",
+    )
+
+    def __init__(self, name, parent, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = parent.trace_id if parent else random.getrandbits(128)
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    @property
+    def duration(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, name, amount=1):
+        self.attributes[name] = self.attributes.get(name, 0) + amount
+
+
+class StageMetrics:
+    """Histograms and counters of finished spans, by (stage, provider)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = {}
+            self.errors = {}
+            self.retries = {}
+            self.bytes = {}
+
+    def observe(self, span):
+        key = (span.name, str(span.attributes.get("provider", "")))
+        with self._lock:
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram()
+                self.errors[key] = 0
+                self.retries[key] = 0
+            if span.error is not None:
+                self.errors[key] += 1
+            self.retries[key] += span.attributes.get("retries", 0)
+            for direction in ("in", "out"):
+                size = span.attributes.get(f"bytes_{direction}")
+                if size:
+                    bytes_key = key + (direction,)
+                    self.bytes[bytes_key] = self.bytes.get(bytes_key, 0) + size
+        histogram.observe(span.duration)
+
+    def report(self):
+        """``{"stage/provider": {count, errors, p50, p95, p99}}``"""
+        with self._lock:
+            items = sorted(self.latency.items())
+            errors = dict(self.errors)
+        report = {}
+        for key, histogram in items:
+            name = "/".join(part for part in key if part)
+            report[name] = {
+                "count": histogram.count,
+                "errors": errors[key],
+                **{
+                    f"p{round(q * 100)}": round(histogram.quantile(q), 4)
+                    for q in (0.5, 0.95, 0.99)
+                },
+            }
+        return report
+
+    def prometheus_text(self):
+        with self._lock:
+            latency = sorted(self.latency.items())
+            errors = dict(self.errors)
+            retries = dict(self.retries)
+            sizes = sorted(self.bytes.items())
+
+        lines = [
+            "# HELP voice_stage_duration_seconds Time spent in each stage of a turn",
+            "# TYPE voice_stage_duration_seconds histogram",
+        ]
+        for (stage, provider), histogram in latency:
+            labels = f'stage="{stage}",provider="{provider}"'
+            snapshot = histogram.snapshot()
+            cumulative = 0
+            for bound, count in zip(snapshot["buckets"], snapshot["counts"]):
+                cumulative += count
+                lines.append(
+                    f'voice_stage_duration_seconds_bucket{{{labels},le="{bound}"}} '
+                    f"{cumulative}"
+                )
+            lines.append(
+                f'voice_stage_duration_seconds_bucket{{{labels},le="+Inf"}} '
+                f"{snapshot['count']}"
+            )
+            lines.append(
+                f"voice_stage_duration_seconds_sum{{{labels}}} {snapshot['sum']}"
+            )
+            lines.append(
+                f"voice_stage_duration_seconds_count{{{labels}}} {snapshot['count']}"
+            )
+        for metric, values, help_text in (
+            ("voice_stage_errors_total", errors, "Stage calls that raised"),
+            ("voice_stage_retries_total", retries, "Provider retries within a stage"),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for (stage, provider), value in sorted(values.items()):
+                lines.append(
+                    f'{metric}{{stage="{stage}",provider="{provider}"}} {value}'
+                )
+        lines.append("# HELP voice_stage_bytes_total Payload bytes sent and received")
+        lines.append("# TYPE voice_stage_bytes_total counter")
+        for (stage, provider, direction), value in sizes:
+            lines.append(
+                f'voice_stage_bytes_total{{stage="{stage}",provider="{provider}",'
+                f'direction="{direction}"}} {value}'
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPFileExporter:
+    """Appends spans to ``path`` as OTLP/JSON trace export requests"""
+
+    def __init__(self, path, batch_spans=OTLP_BATCH_SPANS):
+        self.path = path
+        self.batch_spans = batch_spans
+        self._spans = []
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def export(self, span):
+        with self._lock:
+            self._spans.append(span)
+            full = len(self._spans) >= self.batch_spans
+        if full or span.parent_id is None:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            spans, self._spans = self._spans, []
+            if not spans:
+                return
+            request = {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": [
+                                {
+                                    "key": "service.name",
+                                    "value": {"stringValue": SERVICE_NAME},
+                                }
+                            ]
+                        },
+                        "scopeSpans": [
+                            {
+                                "scope": {"name": __name__},
+                                "spans": [self._encode(span) for span in spans],
+                            }
+                        ],
+                    }
+                ]
+            }
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(request, separators=(",", ":")) + "\n")
+            except OSError as e:
+                logging.warning("Could not write spans to %s: %s", self.path, e)
+
+    @staticmethod
+    def _encode(span):
+        encoded = {
+            "traceId": f"{span.trace_id:032x}",
+            "spanId": f"{span.span_id:016x}",
+            "name": span.name,
+            # SPAN_KIND_INTERNAL
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in span.attributes.items()
+            ],
+        }
+        if span.parent_id is not None:
+            encoded["parentSpanId"] = f"{span.parent_id:016x}"
+        if span.error is not None:
+            # STATUS_CODE_ERROR
+            encoded["status"] = {"code": 2, "message": str(span.error)}
+        return encoded
+
+
+stage_metrics = StageMetrics()
+exporter = OTLPFileExporter(OTLP_TRACES_FILE) if OTLP_TRACES_FILE else None
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time the block as a span, a child of the current one if any.
+
+    Yields the Span so the block can ``set`` attributes (``provider``,
+    ``bytes_in``, ``bytes_out``, ``retries``...) as it learns them.
+    Exceptions are recorded on the span and re-raised.
+    """
+    parent = _current_span.get()
+    session = session_id.get()
+    if session is not None:
+        attributes.setdefault("session_id", session)
+    current = Span(name, parent, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = e
+        raise
+    except BaseException:
+        # Cancelled, e.g. the losing side of a hedged request
+        current.set(cancelled=True)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        stage_metrics.observe(current)
+        if exporter is not None:
+            exporter.export(current)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def annotate(**attributes):
+    """Set attributes on the current span, if there is one"""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+@contextmanager
+def session(value):
+    """Tag the spans started inside the block with session id ``value``"""
+    token = session_id.set(value)
+    try:
+        yield
+    finally:
+        session_id.reset(token)
+
+
+def prometheus_text():
+    return stage_metrics.prometheus_text()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@lru_cache(maxsize=None)
+def start_metrics_server(port=METRICS_PORT):
+    """Serve ``/metrics`` on ``port`` in a daemon thread, once per process.
+
+    Does nothing when no port is configured; returns the server otherwise.
+    """
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+    except OSError as e:
+        logging.warning("Metrics endpoint not started on port %s: %s", port, e)
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logging.info("Serving Prometheus metrics on :%s/metrics", port)
+    return server
@@ -0,0 +1,197 @@
+"""Re-encode TTS audio for the client's connection.
+
+The providers return MP3 at around 48 kbps, which is shipped to the browser
+as is. For clients on slow or metered links, ``transcode`` re-encodes clips
+with pydub (ffmpeg) as Ogg Opus or MP3 at a lower bitrate: Opus at 24 kbps
+is half the size and still clear speech, 12 kbps a quarter.
+
+Clients pick a quality by name (``original``, ``medium``, ``low``), as a
+``format:bitrate`` spec like ``opus:16k`` or ``mp3:32k``, or ``auto``, which
+reads the browser's network hints (``Save-Data``, ``ECT``, ``Downlink``)
+from the request headers and keeps the original when there are none.
+``auto`` is for server.py only: browsers send ``ECT`` and ``Downlink`` only
+after an ``Accept-CH`` response header, which Streamlit gives no way to set,
+so the Streamlit apps don't offer it and use ``APP_AUDIO_QUALITY``. If
+ffmpeg is missing or an encode fails, the original MP3 is sent instead, so
+check ``mime_type`` of the result rather than assuming the format asked for.
+"""
+
+import io
+import logging
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+from pydub import AudioSegment
+from pydub.utils import which
+
+from tracing import span
+
+# Codec for the reduced tiers: "opus" (Ogg) or "mp3" for players without Opus
+AUDIO_FORMAT = os.getenv("AUDIO_FORMAT", "opus")
+AUDIO_BITRATE_MEDIUM = os.getenv("AUDIO_BITRATE_MEDIUM", "24k")
+AUDIO_BITRATE_LOW = os.getenv("AUDIO_BITRATE_LOW", "12k")
+# libopus effort, 0-10: 5 encodes about twice as fast as the default 10,
+# for a few percent more bytes at the same quality
+OPUS_COMPLEXITY = os.getenv("OPUS_COMPLEXITY", "5")
+# Quality used when the client doesn't choose one
+AUDIO_QUALITY = os.getenv("AUDIO_QUALITY", "auto")
+# The Streamlit apps' default: they can't get Client Hints for "auto"
+APP_AUDIO_QUALITY = "original" if AUDIO_QUALITY == "auto" else AUDIO_QUALITY
+# Downlink (Mbps, as browsers report it) below which a tier is used
+LOW_BANDWIDTH_MBPS = float(os.getenv("LOW_BANDWIDTH_MBPS", "0.5"))
+MEDIUM_BANDWIDTH_MBPS = float(os.getenv("MEDIUM_BANDWIDTH_MBPS", "2"))
+# Encoded clips kept per process; greetings and apologies repeat
+TRANSCODE_CACHE_CLIPS = 128
+
+
+@dataclass(frozen=True)
+class AudioProfile:
+    # "mp3" or "opus"
+    format: str = "mp3"
+    # e.g. "24k"; None keeps the provider's audio untouched
+    bitrate: str = None
+    # Resample to this rate first; Opus wideband is 16 kHz
+    sample_rate: int = None
+
+    @property
+    def original(self):
+        return self.bitrate is None
+
+    @property
+    def mime_type(self):
+        return "audio/ogg" if self.format == "opus" else "audio/mpeg"
+
+    def __str__(self):
+        return "original" if self.original else f"{self.format}:{self.bitrate}"
+
+
+ORIGINAL = AudioProfile()
+PROFILES = {
+    "original": ORIGINAL,
+    "medium": AudioProfile(AUDIO_FORMAT, AUDIO_BITRATE_MEDIUM),
+    "low": AudioProfile(AUDIO_FORMAT, AUDIO_BITRATE_LOW, sample_rate=16000),
+}
+# Qualities the Streamlit apps offer, with their labels
+AUDIO_QUALITIES = {
+    "original": "Original MP3",
+    "medium": f"Medium ({AUDIO_FORMAT} {AUDIO_BITRATE_MEDIUM}bps)",
+    "low": f"Data saver ({AUDIO_FORMAT} {AUDIO_BITRATE_LOW}bps)",
+}
+
+
+def profile_for_bandwidth(downlink=None, effective_type=None, save_data=False):
+    """The tier for a client's downlink (Mbps) and effective connection type"""
+    if (
+        save_data
+        or effective_type in ("slow-2g", "2g")
+        or (downlink is not None and downlink < LOW_BANDWIDTH_MBPS)
+    ):
+        return PROFILES["low"]
+    if effective_type == "3g" or (
+        downlink is not None and downlink < MEDIUM_BANDWIDTH_MBPS
+    ):
+        return PROFILES["medium"]
+    return ORIGINAL
+
+
+def profile_from_headers(headers):
+    """Tier from Client Hints headers; the original when there are none.
+
+    Browsers only send ``ECT`` and ``Downlink`` to servers that asked for
+    them with ``Accept-CH``; ``Save-Data`` is sent whenever it is on.
+    """
+    headers = {key.lower(): value for key, value in (headers or {}).items()}
+    try:
+        downlink = float(headers["downlink"])
+    except (KeyError, ValueError):
+        downlink = None
+    return profile_for_bandwidth(
+        downlink=downlink,
+        effective_type=headers.get("ect"),
+        save_data=headers.get("save-data", "").lower() == "on",
+    )
+
+
+def parse_profile(quality=None, headers=None):
+    """AudioProfile for a quality name, ``format:bitrate`` spec or ``auto``.
+
+    Raises ValueError for anything else.
+    """
+    quality = (quality or AUDIO_QUALITY).strip().lower()
+    if quality == "auto":
+        return profile_from_headers(headers)
+    if quality in PROFILES:
+        return PROFILES[quality]
+    format, _, bitrate = quality.partition(":")
+    if format not in ("mp3", "opus") or not bitrate.rstrip("k").isdigit():
+        raise ValueError(f"Unknown audio quality {quality!r}")
+    if bitrate.isdigit():
+        bitrate += "k"
+    return AudioProfile(format, bitrate)
+
+
+def mime_type(audio):
+    """MIME type of a clip, from its first bytes"""
+    return "audio/ogg" if audio[:4] == b"OggS" else "audio/mpeg"
+
+
+@lru_cache(maxsize=1)
+def ffmpeg_available():
+    if which(AudioSegment.converter) is None:
+        logging.warning("ffmpeg not found; sending TTS audio without transcoding")
+        return False
+    return True
+
+
+def encode(audio, profile):
+    """``audio`` re-encoded as ``profile``; raises if ffmpeg fails"""
+    if mime_type(audio) == "audio/ogg":
+        source, codec = "ogg", "libopus"
+    else:
+        source, codec = "mp3", "mp3"
+    # Naming the codec saves pydub probing the clip with ffprobe first
+    segment = AudioSegment.from_file(io.BytesIO(audio), format=source, codec=codec)
+    segment = segment.set_channels(1)
+    if profile.sample_rate:
+        segment = segment.set_frame_rate(profile.sample_rate)
+    output = io.BytesIO()
+    if profile.format == "opus":
+        segment.export(
+            output,
+            format="ogg",
+            codec="libopus",
+            bitrate=profile.bitrate,
+            # Tuned for speech rather than music
+            parameters=["-application", "voip", "-compression_level", OPUS_COMPLEXITY],
+        )
+    else:
+        segment.export(output, format="mp3", bitrate=profile.bitrate)
+    return output.getvalue()
+
+
+@lru_cache(maxsize=TRANSCODE_CACHE_CLIPS)
+def _encode_cached(audio, profile):
+    with span(
+        "transcode",
+        format=profile.format,
+        bitrate=profile.bitrate,
+        bytes_in=len(audio),
+    ) as transcode:
+        encoded = encode(audio, profile)
+        transcode.set(bytes_out=len(encoded))
+    return encoded
+
+
+def transcode(audio, profile=ORIGINAL):
+    """``audio`` as ``profile``, or unchanged if that's not possible.
+
+    Blocking (ffmpeg runs as a subprocess), so call it off the event loop.
+    """
+    if not audio or profile.original or not ffmpeg_available():
+        return audio
+    try:
+        return _encode_cached(audio, profile)
+    except Exception as e:
+        logging.warning("Transcoding audio to %s failed: %s", profile, e)
+        return audio
@@ -0,0 +1,61 @@
+"""Paginated chat transcript for the Streamlit apps.
+
+Rendering every message on every rerun makes script time and websocket
+payload grow with the conversation. ``Transcript`` builds each message's
+HTML once, as it is added, and shows only the latest ``page_size``
+messages; older ones are revealed a page at a time on request. Message
+text is HTML-escaped, as the apps draw the result with ``unsafe_allow_html``.
+Nothing here touches Streamlit, so the apps decide how to draw the result.
+"""
+
+import html
+import os
+
+# Messages shown before "show earlier messages"; 0 shows them all
+TRANSCRIPT_PAGE_SIZE = int(os.getenv("TRANSCRIPT_PAGE_SIZE", "20"))
+
+
+class Transcript:
+    """Cached per-message HTML of one conversation.
+
+    ``labels`` maps a role to its CSS class and speaker prefix, e.g.
+    ``{"user": ("user-message", "👤 You")}``. Keep one per session.
+    """
+
+    def __init__(self, labels, page_size=TRANSCRIPT_PAGE_SIZE):
+        self.labels = labels
+        self.page_size = page_size
+        self.pages = 1
+        self._html = []
+        # The last message rendered, to notice a cleared or replaced chat
+        self._last = None
+
+    def sync(self, messages):
+        """Render the messages added since the last call"""
+        count = len(self._html)
+        if count > len(messages) or (count and messages[count - 1] is not self._last):
+            self._html.clear()
+            self.pages = 1
+            count = 0
+        for message in messages[count:]:
+            css_class, label = self.labels[message["role"]]
+            self._html.append(
+                f'<div class="{css_class}">{label}: '
+                f'{html.escape(message["content"])}</div>'
+            )
+        if messages:
+            self._last = messages[-1]
+
+    @property
+    def hidden(self):
+        """How many older messages are not shown"""
+        if not self.page_size:
+            return 0
+        return max(len(self._html) - self.pages * self.page_size, 0)
+
+    def show_more(self):
+        self.pages += 1
+
+    def visible(self):
+        """HTML of the messages to show, oldest first"""
+        return self._html[self.hidden :]
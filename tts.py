@@ -0,0 +1,371 @@
+import asyncio
+import binascii
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import edge_tts
+import requests
+
+from circuit_breaker import CircuitBreaker
+from http_pool import backoff_delay, get_session
+from json_audio import StreamingAudioParser
+from metrics import Histogram
+from pipeline import run_sync
+from tracing import annotate, span
+from tts_cache import DEFAULT_CACHE_DIR, TTSCache, cache_key
+
+PUTER_TTS_URL = os.getenv("PUTER_TTS_URL", "https://api.puter.com/v1/ai/text2speech")
+EDGE_TTS_RATE = "+10%"
+# Read size for streamed Puter responses
+PUTER_CHUNK_BYTES = 64 * 1024
+PUTER_ATTEMPTS = 2
+PUTER_TIMEOUT = 10
+
+# Process-wide audio cache shared by every session. Greetings, canned
+# follow-ups and error strings are spoken over and over, so most of them
+# never need a provider round trip after the first time.
+audio_cache = TTSCache(
+    max_memory_bytes=int(float(os.getenv("TTS_CACHE_MEMORY_MB", "32")) * 1024 * 1024),
+    directory=os.getenv("TTS_CACHE_DIR", DEFAULT_CACHE_DIR),
+    max_disk_bytes=int(float(os.getenv("TTS_CACHE_DISK_MB", "256")) * 1024 * 1024),
+)
+
+# How long to give Puter before also asking Edge and taking whichever answers
+# first: "off" keeps the strict Puter-then-Edge fallback, a number is a fixed
+# delay in seconds, and "auto" follows Puter's observed p95 latency.
+TTS_HEDGE_DELAY = os.getenv("TTS_HEDGE_DELAY", "auto")
+AUTO_HEDGE_DEFAULT = 1.5
+AUTO_HEDGE_MIN_SAMPLES = 20
+AUTO_HEDGE_BOUNDS = (0.25, 10.0)
+
+# Threads for hedged Puter calls. synthesize() runs on a pipeline pool
+# worker and waits there for the race, so Puter must not queue behind it on
+# the same pool: with every worker waiting, nothing would be left to run it.
+PUTER_WORKERS = int(os.getenv("PUTER_WORKERS", "16"))
+_puter_executor = ThreadPoolExecutor(
+    max_workers=PUTER_WORKERS, thread_name_prefix="puter"
+)
+
+# Wall-clock latency of every provider call, successful or not
+provider_latency = {"puter": Histogram(), "edge": Histogram()}
+
+# Stop sending traffic to Puter while it is failing or very slow, so users
+# don't pay its retry/timeout budget on every turn during an incident
+puter_breaker = CircuitBreaker(
+    "Puter TTS",
+    failure_threshold=int(os.getenv("PUTER_BREAKER_FAILURES", "3")),
+    slow_call_seconds=float(os.getenv("PUTER_BREAKER_SLOW_SECONDS", "8")),
+    reset_timeout=float(os.getenv("PUTER_BREAKER_RESET_SECONDS", "30")),
+)
+
+
+async def iter_edge_audio(text, voice):
+    """Yield Edge TTS MP3 chunks as they arrive from the service"""
+    communicate = edge_tts.Communicate(text, voice, rate=EDGE_TTS_RATE)
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            yield chunk["data"]
+
+
+async def generate_audio(text, voice):
+    """Generate audio using Edge TTS, collected in memory"""
+    buffer = bytearray()
+    async for data in iter_edge_audio(text, voice):
+        buffer += data
+    return bytes(buffer)
+
+
+class _PuterRetry(Exception):
+    """A Puter failure worth another attempt"""
+
+
+def _open_puter_stream(text):
+    """POST to the Puter TTS endpoint and return the streamed 200 response.
+
+    Raises _PuterRetry for connection errors and non-200 statuses; the body
+    is left unread for the caller, who must close the response.
+    """
+    try:
+        response = get_session().post(
+            PUTER_TTS_URL, json={"text": text}, timeout=PUTER_TIMEOUT, stream=True
+        )
+    except requests.RequestException as e:
+        raise _PuterRetry(f"Puter TTS request failed: {e}") from e
+    if response.status_code == 200:
+        return response
+
+    # Non-200 responses carry short error bodies; read it once
+    with response:
+        body = response.text
+    raise _PuterRetry(f"Puter TTS returned HTTP {response.status_code}: {body}")
+
+
+def _read_puter_stream(text):
+    """One Puter TTS attempt; returns the parser holding the decoded audio"""
+    with _open_puter_stream(text) as response:
+        # Decoded audio is at most 3/4 of the body, which is mostly base64
+        length = int(response.headers.get("Content-Length") or 0)
+        parser = StreamingAudioParser(size_hint=length * 3 // 4)
+        try:
+            for chunk in response.iter_content(PUTER_CHUNK_BYTES):
+                parser.feed(chunk)
+            data = parser.close()
+        except requests.RequestException as e:
+            raise _PuterRetry(f"Puter TTS response failed: {e}") from e
+        except binascii.Error as e:
+            logging.error("Failed to decode base64 audio: %s", e)
+            raise RuntimeError("Failed to decode audio from TTS provider") from e
+        except ValueError as e:
+            preview = parser.skeleton[:2000].decode("utf-8", "replace")
+            logging.error(
+                "Failed to parse JSON from Puter TTS (status %s). Response text: %s",
+                response.status_code,
+                preview,
+            )
+            raise RuntimeError(
+                f"Invalid JSON returned from TTS provider. Response text: {preview}"
+            ) from e
+
+    # Validate expected structure
+    if not parser.found:
+        logging.error("Unexpected JSON structure from Puter TTS: %s", repr(data))
+        raise RuntimeError(f"Unexpected JSON structure from TTS provider: {data}")
+    return parser
+
+
+def puter_tts(text):
+    """Call Puter TTS endpoint and return raw audio bytes.
+
+    This is defensive: it checks status codes, handles non-JSON responses,
+    and raises informative errors instead of letting json.decoder.JSONDecodeError
+    bubble up with no context.
+
+    The JSON body is parsed as it streams in and ``audio.data`` base64-decoded
+    chunk by chunk into the parser's preallocated buffer, so neither the
+    response text nor the decoded JSON is ever held in memory as a whole.
+    Connection errors, non-200 statuses and a body cut off part way are
+    retried, up to PUTER_ATTEMPTS attempts in all.
+    """
+    for attempt in range(1, PUTER_ATTEMPTS + 1):
+        annotate(retries=attempt - 1)
+        try:
+            parser = _read_puter_stream(text)
+            break
+        except _PuterRetry as e:
+            logging.warning("%s (attempt %s)", str(e)[:1000], attempt)
+            if attempt == PUTER_ATTEMPTS:
+                raise RuntimeError(str(e)) from e.__cause__
+            time.sleep(backoff_delay(attempt))
+    return bytes(parser.buffer)
+
+
+def edge_tts_bytes(text, voice):
+    """Synthesize text with Edge TTS and return the MP3 bytes."""
+    # Edge TTS is natively async; run it on the shared pipeline loop instead
+    # of spinning up a fresh event loop per reply
+    data = run_sync(generate_audio(text, voice))
+    if not data:
+        raise RuntimeError("Edge TTS returned no audio")
+    return data
+
+
+def provider_cache_keys(text, voice):
+    """Cache keys for text in provider preference order.
+
+    Puter is not sent a voice or rate, so its clips are shared across voices.
+    """
+    return {
+        "puter": cache_key(text, "", "", "puter"),
+        "edge": cache_key(text, voice, EDGE_TTS_RATE, "edge"),
+    }
+
+
+def hedge_delay():
+    """Seconds to wait for Puter before racing Edge, or None when hedging is off"""
+    if TTS_HEDGE_DELAY.lower() == "off":
+        return None
+    if TTS_HEDGE_DELAY.lower() != "auto":
+        return float(TTS_HEDGE_DELAY)
+
+    puter = provider_latency["puter"]
+    if puter.count < AUTO_HEDGE_MIN_SAMPLES:
+        return AUTO_HEDGE_DEFAULT
+    low, high = AUTO_HEDGE_BOUNDS
+    return min(max(puter.quantile(0.95), low), high)
+
+
+def call_puter(text):
+    """puter_tts, recording its latency and outcome on the circuit breaker"""
+    start = time.perf_counter()
+    try:
+        with span(
+            "tts_provider", provider="puter", bytes_in=len(text.encode())
+        ) as call:
+            audio = puter_tts(text)
+            call.set(bytes_out=len(audio))
+    except Exception as e:
+        provider_latency["puter"].observe(time.perf_counter() - start)
+        puter_breaker.record_failure(reason=str(e))
+        raise
+    elapsed = time.perf_counter() - start
+    provider_latency["puter"].observe(elapsed)
+    puter_breaker.record_success(elapsed)
+    return audio
+
+
+def call_edge(text, voice):
+    """edge_tts_bytes, recording its latency"""
+    start = time.perf_counter()
+    try:
+        with span("tts_provider", provider="edge", bytes_in=len(text.encode())) as call:
+            audio = edge_tts_bytes(text, voice)
+            call.set(bytes_out=len(audio))
+            return audio
+    finally:
+        provider_latency["edge"].observe(time.perf_counter() - start)
+
+
+async def _timed(provider, awaitable):
+    start = time.perf_counter()
+    cancelled = False
+    try:
+        return await awaitable
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
+    finally:
+        if not cancelled:
+            provider_latency[provider].observe(time.perf_counter() - start)
+
+
+async def _edge_audio(text, voice):
+    with span("tts_provider", provider="edge", bytes_in=len(text.encode())) as call:
+        data = await generate_audio(text, voice)
+        if not data:
+            raise RuntimeError("Edge TTS returned no audio")
+        call.set(bytes_out=len(data))
+    return data
+
+
+async def synthesize_hedged(text, voice, delay):
+    """Race Puter against Edge started ``delay`` seconds later.
+
+    Edge starts immediately if Puter fails first. Returns (provider, audio)
+    for the first provider to succeed and cancels the other one.
+    """
+    loop = asyncio.get_running_loop()
+    # call_puter records its own outcome, even if it loses the race and its
+    # thread finishes after we have moved on
+    call = _puter_executor.submit(contextvars.copy_context().run, call_puter, text)
+    # Cancelling the loser only stops a call still queued, which then never
+    # reports to the breaker; report it here instead
+    call.add_done_callback(
+        lambda call: call.cancelled() and puter_breaker.record_cancelled()
+    )
+    puter = asyncio.wrap_future(call, loop=loop)
+    await asyncio.wait({puter}, timeout=delay)
+    if puter.done() and puter.exception() is None:
+        return "puter", puter.result()
+
+    if not puter.done():
+        logging.info("Puter TTS slower than %.2fs, hedging with Edge TTS", delay)
+    edge = asyncio.ensure_future(_timed("edge", _edge_audio(text, voice)))
+    racers = {puter: "puter", edge: "edge"}
+
+    errors = {}
+    pending = set()
+    for task, provider in racers.items():
+        if task.done():
+            errors[provider] = task.exception()
+        else:
+            pending.add(task)
+
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                for loser in pending:
+                    loser.cancel()
+                return racers[task], task.result()
+            errors[racers[task]] = task.exception()
+
+    logging.error(
+        "Puter TTS failed: %s; Edge TTS failed: %s", errors["puter"], errors["edge"]
+    )
+    raise RuntimeError(
+        f"primary provider failed ({errors['puter']}); fallback failed ({errors['edge']})"
+    )
+
+
+def synthesize(text, voice):
+    """Synthesize text with Puter and Edge TTS.
+
+    Served from ``audio_cache`` when any provider has already spoken the
+    same text. Edge is used alone while ``puter_breaker`` is open; otherwise
+    Puter and Edge are hedged (see ``TTS_HEDGE_DELAY``) or, with hedging
+    off, Edge is only tried after Puter fails. Safe to call
+    from worker threads: it never touches Streamlit state. Raises
+    RuntimeError when both providers fail.
+    """
+    keys = provider_cache_keys(text, voice)
+    audio = audio_cache.get(*keys.values())
+    annotate(cache_hit=audio is not None)
+    if audio is not None:
+        return audio
+
+    if not puter_breaker.allow_request():
+        # Puter has been failing: go straight to Edge
+        try:
+            audio = call_edge(text, voice)
+        except Exception as e:
+            logging.error("Edge TTS failed while Puter circuit is open: %s", e)
+            raise RuntimeError(
+                f"primary provider unavailable (circuit open); fallback failed ({e})"
+            ) from e
+        audio_cache.put(keys["edge"], audio)
+        return audio
+
+    delay = hedge_delay()
+    if delay is not None:
+        provider, audio = run_sync(synthesize_hedged(text, voice, delay))
+        audio_cache.put(keys[provider], audio)
+        return audio
+
+    # Primary TTS provider: Puter
+    try:
+        audio = call_puter(text)
+    except Exception as e:
+        # Don't crash on provider failure — log and try fallback
+        logging.warning("Puter TTS failed: %s", e)
+
+        try:
+            audio = call_edge(text, voice)
+        except Exception as e2:
+            logging.error("Fallback Edge TTS failed: %s", e2)
+            raise RuntimeError(
+                f"primary provider failed ({e}); fallback failed ({e2})"
+            ) from e2
+        audio_cache.put(keys["edge"], audio)
+        return audio
+
+    audio_cache.put(keys["puter"], audio)
+    return audio
+
+
+def latency_report():
+    """One-line provider p95 summary for tuning TTS_HEDGE_DELAY"""
+    parts = []
+    for provider, histogram in provider_latency.items():
+        p95 = histogram.quantile(0.95)
+        observed = f"{p95:.2f}s" if p95 is not None else "n/a"
+        parts.append(f"{provider.capitalize()} p95 {observed} (n={histogram.count})")
+    delay = hedge_delay()
+    parts.append(f"hedge after {delay:.2f}s" if delay is not None else "hedging off")
+    parts.append(
+        f"Puter circuit {puter_breaker.state.replace('_', '-')} "
+        f"(health {puter_breaker.health:.0%})"
+    )
+    return " | ".join(parts)
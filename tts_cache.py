@@ -0,0 +1,181 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "voice-assistant-tts-cache")
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different strings share an entry"""
+    return " ".join(text.split())
+
+
+def cache_key(text, voice, rate, provider):
+    """Content address for a synthesized clip"""
+    raw = "\x1f".join([provider, voice or "", rate or "", normalize_text(text)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Two-tier cache of synthesized audio keyed by ``cache_key``.
+
+    The first tier is an in-process LRU bounded by ``max_memory_bytes``; the
+    second is a directory of content-addressed files shared by every process
+    on the host and bounded by ``max_disk_bytes`` (0 disables it). All
+    methods are thread-safe.
+    """
+
+    def __init__(self, max_memory_bytes, directory=None, max_disk_bytes=0):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes if directory else 0
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".bin")
+
+    def get(self, *keys):
+        """Return the audio for the first key present, or None.
+
+        Several keys count as a single lookup in the hit/miss counters.
+        """
+        with self._lock:
+            for key in keys:
+                audio = self._entries.get(key)
+                if audio is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return audio
+
+        for key in keys:
+            audio = self._read_disk(key)
+            if audio is not None:
+                break
+
+        with self._lock:
+            if audio is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, audio)
+            return audio
+
+    def put(self, key, audio):
+        if not audio:
+            return
+        with self._lock:
+            self._remember(key, audio)
+        self._write_disk(key, audio)
+
+    def _remember(self, key, audio):
+        if len(audio) > self.max_memory_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._entries[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def _read_disk(self, key):
+        if not self.max_disk_bytes:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                # An empty file is a clip whose write never finished
+                return f.read() or None
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logging.warning("TTS cache read failed: %s", e)
+            return None
+
+    def _write_disk(self, key, audio):
+        if not self.max_disk_bytes or len(audio) > self.max_disk_bytes:
+            return
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so concurrent readers never see a partial clip
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning("TTS cache write failed: %s", e)
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk()
+            else:
+                self._disk_bytes += len(audio)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._prune_disk()
+
+    def _scan_disk(self):
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _prune_disk(self):
+        """Delete least recently written clips until under 90% of the budget"""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        target = self.max_disk_bytes * 0.9
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.disk_evictions += 1
+        self._disk_bytes = total
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+                "entries": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+            }